@@ -28,6 +28,12 @@
 
 from __future__ import print_function, unicode_literals
 from collections import defaultdict
+import calendar
+import gc
+import hashlib
+import io
+import json
+import multiprocessing
 import os
 import shutil
 try:
@@ -35,13 +41,16 @@ try:
 except ImportError:
     pass  # This is only so raw_input/input does nicer things if it's available
 import sys
+import time
 import traceback
 
 from doit.loader import generate_tasks
 from doit.cmd_base import TaskLoader
 from doit.reporter import ExecutedOnlyReporter
+from doit.runner import MRunner
 from doit.doit_cmd import DoitMain
 from doit.cmd_help import Help as DoitHelp
+from doit import cmd_run
 from doit.cmd_run import Run as DoitRun
 from doit.cmd_clean import Clean as DoitClean
 from doit.cmd_completion import TabCompletion
@@ -52,7 +61,7 @@ from blinker import signal
 from . import __version__
 from .plugin_categories import Command
 from .nikola import Nikola
-from .utils import sys_decode, sys_encode, get_root_dir, req_missing, LOGGER, STRICT_HANDLER, STDERR_HANDLER, ColorfulStderrHandler
+from .utils import sys_decode, sys_encode, get_root_dir, req_missing, makedirs, unicode_str, CustomEncoder, LOGGER, STRICT_HANDLER, STDERR_HANDLER, ColorfulStderrHandler
 
 if sys.version_info[0] == 3:
     import importlib.machinery
@@ -235,6 +244,91 @@ class Build(DoitRun):
         self.cmd_options = tuple(opts)
         super(Build, self).__init__(*args, **kw)
 
+    def execute(self, params, args):
+        """Run the tasks, using NikolaMRunner for parallel builds."""
+        # doit picks its runner class from the cmd_run module
+        original_runner = cmd_run.MRunner
+        cmd_run.MRunner = NikolaMRunner
+        NikolaMRunner.pos_args = list(args)
+        try:
+            return super(Build, self).execute(params, args)
+        finally:
+            cmd_run.MRunner = original_runner
+            NikolaMRunner.pos_args = []
+
+
+def _start_method():
+    """Return the start method used for new processes."""
+    try:
+        return multiprocessing.get_start_method()
+    except AttributeError:  # Python 2
+        return 'spawn' if os.name == 'nt' else 'fork'
+
+
+class NikolaMRunner(MRunner):
+    """Run tasks in several processes (``nikola build -n N``).
+
+    Task actions are closures over the site, and cannot be pickled.  If
+    processes are forked, workers get the tasks from the main process.
+    Otherwise (``spawn`` and ``forkserver``), each worker sets the site
+    up from ``conf.py`` and generates the tasks itself once (only the
+    tasks needed for the tasks or targets being built, if possible).  In
+    both cases, only the pickle-safe state of tasks is sent to workers.
+    """
+
+    # Tasks and targets given to ``nikola build``, set by Build.execute
+    pos_args = []
+
+    def _run_start_processes(self, job_q, result_q):
+        """Create and start the worker processes."""
+        if _start_method() == 'fork':
+            if hasattr(gc, 'freeze'):
+                # Keep the garbage collector from touching (and copying)
+                # the objects shared with workers
+                gc.freeze()
+            return super(NikolaMRunner, self)._run_start_processes(job_q, result_q)
+
+        special_config = dict((k, config[k]) for k in
+                              ('__colorful__', '__invariant__', '__quiet__', '__configuration_filename__', '__cwd__'))
+        proc_list = []
+        for _ in range(self.num_process):
+            next_job = self.get_next_job(None)
+            if next_job is None:
+                break  # do not start more processes than tasks
+            job_q.put(next_job)
+            process = self.Child(
+                target=_run_worker,
+                args=(special_config, self.pos_args, self.verbosity, job_q, result_q, self.reporter.__class__))
+            process.start()
+            proc_list.append(process)
+        return proc_list
+
+
+def _run_worker(special_config, pos_args, verbosity, job_q, result_q, reporter_class):
+    """Set up the site in a new process and execute the tasks sent by NikolaMRunner."""
+    # Messages about the configuration were already shown by the main process
+    NullHandler().push_application()
+    conf_filename = special_config['__configuration_filename__']
+    if sys.version_info[0] == 3:
+        loader = importlib.machinery.SourceFileLoader("conf", conf_filename)
+        conf = loader.load_module()
+    else:
+        conf = imp.load_source("conf", sys_encode(conf_filename))
+    worker_config = conf.__dict__
+    worker_config.update(special_config)
+    if worker_config['__invariant__']:
+        import freezegun
+        freezegun.freeze_time("2038-01-01").start()
+    site = Nikola(**worker_config)
+    site.init_plugins()
+    tasks, _ = NikolaTaskLoader(site, quiet=True).load_tasks(None, {}, pos_args)
+    if not worker_config['__quiet__']:
+        STDERR_HANDLER[0].push_application()
+
+    runner = MRunner(None, None, verbosity=verbosity)
+    runner.tasks = dict((task.name, task) for task in tasks)
+    runner.execute_task_subprocess(job_q, result_q, reporter_class)
+
 
 class Clean(DoitClean):
     """Clean site, including the cache directory."""
@@ -254,12 +348,25 @@ DoitAuto.name = 'doit_auto'
 
 
 class NikolaTaskLoader(TaskLoader):
-    """Nikola-specific task loader."""
+    """Nikola-specific task loader.
+
+    When building only some tasks or targets (``nikola build render_posts``
+    or ``nikola build output/posts/foo/index.html``), only the plugins that
+    generate them, and the plugins generating the tasks and files those
+    depend on, are asked for their tasks.  Which plugins generate which
+    basenames and targets is learned from the last full task generation,
+    and kept in ``CACHE_FOLDER``.  If anything is not found there, all tasks
+    are generated.
+    """
+
+    groups = (('Task', 'render_site', 'Group of tasks to render the site.'),
+              ('LateTask', 'post_render', 'Group of tasks to be executed after site is rendered.'))
 
     def __init__(self, nikola, quiet=False):
         """Initialize the loader."""
         self.nikola = nikola
         self.quiet = quiet
+        self.index_path = os.path.join(nikola.config['CACHE_FOLDER'], 'task_index.json')
 
     def load_tasks(self, cmd, opt_values, pos_args):
         """Load Nikola tasks."""
@@ -274,15 +381,193 @@ class NikolaTaskLoader(TaskLoader):
                 'outfile': sys.stderr,
             }
         DOIT_CONFIG['default_tasks'] = ['render_site', 'post_render']
+        if self.nikola.config['DOIT_BACKEND']:
+            DOIT_CONFIG['backend'] = self.nikola.config['DOIT_BACKEND']
         DOIT_CONFIG.update(self.nikola._doit_config)
-        tasks = generate_tasks(
-            'render_site',
-            self.nikola.gen_tasks('render_site', "Task", 'Group of tasks to render the site.'))
-        latetasks = generate_tasks(
-            'post_render',
-            self.nikola.gen_tasks('post_render', "LateTask", 'Group of tasks to be executed after site is rendered.'))
+        tasks = None
+        # cmd is None in the workers of parallel builds
+        if pos_args and (cmd is None or isinstance(cmd, DoitRun)):
+            tasks = self._load_selected_tasks(pos_args)
+        if tasks is None:
+            tasks = []
+            plugins = {}
+            keys = {}
+            for category, name, doc in self.groups:
+                task_plugins = {}
+                tasks += generate_tasks(name, self.nikola.gen_tasks(name, category, doc, task_plugins=task_plugins))
+                for key, names in task_plugins.items():
+                    keys.setdefault(key, set([])).update(names)
+                    plugins.update((plugin, category) for plugin in names)
+            if cmd is not None:
+                self._save_index(plugins, keys)
         signal('initialized').send(self.nikola)
-        return tasks + latetasks, DOIT_CONFIG
+        return tasks, DOIT_CONFIG
+
+    def _save_index(self, plugins, keys):
+        """Save the plugins of all basenames and targets."""
+        data = json.dumps({'plugins': plugins, 'keys': dict((key, sorted(names)) for key, names in keys.items())},
+                          sort_keys=True)
+        try:
+            with io.open(self.index_path, 'r', encoding='utf-8') as inf:
+                if inf.read() == data:
+                    return
+        except (IOError, OSError):
+            pass
+        makedirs(os.path.dirname(self.index_path))
+        with io.open(self.index_path, 'w', encoding='utf-8') as outf:
+            outf.write(unicode_str(data))
+
+    def _load_selected_tasks(self, pos_args):
+        """Generate the tasks needed for pos_args, or return None if unsure."""
+        try:
+            with io.open(self.index_path, 'r', encoding='utf-8') as inf:
+                index = json.load(inf)
+            plugins, keys = index['plugins'], index['keys']
+        except (IOError, OSError, ValueError, KeyError):
+            return None
+        output_folders = tuple(os.path.join(os.path.normpath(self.nikola.config[option]), '')
+                               for option in ('OUTPUT_FOLDER', 'CACHE_FOLDER'))
+        groups = dict((category, (name, doc)) for category, name, doc in self.groups)
+
+        selected = set([])
+        for arg in pos_args:
+            names = keys.get(arg.split(':', 1)[0]) or keys.get(os.path.normpath(arg))
+            if not names:
+                return None
+            selected.update(names)
+        task_dicts = {}
+        while len(task_dicts) < len(selected):
+            for plugin in selected.difference(task_dicts):
+                if plugin not in plugins:
+                    return None
+                name = groups[plugins[plugin]][0]
+                task_dicts[plugin] = list(self.nikola.gen_tasks(name, plugins[plugin], plugins=[plugin]))
+                for task in task_dicts[plugin]:
+                    for dep in task.get('task_dep', []):
+                        names = keys.get(dep.split(':', 1)[0])
+                        if not names:
+                            return None
+                        selected.update(names)
+                    for dep in task.get('file_dep', []):
+                        if dep in keys:
+                            selected.update(keys[dep])
+                        elif os.path.normpath(dep).startswith(output_folders):
+                            # Maybe generated by a task not seen before
+                            return None
+
+        basenames = set([])
+        targets = set([])
+        for plugin_tasks in task_dicts.values():
+            for task in plugin_tasks:
+                basenames.add(task['basename'])
+                targets.update(task.get('targets', []))
+        for arg in pos_args:
+            if arg.split(':', 1)[0] not in basenames and arg not in targets:
+                return None
+        tasks = []
+        for category, name, doc in self.groups:
+            tasks += generate_tasks(name, (task for plugin in sorted(task_dicts) if plugins[plugin] == category
+                                           for task in task_dicts[plugin]))
+        return tasks
+
+
+class BuildFingerprint(object):
+    """A summary of what a build depends on, to skip builds when nothing changed.
+
+    Used if ``SKIP_UNCHANGED_BUILDS`` is enabled.  The fingerprint covers the
+    Nikola version, the command line, the configuration, and the names, sizes
+    and modification times of the files in the site (including the output
+    and the cache), in Nikola itself and in the theme and plugin folders.  A
+    fingerprint expires when the first post scheduled for the future is due.
+    """
+
+    vcs_folders = ('.bzr', '.git', '.hg', '.svn')
+
+    def __init__(self, site, args):
+        """Initialize the fingerprint of a build of site with args."""
+        self.site = site
+        self.path = os.path.join(site.config['CACHE_FOLDER'], 'build_fingerprint.json')
+        self.dep_file = site._doit_config.get('dep_file', '.doit.db')
+        self.inputs = self._inputs_digest(args)
+
+    def _inputs_digest(self, args):
+        """Return the digest of what the build reads."""
+        config = self.site.config
+        digest = hashlib.md5()
+        data = json.dumps([__version__, sys.version, args, config], cls=CustomEncoder, sort_keys=True)
+        digest.update(data.encode('utf-8'))
+        folders = ['.', os.path.dirname(os.path.abspath(__file__)), os.path.expanduser('~/.nikola/plugins')]
+        folders += config['EXTRA_PLUGINS_DIRS'] + config['EXTRA_THEMES_DIRS']
+        for option in ('POSTS', 'PAGES'):
+            folders += [os.path.dirname(source) for source, _, _ in config[option]]
+        for option in ('FILES_FOLDERS', 'GALLERY_FOLDERS', 'LISTINGS_FOLDERS'):
+            folders += list(config[option])
+        root = os.path.abspath('.')
+        outputs = [os.path.abspath(config['OUTPUT_FOLDER']), os.path.abspath(config['CACHE_FOLDER'])]
+        seen = set([])
+        for folder in folders:
+            folder = os.path.abspath(folder or '.')
+            # Folders in the site are already covered by the root folder
+            if folder in seen or (folder != root and folder.startswith(os.path.join(root, ''))):
+                continue
+            seen.add(folder)
+            self._update_digest(digest, folder, outputs)
+        return digest.hexdigest()
+
+    def _outputs_digest(self):
+        """Return the digest of what the build writes."""
+        digest = hashlib.md5()
+        for folder in (self.site.config['OUTPUT_FOLDER'], self.site.config['CACHE_FOLDER']):
+            self._update_digest(digest, os.path.abspath(folder), [])
+        for name in sorted(os.listdir('.')):
+            if name.startswith(self.dep_file):
+                self._update_digest_file(digest, name)
+        return digest.hexdigest()
+
+    def _update_digest(self, digest, folder, exclude):
+        """Add the files in folder, except those in the exclude folders, to digest."""
+        for root, dirs, files in os.walk(folder):
+            dirs[:] = sorted(d for d in dirs if d not in self.vcs_folders and os.path.join(root, d) not in exclude)
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                if path == os.path.abspath(self.path) or (root == os.path.abspath('.') and name.startswith(self.dep_file)):
+                    continue
+                self._update_digest_file(digest, path)
+
+    @staticmethod
+    def _update_digest_file(digest, path):
+        """Add the name, size and modification time of a file to digest."""
+        try:
+            stat = os.stat(path)
+        except OSError:  # broken symlinks
+            return
+        digest.update('{0}\0{1}\0{2!r}\n'.format(path, stat.st_size, stat.st_mtime).encode('utf-8', 'replace'))
+
+    def _load(self):
+        """Return the saved fingerprint, or None."""
+        try:
+            with io.open(self.path, 'r', encoding='utf-8') as inf:
+                return json.load(inf)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def unchanged(self):
+        """Check if nothing changed since the build that saved this fingerprint."""
+        saved = self._load()
+        if not saved or saved['inputs'] != self.inputs:
+            return False
+        if saved['valid_until'] is not None and time.time() >= saved['valid_until']:
+            return False
+        return saved['outputs'] == self._outputs_digest()
+
+    def save(self):
+        """Save the fingerprint after a successful build."""
+        future = [post.date for post in self.site.timeline if post.publish_later]
+        valid_until = calendar.timegm(min(future).utctimetuple()) if future else None
+        makedirs(os.path.dirname(self.path))
+        data = json.dumps({'inputs': self.inputs, 'outputs': self._outputs_digest(), 'valid_until': valid_until})
+        with io.open(self.path, 'w', encoding='utf-8') as outf:
+            outf.write(unicode_str(data))
 
 
 class DoitNikola(DoitMain):
@@ -295,6 +580,9 @@ class DoitNikola(DoitMain):
     def __init__(self, nikola, quiet=False):
         """Initialzie DoitNikola."""
         super(DoitNikola, self).__init__()
+        # Dependency databases provided by Nikola, for DOIT_BACKEND
+        self.config['BACKEND'] = dict(self.config.get('BACKEND', {}))
+        self.config['BACKEND']['sqlite_wal'] = 'nikola.dependency_db:SqliteWALDB'
         self.nikola = nikola
         nikola.doit = self
         self.task_loader = self.TASK_LOADER(nikola, quiet)
@@ -308,8 +596,12 @@ class DoitNikola(DoitMain):
             cmds[name] = cmd
         return cmds
 
-    def run(self, cmd_args):
-        """Run Nikola."""
+    def run(self, cmd_args, init_plugins=True):
+        """Run Nikola.
+
+        If init_plugins is False, the plugins loaded by an earlier run
+        (and the posts they scanned) are used again.
+        """
         args = self.process_args(cmd_args)
         args = [sys_decode(arg) for arg in args]
 
@@ -331,12 +623,20 @@ class DoitNikola(DoitMain):
                 if arg not in ('--help', '-h'):
                     args.append(arg)
 
-        if args[0] == 'help':
-            self.nikola.init_plugins(commands_only=True)
-        elif args[0] == 'plugin':
-            self.nikola.init_plugins(load_all=True)
-        else:
-            self.nikola.init_plugins()
+        fingerprint = None
+        if args[0] == 'build' and self.nikola.configured and self.nikola.config['SKIP_UNCHANGED_BUILDS']:
+            fingerprint = BuildFingerprint(self.nikola, args)
+            if not ('-a' in args or '--always-execute' in args) and fingerprint.unchanged():
+                LOGGER.info('Nothing changed since the last build.')
+                return 0
+
+        if init_plugins:
+            if args[0] == 'help':
+                self.nikola.init_plugins(commands_only=True)
+            elif args[0] == 'plugin':
+                self.nikola.init_plugins(load_all=True)
+            else:
+                self.nikola.init_plugins()
 
         sub_cmds = self.get_cmds()
 
@@ -363,7 +663,10 @@ class DoitNikola(DoitMain):
                 LOGGER.error("This command needs to run inside an "
                              "existing Nikola site.")
                 return 3
-        return super(DoitNikola, self).run(cmd_args)
+        result = super(DoitNikola, self).run(cmd_args)
+        if fingerprint is not None and result == 0:
+            fingerprint.save()
+        return result
 
     @staticmethod
     def print_version():
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+# Copyright © 2012-2016 Roberto Alsina and others.
+
+# Permission is hereby granted, free of charge, to any
+# person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the
+# Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the
+# Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice
+# shall be included in all copies or substantial portions of
+# the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS
+# OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""A doit dependency database for sites with many tasks.
+
+Selected with ``DOIT_BACKEND = 'sqlite_wal'``.  Unlike doit's own backends,
+the state of all tasks is read with a single query (and only decoded when
+a task is checked), it is stored with ``marshal`` (much faster to decode
+than JSON), and only the tasks that changed are written back, in a single
+transaction.  The database uses SQLite's write-ahead log, so other
+processes (like ``nikola auto``) can read it while a build saves it.
+"""
+
+from __future__ import unicode_literals
+import json
+import marshal
+import sqlite3
+import sys
+
+from doit.dependency import DatabaseException
+
+__all__ = ('SqliteWALDB',)
+
+_MARSHAL_TYPES = (type(None), bool, int, float, type(''), type(b''), list, tuple, dict)
+if sys.version_info[0] == 2:
+    _MARSHAL_TYPES += (long,)  # NOQA
+
+
+def _marshallable(data):
+    """Check if data only contains the exact types marshal supports.
+
+    Python 2's marshal writes the buffer of objects it does not know (like
+    subclasses of unicode) instead of refusing them, as Python 3 does.
+    """
+    if type(data) not in _MARSHAL_TYPES:
+        return False
+    if isinstance(data, dict):
+        return all(_marshallable(k) and _marshallable(v) for k, v in data.items())
+    if isinstance(data, (list, tuple)):
+        return all(_marshallable(v) for v in data)
+    return True
+
+
+class SqliteWALDB(object):
+    """doit backend storing the state of tasks in SQLite, in WAL mode."""
+
+    desc = 'SQLite in WAL mode, with batched writes (Nikola)'
+
+    def __init__(self, name):
+        """Open (or create) the database."""
+        self.name = name
+        try:
+            self._conn = sqlite3.connect(name, timeout=60, isolation_level=None)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS tasks (task_id TEXT PRIMARY KEY, data NOT NULL)')
+            # Decoded when needed
+            self._db = dict(self._conn.execute('SELECT task_id, data FROM tasks'))
+        except sqlite3.DatabaseError as e:
+            raise DatabaseException(
+                'Dependencies file in {0!r} seems to be corrupted.\n'
+                'To fix the issue you can just remove the database file(s) '
+                'and a new one will be generated.\n'
+                'Original error: {1}'.format(name, e))
+        self._dirty = set([])
+        self._removed = set([])
+
+    @staticmethod
+    def _encode(data):
+        """Encode the data of a task, as bytes if possible."""
+        if sys.version_info[0] == 2 and not _marshallable(data):
+            return json.dumps(data)
+        try:
+            return sqlite3.Binary(marshal.dumps(data))
+        except ValueError:  # Values marshal does not support, like subclasses
+            return json.dumps(data)
+
+    @staticmethod
+    def _decode(data):
+        """Decode the data of a task."""
+        if isinstance(data, type('')):
+            return json.loads(data)
+        try:
+            return marshal.loads(bytes(data))
+        except (EOFError, TypeError, ValueError):  # Saved by another version of Python
+            return {}
+
+    def _task_data(self, task_id):
+        """Return the decoded data of a task."""
+        data = self._db[task_id]
+        if not isinstance(data, dict):
+            data = self._db[task_id] = self._decode(data)
+        return data
+
+    def get(self, task_id, dependency):
+        """Get a value stored for a task, or None."""
+        if task_id not in self._db:
+            return None
+        return self._task_data(task_id).get(dependency, None)
+
+    def set(self, task_id, dependency, value):
+        """Store a value for a task."""
+        if task_id in self._db:
+            self._task_data(task_id)[dependency] = value
+        else:
+            self._db[task_id] = {dependency: value}
+        self._dirty.add(task_id)
+        self._removed.discard(task_id)
+
+    def in_(self, task_id):
+        """Check if there is state for a task."""
+        return task_id in self._db
+
+    def remove(self, task_id):
+        """Remove the state of a task."""
+        self._db.pop(task_id, None)
+        self._dirty.discard(task_id)
+        self._removed.add(task_id)
+
+    def remove_all(self):
+        """Remove the state of all tasks."""
+        self._removed.update(self._db)
+        self._db = {}
+        self._dirty = set([])
+
+    def dump(self):
+        """Save the changed tasks and close the database."""
+        with self._conn:
+            self._conn.execute('BEGIN IMMEDIATE')
+            self._conn.executemany('DELETE FROM tasks WHERE task_id = ?',
+                                   ((task_id,) for task_id in self._removed))
+            self._conn.executemany('INSERT OR REPLACE INTO tasks VALUES (?, ?)',
+                                   ((task_id, self._encode(self._db[task_id])) for task_id in self._dirty))
+        self._conn.close()
+        self._dirty = set([])
+        self._removed = set([])
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+
+# Copyright © 2012-2016 Roberto Alsina and others.
+
+# Permission is hereby granted, free of charge, to any
+# person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the
+# Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the
+# Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice
+# shall be included in all copies or substantial portions of
+# the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS
+# OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Rewrite the links in HTML in a single pass, without building a tree.
+
+This is used by ``Nikola.render_template`` if ``LINK_REWRITER`` is set to
+``'streaming'``.  The links found, and the values passed to the replacement
+function, are the same as with ``lxml.html``'s ``rewrite_links`` (plus
+``srcset`` in ``img`` and ``source``, as in ``Nikola.rewrite_links``), but
+the rest of the document is kept as it is instead of being re-serialized.
+"""
+
+from __future__ import unicode_literals
+import re
+
+from lxml.html.defs import link_attrs
+
+try:
+    from html import unescape
+except ImportError:  # Python 2
+    from HTMLParser import HTMLParser
+    unescape = HTMLParser().unescape
+
+__all__ = ('UnsupportedHTML', 'rewrite_links')
+
+_markup_re = re.compile(r'''
+    <!--.*?(?:-->|\Z)                   # comment
+    | <![^>]*>?                         # doctype, CDATA
+    | <\?[^>]*>?                        # processing instruction
+    | <(?P<raw>script|style|title|textarea|xmp|plaintext)  # element with text only
+      (?=[\s/>])
+      (?P<raw_attrs>(?:[^>"']+|"[^"]*"|'[^']*')*)
+      >(?P<text>.*?)(?=</(?!plaintext)(?P=raw)|\Z)   # plaintext runs to the end
+    | <(?P<tag>[a-z][^\s/>]*)           # start tag
+      (?P<attrs>(?:[^>"']+|"[^"]*"|'[^']*')*)
+      >
+''', re.DOTALL | re.IGNORECASE | re.VERBOSE)
+_attr_re = re.compile(r'''
+    (?P<name>[^\s/>"'=][^\s/>"'=]*)
+    (?:\s*=\s*(?P<value>"[^"]*"|'[^']*'|[^\s>]+))?
+''', re.VERBOSE)
+# Same as in lxml.html
+_css_url_re = re.compile(r'url\(("[^"]*"|\'[^\']*\'|[^)]*)\)', re.I)
+_css_import_re = re.compile(r'@import "(.*?)"')
+# Tags without any of these can be skipped
+_candidate_re = re.compile(r'[\s"\'](?:{0})'.format('|'.join(sorted(link_attrs | set(['style', 'srcset'])))), re.I)
+
+
+class UnsupportedHTML(Exception):
+    """Raised for markup that is only handled by the lxml link rewriter."""
+
+    pass
+
+
+def _unquote_match(s, pos):
+    """Remove quotes around s, as lxml.html does for CSS URLs."""
+    if s[:1] == '"' and s[-1:] == '"' or s[:1] == "'" and s[-1:] == "'":
+        return s[1:-1], pos + 1
+    return s, pos
+
+
+def _quote_attribute(value, quote):
+    """Escape an attribute value for the given quote character."""
+    value = value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    if quote == "'":
+        return value.replace("'", '&#39;')
+    return value.replace('"', '&quot;')
+
+
+def _rewrite_css(text, replace, imports):
+    """Replace the links in CSS text, or return None to remove it."""
+    links = [_unquote_match(match.group(1), match.start(1))[::-1] for match in _css_url_re.finditer(text)]
+    if imports:
+        links += [(match.start(1), match.group(1)) for match in _css_import_re.finditer(text)]
+    # From the end, so positions stay valid
+    for start, link in sorted(links, reverse=True):
+        new_link = replace(link.strip())
+        if new_link == link:
+            continue
+        if new_link is None:
+            return None
+        text = text[:start] + new_link + text[start + len(link):]
+    return text
+
+
+def _rewrite_tag(tag, attrs, replace):
+    """Return the attributes of a start tag with links replaced, or None if unchanged."""
+    seen = set([])
+    pieces = []
+    changed = False
+    pos = 0
+    for match in _attr_re.finditer(attrs):
+        name = match.group('name').lower()
+        raw = match.group('value')
+        if name in seen:
+            continue
+        seen.add(name)
+        if name in link_attrs or name == 'style' or (name == 'srcset' and tag in ('img', 'source')):
+            if raw is None:
+                quote, value = '', ''
+            else:
+                quote = raw[0] if raw[0] in '"\'' else ''
+                value = raw[1:-1] if quote else raw
+                if '&' in value:
+                    value = unescape(value)
+            if name == 'style':
+                new_value = _rewrite_css(value, replace, False)
+            elif name == 'srcset':
+                new_value = ', '.join(replace(url.strip()) for url in value.split(','))
+            else:
+                new_value = replace(value.strip())
+            if new_value == value:
+                continue
+            changed = True
+            pieces.append(attrs[pos:match.start()])
+            pos = match.end()
+            if new_value is not None:
+                pieces.append('{0}={1}{2}{1}'.format(match.group('name'), quote or '"', _quote_attribute(new_value, quote or '"')))
+    if not changed:
+        return None
+    pieces.append(attrs[pos:])
+    return ''.join(pieces)
+
+
+def rewrite_links(data, replace):
+    """Replace the links in the HTML document (or fragment) data.
+
+    ``replace`` is called with every link and returns its replacement
+    (or None to remove it).  Raises UnsupportedHTML for elements whose
+    links are handled in special ways by lxml (``object``, ``param`` and
+    refreshing ``meta`` elements).
+    """
+    pieces = []
+    pos = 0
+    for match in _markup_re.finditer(data):
+        tag, attrs = match.group('tag', 'attrs')
+        group = 'attrs'
+        if tag is None:
+            tag, attrs = match.group('raw', 'raw_attrs')
+            group = 'raw_attrs'
+            if tag is None:
+                continue
+        if attrs:
+            tag = tag.lower()
+            if tag in ('object', 'param') or (tag == 'meta' and 'refresh' in attrs.lower()):
+                raise UnsupportedHTML(tag)
+            new_attrs = _rewrite_tag(tag, attrs, replace) if _candidate_re.search(attrs) else None
+            if new_attrs is not None:
+                pieces.append(data[pos:match.start(group)])
+                pieces.append(new_attrs)
+                pos = match.end(group)
+        if group == 'raw_attrs' and tag.lower() == 'style':
+            text = match.group('text')
+            new_text = (_rewrite_css(text, replace, True) or '') if text else text
+            if new_text != text:
+                pieces.append(data[pos:match.start('text')])
+                pieces.append(new_text)
+                pos = match.end('text')
+    pieces.append(data[pos:])
+    return ''.join(pieces)
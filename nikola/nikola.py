@@ -30,6 +30,7 @@ from __future__ import print_function, unicode_literals
 import io
 from collections import defaultdict
 from copy import copy
+import hashlib
 from pkg_resources import resource_filename
 import datetime
 import locale
@@ -58,7 +59,7 @@ from blinker import signal
 
 from .post import Post  # NOQA
 from .state import Persistor
-from . import DEBUG, utils, shortcodes
+from . import DEBUG, utils, shortcodes, link_rewriter
 from .plugin_categories import (
     Command,
     LateTask,
@@ -88,6 +89,9 @@ DEFAULT_FEED_READ_MORE_LINK = '<p><a href="{link}">{read_more}…</a> ({min_rema
 # Default pattern for translation files' names
 DEFAULT_TRANSLATIONS_PATTERN = '{path}.{lang}.{ext}'
 
+# Marks missing cache entries, where None is a valid value
+_MISSING = object()
+
 
 config_changed = utils.config_changed
 
@@ -377,6 +381,18 @@ def _enclosure(post, lang):
         return url, length, mime
 
 
+def _text_digest(text):
+    """Return a short digest of a post text, to use in cache keys."""
+    if text is None:
+        return None
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _formatmsg(s, *a):
+    """Format a message for templates (string, arguments)."""
+    return s % a
+
+
 class Nikola(object):
     """Class that handles site generation.
 
@@ -406,6 +422,11 @@ class Nikola(object):
         self.pages = []
         self._scanned = False
         self._template_system = None
+        # Results of url_replacer and link:// links, cleared when posts change
+        self._url_replacer_cache = utils.LRUCache(100000)
+        self._magic_links = utils.LRUCache(10000)
+        # Global context of templates for each language: (GLOBAL_CONTEXT version, context, dependencies)
+        self._language_contexts = {}
         self._THEMES = None
         self._MESSAGES = None
         self.debug = DEBUG
@@ -448,6 +469,7 @@ class Nikola(object):
             'BLOG_DESCRIPTION': 'Default Description',
             'BODY_END': "",
             'CACHE_FOLDER': 'cache',
+            'CACHE_POST_METADATA': True,
             'CATEGORIES_INDEX_PATH': '',
             'CATEGORY_PATH': None,  # None means: same as TAG_PATH
             'CATEGORY_PAGES_ARE_INDEXES': None,  # None means: same as TAG_PAGES_ARE_INDEXES
@@ -485,6 +507,7 @@ class Nikola(object):
             'DEFAULT_LANG': "en",
             'DEPLOY_COMMANDS': {'default': []},
             'DISABLED_PLUGINS': [],
+            'DOIT_BACKEND': None,
             'EXTRA_PLUGINS_DIRS': [],
             'EXTRA_THEMES_DIRS': [],
             'COMMENT_SYSTEM_ID': 'nikolademo',
@@ -525,8 +548,10 @@ class Nikola(object):
             'KATEX_AUTO_RENDER': '',
             'LESS_COMPILER': 'lessc',
             'LESS_OPTIONS': [],
+            'LAZY_POSTS': False,
             'LICENSE': '',
             'LINK_CHECK_WHITELIST': [],
+            'LINK_REWRITER': 'lxml',
             'LISTINGS_FOLDERS': {'listings': 'listings'},
             'LOGO_URL': '',
             'NAVIGATION_LINKS': {},
@@ -543,6 +568,7 @@ class Nikola(object):
             'POSTS_SECTION_FROM_META': False,
             'POSTS_SECTION_NAME': "",
             'POSTS_SECTION_TITLE': "{name}",
+            'POST_TEXT_CACHE_SIZE': 64 * 1024 * 1024,
             'PRESERVE_EXIF_DATA': False,
             # TODO: change in v8
             'PAGES': (("stories/*.txt", "stories", "story.tmpl"),),
@@ -563,11 +589,13 @@ class Nikola(object):
             'RSS_PATH': '',
             'SASS_COMPILER': 'sass',
             'SASS_OPTIONS': [],
+            'SCAN_WORKERS': 1,
             'SEARCH_FORM': '',
             'SHOW_BLOG_TITLE': True,
             'SHOW_INDEX_PAGE_NAVIGATION': False,
             'SHOW_SOURCELINK': True,
             'SHOW_UNTRANSLATED_POSTS': True,
+            'SKIP_UNCHANGED_BUILDS': False,
             'SLUG_AUTHOR_PATH': True,
             'SLUG_TAG_PATH': True,
             'SOCIAL_BUTTONS_CODE': '',
@@ -612,7 +640,7 @@ class Nikola(object):
         }
 
         # set global_context for template rendering
-        self._GLOBAL_CONTEXT = {}
+        self._GLOBAL_CONTEXT = utils.VersionedDict()
 
         self.config.update(config)
 
@@ -928,6 +956,8 @@ class Nikola(object):
             utils.LOGGER.warn("Error getting TZ: {}", exc)
             self.tzinfo = dateutil.tz.gettz()
         self.config['__tzinfo__'] = self.tzinfo
+        # Results of Post.text, shared by all posts of the site
+        self.config['__post_text_cache__'] = utils.LRUCache(self.config['POST_TEXT_CACHE_SIZE'], sizeof=sys.getsizeof)
 
         # Store raw compilers for internal use (need a copy for that)
         self.config['_COMPILERS_RAW'] = {}
@@ -1285,6 +1315,28 @@ class Nikola(object):
 
     GLOBAL_CONTEXT = property(_get_global_context)
 
+    def _get_language_context(self, lang):
+        """Return the global context of templates for lang and its translated values.
+
+        The translatable entries of the context are resolved for lang.  The
+        result is computed once per language and kept until GLOBAL_CONTEXT
+        changes.  It must not be modified.
+        """
+        global_context = self.GLOBAL_CONTEXT
+        cached = self._language_contexts.get(lang)
+        if cached is not None and cached[0] == global_context.version:
+            return cached[1], cached[2]
+        translated = {}
+        for k in self._GLOBAL_CONTEXT_TRANSLATABLE:
+            translated[k] = global_context[k](lang)
+        context = dict(global_context)
+        context.update(translated)
+        context['is_rtl'] = lang in LEGAL_VALUES['RTL_LANGUAGES']
+        context['formatmsg'] = _formatmsg
+        translated['navigation_links'] = global_context['navigation_links'](lang)
+        self._language_contexts[lang] = (global_context.version, context, translated)
+        return context, translated
+
     def _get_template_system(self):
         if self._template_system is None:
             # Load template plugin
@@ -1356,19 +1408,36 @@ class Nikola(object):
         If ``is_fragment`` is set to ``True``, a HTML fragment will
         be rendered and not a whole HTML document.
         """
-        local_context = {}
-        local_context["template_name"] = template_name
-        local_context.update(self.GLOBAL_CONTEXT)
+        lang = context['lang']
+        language_context = self._get_language_context(lang)[0]
+        local_context = dict(language_context)
+        local_context.setdefault("template_name", template_name)
         local_context.update(context)
         for k in self._GLOBAL_CONTEXT_TRANSLATABLE:
-            local_context[k] = local_context[k](local_context['lang'])
-        local_context['is_rtl'] = local_context['lang'] in LEGAL_VALUES['RTL_LANGUAGES']
+            if k in context:
+                local_context[k] = context[k](lang)
+        local_context['is_rtl'] = language_context['is_rtl']
         local_context['url_type'] = self.config['URL_TYPE'] if url_type is None else url_type
-        # string, arguments
-        local_context["formatmsg"] = lambda s, *a: s % a
+        local_context["formatmsg"] = _formatmsg
         for h in local_context['template_hooks'].values():
             h.context = context
 
+        if output_name is None:
+            local_context['url_source'] = None
+        else:
+            if not output_name.startswith(self.config["OUTPUT_FOLDER"]):
+                raise ValueError("Output path for templates must start with OUTPUT_FOLDER")
+            url_part = output_name[len(self.config["OUTPUT_FOLDER"]) + 1:]
+
+            # Treat our site as if output/ is "/" and then make all URLs relative,
+            # making the site "relocatable"
+            src = os.sep + url_part
+            src = os.path.normpath(src)
+            # The os.sep is because normpath will change "/" to "\" on windows
+            src = "/".join(src.split(os.sep))
+            # Templates can make their links relative themselves
+            local_context['url_source'] = src
+
         for func in self.config['GLOBAL_CONTEXT_FILLER']:
             func(local_context, template_name)
 
@@ -1378,18 +1447,21 @@ class Nikola(object):
         if output_name is None:
             return data
 
-        if not output_name.startswith(self.config["OUTPUT_FOLDER"]):
-            raise ValueError("Output path for templates must start with OUTPUT_FOLDER")
-        url_part = output_name[len(self.config["OUTPUT_FOLDER"]) + 1:]
-
-        # Treat our site as if output/ is "/" and then make all URLs relative,
-        # making the site "relocatable"
-        src = os.sep + url_part
-        src = os.path.normpath(src)
-        # The os.sep is because normpath will change "/" to "\" on windows
-        src = "/".join(src.split(os.sep))
-
         utils.makedirs(os.path.dirname(output_name))
+        if self.config['LINK_REWRITER'] == 'templates':
+            # The templates took care of the links
+            with io.open(output_name, "w+", encoding="utf-8") as post_file:
+                post_file.write(data)
+            return
+        if self.config['LINK_REWRITER'] == 'streaming':
+            try:
+                data = link_rewriter.rewrite_links(data, lambda dst: self.url_replacer(src, dst, context['lang'], url_type))
+            except link_rewriter.UnsupportedHTML:
+                pass
+            else:
+                with io.open(output_name, "w+", encoding="utf-8") as post_file:
+                    post_file.write(data)
+                return
         parser = lxml.html.HTMLParser(remove_blank_text=True)
         if is_fragment:
             doc = lxml.html.fragment_fromstring(data, parser)
@@ -1419,6 +1491,16 @@ class Nikola(object):
                 urls = [self.url_replacer(src, dst, lang, url_type) for dst in urls]
                 obj.set('srcset', ', '.join(urls))
 
+    def rewrite_html_links(self, data, src, lang, url_type=None):
+        """Return the HTML fragment data with the links replaced to be used in src."""
+        replace = lambda dst: self.url_replacer(src, dst, lang, url_type)  # NOQA
+        try:
+            return link_rewriter.rewrite_links(data, replace)
+        except link_rewriter.UnsupportedHTML:
+            doc = lxml.html.fragment_fromstring(data, 'div')
+            self.rewrite_links(doc, src, lang, url_type)
+            return (doc.text or '') + ''.join([lxml.html.tostring(child, encoding='unicode', method='html') for child in doc.iterchildren()])
+
     def url_replacer(self, src, dst, lang=None, url_type=None):
         """Mangle URLs.
 
@@ -1437,28 +1519,56 @@ class Nikola(object):
         if dst.startswith('#'):
             return dst
 
-        parsed_src = urlsplit(src)
-        src_elems = parsed_src.path.split('/')[1:]
-        dst_url = urlparse(dst)
         if lang is None:
             lang = self.default_lang
         if url_type is None:
             url_type = self.config.get('URL_TYPE')
 
+        linked = dst
+        if dst[:7].lower() == 'link://':
+            linked = self._resolve_magic_link(dst, lang)
+
+        # Except for links to the page itself (empty, query-only or
+        # fragment-only links), the result is the same for all pages in a
+        # folder, so it is cached per folder.
+        folder, sep, _ = src.rpartition('/')
+        if (linked is not None and (not linked or linked[0] in '?#')) or not sep or '?' in src or '#' in src:
+            target, result = self._replace_url(src, dst, lang, url_type)
+        else:
+            key = (folder, dst, lang, url_type)
+            cached = self._url_replacer_cache.get(key)
+            if cached is None:
+                cached = self._url_replacer_cache[key] = self._replace_url(folder + '/', dst, lang, url_type)
+            target, result = cached
+
+        # Avoid empty links.
+        if target == src:
+            if url_type == 'absolute':
+                return urljoin(self.config['BASE_URL'], target.lstrip('/'))
+            elif url_type == 'full_path':
+                return urlparse(urljoin(self.config['BASE_URL'], target.lstrip('/'))).path
+            else:
+                return "#"
+        return result
+
+    def _replace_url(self, src, dst, lang, url_type):
+        """Do the work of url_replacer.
+
+        Returns a tuple (target, result).  target is the URL dst points to,
+        made absolute, or None if dst is not changed.  If target is src,
+        url_replacer returns a link to the page itself instead of result.
+        """
+        parsed_src = urlsplit(src)
+        src_elems = parsed_src.path.split('/')[1:]
+        dst_url = urlparse(dst)
+
         if dst_url.scheme and dst_url.scheme not in ['http', 'https', 'link']:
-            return dst
+            return None, dst
 
         # Refuse to replace links that are full URLs.
         if dst_url.netloc:
             if dst_url.scheme == 'link':  # Magic link
-                if dst_url.query:
-                    # If query strings are used in magic link, they will be
-                    # passed to the path handler as keyword arguments (strings)
-                    link_kwargs = {k: v[-1] for k, v in parse_qs(dst_url.query).items()}
-                else:
-                    link_kwargs = {}
-
-                dst = self.link(dst_url.netloc, dst_url.path.lstrip('/'), lang, **link_kwargs)
+                dst = self._resolve_magic_link(dst, lang)
             # Assuming the site is served over one of these, and
             # since those are the only URLs we want to rewrite...
             else:
@@ -1478,37 +1588,27 @@ class Nikola(object):
                                       dst_url.path,
                                       dst_url.query,
                                       dst_url.fragment))
-                return dst
+                return None, dst
         elif dst_url.scheme == 'link':  # Magic absolute path link:
             dst = dst_url.path
-            return dst
+            return None, dst
 
         # Refuse to replace links that consist of a fragment only
         if ((not dst_url.scheme) and (not dst_url.netloc) and
                 (not dst_url.path) and (not dst_url.params) and
                 (not dst_url.query) and dst_url.fragment):
-            return dst
+            return None, dst
 
         # Normalize
         dst = urljoin(src, dst)
-
-        # Avoid empty links.
-        if src == dst:
-            if url_type == 'absolute':
-                dst = urljoin(self.config['BASE_URL'], dst.lstrip('/'))
-                return dst
-            elif url_type == 'full_path':
-                dst = urljoin(self.config['BASE_URL'], dst.lstrip('/'))
-                return urlparse(dst).path
-            else:
-                return "#"
+        target = dst
 
         # Check that link can be made relative, otherwise return dest
         parsed_dst = urlsplit(dst)
         if parsed_src[:2] != parsed_dst[:2]:
             if url_type == 'absolute':
                 dst = urljoin(self.config['BASE_URL'], dst)
-            return dst
+            return target, dst
 
         if url_type in ('full_path', 'absolute'):
             dst = urljoin(self.config['BASE_URL'], dst.lstrip('/'))
@@ -1518,7 +1618,7 @@ class Nikola(object):
                     dst = '{0}#{1}'.format(parsed.path, parsed.fragment)
                 else:
                     dst = parsed.path
-            return dst
+            return target, dst
 
         # Now both paths are on the same site and absolute
         dst_elems = parsed_dst.path.split('/')[1:]
@@ -1544,7 +1644,28 @@ class Nikola(object):
         if not result:
             raise ValueError("Failed to parse link: {0}".format((src, dst, i, src_elems, dst_elems)))
 
-        return result
+        return target, result
+
+    def _resolve_magic_link(self, dst, lang):
+        """Return the path a link:// URL points to, or None if it is a magic absolute path link.
+
+        Resolved links are kept in a table.
+        """
+        key = (dst, lang)
+        path = self._magic_links.get(key, _MISSING)
+        if path is _MISSING:
+            dst_url = urlparse(dst)
+            if not dst_url.netloc:
+                path = None
+            elif dst_url.query:
+                # If query strings are used in magic link, they will be
+                # passed to the path handler as keyword arguments (strings)
+                link_kwargs = {k: v[-1] for k, v in parse_qs(dst_url.query).items()}
+                path = self.link(dst_url.netloc, dst_url.path.lstrip('/'), lang, **link_kwargs)
+            else:
+                path = self.link(dst_url.netloc, dst_url.path.lstrip('/'), lang)
+            self._magic_links[key] = path
+        return path
 
     def _make_renderfunc(self, t_data, fname=None):
         """Return a function that can be registered as a template shortcode.
@@ -1629,6 +1750,46 @@ class Nikola(object):
             lang = utils.LocaleBorg().current_lang
         return shortcodes.apply_shortcodes(data, self.shortcode_registry, self, filename, lang=lang, with_dependencies=with_dependencies, extra_context=extra_context)
 
+    def feed_item_html(self, post, lang, data, base_link):
+        """Prepare the HTML of a post for a feed item.
+
+        Adds the post's preview image (if FEED_PREVIEWIMAGE is set) and
+        makes all links in data (a text of post) absolute, relative to
+        base_link.  The same posts appear in many feeds, so the results
+        are kept in the post text cache.
+        """
+        previewimage = None
+        if self.config["FEED_PREVIEWIMAGE"] and 'previewimage' in post.meta[lang]:
+            previewimage = post.meta[lang]['previewimage']
+        cache = self.config.get('__post_text_cache__')
+        key = ('feed_item_html', _text_digest(data), lang, base_link, previewimage)
+        cached = None if cache is None else cache.get(key)
+        if cached is not None:
+            return cached
+
+        text = data
+        if previewimage and previewimage not in text:
+            text = "<figure><img src=\"{}\"></figure> {}".format(previewimage, text)
+        # FIXME: this is duplicated with code in Post.text()
+        try:
+            doc = lxml.html.document_fromstring(text)
+            doc.rewrite_links(lambda dst: self.url_replacer(base_link, dst, lang, 'absolute'))
+            try:
+                body = doc.body
+                text = (body.text or '') + ''.join(
+                    [lxml.html.tostring(child, encoding='unicode')
+                        for child in body.iterchildren()])
+            except IndexError:  # No body there, it happens sometimes
+                text = ''
+        except lxml.etree.ParserError as e:
+            if str(e) == "Document is empty":
+                text = ""
+            else:  # let other errors raise
+                raise(e)
+        if cache is not None:
+            cache[key] = text
+        return text
+
     def generic_rss_renderer(self, lang, title, link, description, timeline, output_path,
                              rss_teasers, rss_plain, feed_length=10, feed_url=None,
                              enclosure=_enclosure, rss_links_append_query=None):
@@ -1646,73 +1807,53 @@ class Nikola(object):
             absurl = '/' + feed_url[len(self.config['BASE_URL']):]
             rss_obj.xsl_stylesheet_href = self.url_replacer(absurl, "/assets/xml/rss.xsl")
 
-        items = []
-
         feed_append_query = None
         if rss_links_append_query:
             feed_append_query = rss_links_append_query.format(
                 feedRelUri='/' + feed_url[len(self.config['BASE_URL']):],
                 feedFormat="rss")
 
-        for post in timeline[:feed_length]:
-            data = post.text(lang, teaser_only=rss_teasers, strip_html=rss_plain,
-                             feed_read_more_link=True, feed_links_append_query=feed_append_query)
-            if feed_url is not None and data:
-                # Massage the post's HTML (unless plain)
-                if not rss_plain:
-                    if self.config["FEED_PREVIEWIMAGE"] and 'previewimage' in post.meta[lang] and post.meta[lang]['previewimage'] not in data:
-                        data = "<figure><img src=\"{}\"></figure> {}".format(post.meta[lang]['previewimage'], data)
-                    # FIXME: this is duplicated with code in Post.text()
-                    try:
-                        doc = lxml.html.document_fromstring(data)
-                        doc.rewrite_links(lambda dst: self.url_replacer(post.permalink(), dst, lang, 'absolute'))
-                        try:
-                            body = doc.body
-                            data = (body.text or '') + ''.join(
-                                [lxml.html.tostring(child, encoding='unicode')
-                                    for child in body.iterchildren()])
-                        except IndexError:  # No body there, it happens sometimes
-                            data = ''
-                    except lxml.etree.ParserError as e:
-                        if str(e) == "Document is empty":
-                            data = ""
-                        else:  # let other errors raise
-                            raise(e)
-            args = {
-                'title': post.title(lang),
-                'link': post.permalink(lang, absolute=True, query=feed_append_query),
-                'description': data,
-                # PyRSS2Gen's pubDate is GMT time.
-                'pubDate': (post.date if post.date.tzinfo is None else
-                            post.date.astimezone(dateutil.tz.tzutc())),
-                'categories': post._tags.get(lang, []),
-                'creator': post.author(lang),
-                'guid': post.permalink(lang, absolute=True),
-            }
-
-            if post.author(lang):
-                rss_obj.rss_attrs["xmlns:dc"] = "http://purl.org/dc/elements/1.1/"
-
-            if enclosure:
-                # enclosure callback returns None if post has no enclosure, or a
-                # 3-tuple of (url, length (0 is valid), mimetype)
-                enclosure_details = enclosure(post=post, lang=lang)
-                if enclosure_details is not None:
-                    args['enclosure'] = rss.Enclosure(*enclosure_details)
-
-            items.append(utils.ExtendedItem(**args))
-
-        rss_obj.items = items
+        def items():
+            """Yield the items of the feed, as it is written."""
+            for post in timeline[:feed_length]:
+                data = post.text(lang, teaser_only=rss_teasers, strip_html=rss_plain,
+                                 feed_read_more_link=True, feed_links_append_query=feed_append_query)
+                if feed_url is not None and data:
+                    # Massage the post's HTML (unless plain)
+                    if not rss_plain:
+                        data = self.feed_item_html(post, lang, data, post.permalink())
+                args = {
+                    'title': post.title(lang),
+                    'link': post.permalink(lang, absolute=True, query=feed_append_query),
+                    'description': data,
+                    # PyRSS2Gen's pubDate is GMT time.
+                    'pubDate': (post.date if post.date.tzinfo is None else
+                                post.date.astimezone(dateutil.tz.tzutc())),
+                    'categories': post._tags.get(lang, []),
+                    'creator': post.author(lang),
+                    'guid': post.permalink(lang, absolute=True),
+                }
+
+                if enclosure:
+                    # enclosure callback returns None if post has no enclosure, or a
+                    # 3-tuple of (url, length (0 is valid), mimetype)
+                    enclosure_details = enclosure(post=post, lang=lang)
+                    if enclosure_details is not None:
+                        args['enclosure'] = rss.Enclosure(*enclosure_details)
+
+                yield utils.ExtendedItem(**args)
+
+        if any(post.author(lang) for post in timeline[:feed_length]):
+            rss_obj.rss_attrs["xmlns:dc"] = "http://purl.org/dc/elements/1.1/"
+        rss_obj.items = items()
         rss_obj.self_url = feed_url
         rss_obj.rss_attrs["xmlns:atom"] = "http://www.w3.org/2005/Atom"
 
         dst_dir = os.path.dirname(output_path)
         utils.makedirs(dst_dir)
-        with io.open(output_path, "w+", encoding="utf-8") as rss_file:
-            data = rss_obj.to_xml(encoding='utf-8')
-            if isinstance(data, utils.bytes_str):
-                data = data.decode('utf-8')
-            rss_file.write(data)
+        # The SAX writer encodes the feed itself, on Python 2 and 3 alike
+        with io.open(output_path, "wb") as rss_file:
+            rss_obj.write_xml(rss_file, encoding='utf-8')
 
     def path(self, kind, name, lang=None, is_link=False, **kwargs):
         r"""Build the path to a certain kind of page.
@@ -1890,8 +2031,14 @@ class Nikola(object):
             task['targets'] = [os.path.normpath(t) for t in targets]
         return task
 
-    def gen_tasks(self, name, plugin_category, doc=''):
-        """Generate tasks."""
+    def gen_tasks(self, name, plugin_category, doc='', plugins=None, task_plugins=None):
+        """Generate tasks.
+
+        If plugins is given, only the tasks of the plugins with those names
+        are generated, without the group task.  If task_plugins is a dict,
+        the names of the plugins that generate every basename and target are
+        added to it (as sets).
+        """
         def flatten(task):
             """Flatten lists of tasks."""
             if isinstance(task, dict):
@@ -1901,8 +2048,15 @@ class Nikola(object):
                     for ft in flatten(t):
                         yield ft
 
+        def add_plugin(task, plugin):
+            """Add plugin to task_plugins for the basename and targets of task."""
+            for key in [task['basename']] + task.get('targets', []):
+                task_plugins.setdefault(key, set([])).add(plugin)
+
         task_dep = []
         for pluginInfo in self.plugin_manager.getPluginsOfCategory(plugin_category):
+            if plugins is not None and pluginInfo.name not in plugins:
+                continue
             for task in flatten(pluginInfo.plugin_object.gen_tasks()):
                 if 'basename' not in task:
                     raise ValueError("Task {0} does not have a basename".format(task))
@@ -1910,16 +2064,23 @@ class Nikola(object):
                 if 'task_dep' not in task:
                     task['task_dep'] = []
                 task['task_dep'].extend(self.injected_deps[task['basename']])
+                if task_plugins is not None:
+                    add_plugin(task, pluginInfo.name)
                 yield task
                 for multi in self.plugin_manager.getPluginsOfCategory("TaskMultiplier"):
                     flag = False
                     for task in multi.plugin_object.process(task, name):
                         flag = True
-                        yield self.clean_task_paths(task)
+                        task = self.clean_task_paths(task)
+                        if task_plugins is not None:
+                            add_plugin(task, pluginInfo.name)
+                        yield task
                     if flag:
                         task_dep.append('{0}_{1}'.format(name, multi.plugin_object.name))
             if pluginInfo.plugin_object.is_default:
                 task_dep.append(pluginInfo.plugin_object.name)
+        if plugins is not None:
+            return
         yield {
             'basename': name,
             'doc': doc,
@@ -2001,6 +2162,8 @@ class Nikola(object):
         self.post_per_input_file = {}
         self.timeline = []
         self.pages = []
+        self._url_replacer_cache.clear()
+        self._magic_links.clear()
 
         for p in self.plugin_manager.getPluginsOfCategory('PostScanner'):
             timeline = p.plugin_object.scan()
@@ -2009,72 +2172,18 @@ class Nikola(object):
 
         quit = False
         # Classify posts per year/tag/month/whatever
-        slugged_tags = defaultdict(set)
+        tag_index = _TagIndex()
         for post in self.timeline:
-            if post.use_in_feeds:
-                self.posts.append(post)
-                self.posts_per_year[str(post.date.year)].append(post)
-                self.posts_per_month[
-                    '{0}/{1:02d}'.format(post.date.year, post.date.month)].append(post)
-                for lang in self.config['TRANSLATIONS'].keys():
-                    for tag in post.tags_for_language(lang):
-                        _tag_slugified = utils.slugify(tag, lang)
-                        if _tag_slugified in slugged_tags[lang]:
-                            if tag not in self.posts_per_tag:
-                                # Tags that differ only in case
-                                other_tag = [existing for existing in self.posts_per_tag.keys() if utils.slugify(existing, lang) == _tag_slugified][0]
-                                utils.LOGGER.error('You have tags that are too similar: {0} and {1}'.format(tag, other_tag))
-                                utils.LOGGER.error('Tag {0} is used in: {1}'.format(tag, post.source_path))
-                                utils.LOGGER.error('Tag {0} is used in: {1}'.format(other_tag, ', '.join([p.source_path for p in self.posts_per_tag[other_tag]])))
-                                quit = True
-                        else:
-                            slugged_tags[lang].add(_tag_slugified)
-                        if post not in self.posts_per_tag[tag]:
-                            self.posts_per_tag[tag].append(post)
-                    self.tags_per_language[lang].extend(post.tags_for_language(lang))
-                self._add_post_to_category(post, post.meta('category'))
-
-            if post.is_post:
-                # unpublished posts
-                self.all_posts.append(post)
-            else:
-                self.pages.append(post)
-
-            for lang in self.config['TRANSLATIONS'].keys():
-                dest = post.destination_path(lang=lang)
-                src_dest = post.destination_path(lang=lang, extension=post.source_ext())
-                src_file = post.translated_source_path(lang=lang)
-                if dest in self.post_per_file:
-                    utils.LOGGER.error('Two posts are trying to generate {0}: {1} and {2}'.format(
-                        dest,
-                        self.post_per_file[dest].source_path,
-                        post.source_path))
-                    quit = True
-                if (src_dest in self.post_per_file) and self.config['COPY_SOURCES']:
-                    utils.LOGGER.error('Two posts are trying to generate {0}: {1} and {2}'.format(
-                        src_dest,
-                        self.post_per_file[dest].source_path,
-                        post.source_path))
-                    quit = True
-                self.post_per_file[dest] = post
-                self.post_per_file[src_dest] = post
-                self.post_per_input_file[src_file] = post
-                # deduplicate tags_per_language
-                self.tags_per_language[lang] = list(set(self.tags_per_language[lang]))
+            if self._classify_post(post, tag_index):
+                quit = True
 
         # Sort everything.
 
         for thing in self.timeline, self.posts, self.all_posts, self.pages:
-            thing.sort(key=lambda p:
-                       (int(p.meta('priority')) if p.meta('priority') else 0,
-                        p.date, p.source_path))
-            thing.reverse()
+            self._sort_posts(thing)
         self._sort_category_hierarchy()
+        self._link_posts()
 
-        for i, p in enumerate(self.posts[1:]):
-            p.next_post = self.posts[i]
-        for i, p in enumerate(self.posts[:-1]):
-            p.prev_post = self.posts[i + 1]
         self._scanned = True
         if not self.quiet:
             print("done!", file=sys.stderr)
@@ -2082,6 +2191,194 @@ class Nikola(object):
             sys.exit(1)
         signal('scanned').send(self)
 
+    def update_posts(self, added=(), modified=(), removed=(), ignore_quit=False):
+        """Update the scanned posts after some post source files changed.
+
+        added, modified and removed are collections of paths of post
+        sources, .meta files or their translations.  Only the posts these
+        files belong to are scanned again, and the post lists, indexes and
+        taxonomies are updated in place.
+
+        If posts were not scanned yet, or if a PostScanner plugin does not
+        support ``scan_paths``, all posts are scanned again instead.
+        """
+        if not self._scanned:
+            return self.scan_posts(ignore_quit=ignore_quit)
+
+        changed_paths = set(added) | set(modified) | set(removed)
+        self._url_replacer_cache.clear()
+        self._magic_links.clear()
+        new_timeline = []
+        for p in self.plugin_manager.getPluginsOfCategory('PostScanner'):
+            timeline = p.plugin_object.scan_paths(changed_paths)
+            if timeline is None:
+                return self.scan_posts(really=True, ignore_quit=ignore_quit)
+            new_timeline.extend(timeline)
+
+        # Posts are replaced if any of their files changed
+        resolver = utils.get_translation_resolver(self.config)
+
+        def untranslated_name(path):
+            """Return the path of the untranslated file, without extension."""
+            return os.path.splitext(resolver.candidate(path, self.config['DEFAULT_LANG']))[0]
+
+        changed_names = set(untranslated_name(path) for path in changed_paths)
+        changed_names.update(untranslated_name(post.source_path) for post in new_timeline)
+        old_timeline = [post for post in self.timeline if untranslated_name(post.source_path) in changed_names]
+        if not old_timeline and not new_timeline:
+            return
+
+        for post in old_timeline:
+            self._unclassify_post(post)
+        old_set = set(old_timeline)
+        for thing in self.timeline, self.posts, self.all_posts, self.pages:
+            thing[:] = [post for post in thing if post not in old_set]
+        self.timeline.extend(new_timeline)
+
+        # The category tree was flattened by _sort_category_hierarchy, so
+        # it is built again from the remaining categories
+        self.category_hierarchy = {}
+        for category_name in self.posts_per_category:
+            current_subtree = self.category_hierarchy
+            for current in self.parse_category_name(category_name):
+                current_subtree = current_subtree.setdefault(current, {})
+
+        quit = False
+        tag_index = _TagIndex()
+        for tag in self.posts_per_tag:
+            tag_index.tag_per_slug.setdefault(utils.slugify(tag, self.config['DEFAULT_LANG']), tag)
+        for lang in self.config['TRANSLATIONS'].keys():
+            tag_index.tags_per_language[lang] = set(self.tags_per_language[lang])
+            tag_index.slugs_per_language[lang] = set(utils.slugify(tag, lang) for tag in self.tags_per_language[lang])
+        for post in new_timeline:
+            if self._classify_post(post, tag_index):
+                quit = True
+
+        for thing in self.timeline, self.posts, self.all_posts, self.pages:
+            self._sort_posts(thing)
+        self._sort_category_hierarchy()
+        self._link_posts()
+
+        if quit and not ignore_quit:
+            sys.exit(1)
+        signal('posts_updated').send(self, added=new_timeline, removed=old_timeline)
+
+    def _classify_post(self, post, tag_index):
+        """Add a post to the post lists and indexes (not the timeline).
+
+        tag_index is the _TagIndex of the tags seen so far.  Returns True
+        if an error was found.
+        """
+        quit = False
+        if post.use_in_feeds:
+            self.posts.append(post)
+            self.posts_per_year[str(post.date.year)].append(post)
+            self.posts_per_month[
+                '{0}/{1:02d}'.format(post.date.year, post.date.month)].append(post)
+            post_tags = set([])
+            for lang in self.config['TRANSLATIONS'].keys():
+                for tag in post.tags_for_language(lang):
+                    _tag_slugified = utils.slugify(tag, lang)
+                    if _tag_slugified in tag_index.slugs_per_language[lang]:
+                        if tag not in self.posts_per_tag:
+                            # Tags that differ only in case
+                            other_tag = tag_index.tag_per_slug[_tag_slugified]
+                            utils.LOGGER.error('You have tags that are too similar: {0} and {1}'.format(tag, other_tag))
+                            utils.LOGGER.error('Tag {0} is used in: {1}'.format(tag, post.source_path))
+                            utils.LOGGER.error('Tag {0} is used in: {1}'.format(other_tag, ', '.join([p.source_path for p in self.posts_per_tag[other_tag]])))
+                            quit = True
+                    else:
+                        tag_index.slugs_per_language[lang].add(_tag_slugified)
+                    if tag not in self.posts_per_tag:
+                        tag_index.tag_per_slug.setdefault(_tag_slugified, tag)
+                    # A post is only processed once, but can have a tag in several languages
+                    if tag not in post_tags:
+                        post_tags.add(tag)
+                        self.posts_per_tag[tag].append(post)
+                    if tag not in tag_index.tags_per_language[lang]:
+                        tag_index.tags_per_language[lang].add(tag)
+                        self.tags_per_language[lang].append(tag)
+            self._add_post_to_category(post, post.meta('category'))
+
+        if post.is_post:
+            # unpublished posts
+            self.all_posts.append(post)
+        else:
+            self.pages.append(post)
+
+        for lang in self.config['TRANSLATIONS'].keys():
+            dest = post.destination_path(lang=lang)
+            src_dest = post.destination_path(lang=lang, extension=post.source_ext())
+            src_file = post.translated_source_path(lang=lang)
+            if dest in self.post_per_file:
+                utils.LOGGER.error('Two posts are trying to generate {0}: {1} and {2}'.format(
+                    dest,
+                    self.post_per_file[dest].source_path,
+                    post.source_path))
+                quit = True
+            if (src_dest in self.post_per_file) and self.config['COPY_SOURCES']:
+                utils.LOGGER.error('Two posts are trying to generate {0}: {1} and {2}'.format(
+                    src_dest,
+                    self.post_per_file[dest].source_path,
+                    post.source_path))
+                quit = True
+            self.post_per_file[dest] = post
+            self.post_per_file[src_dest] = post
+            self.post_per_input_file[src_file] = post
+        return quit
+
+    def _unclassify_post(self, post):
+        """Remove a post from the post lists and indexes built by _classify_post."""
+        def remove_from(index, key):
+            posts = index.get(key)
+            if posts and post in posts:
+                posts.remove(post)
+                if not posts:
+                    del index[key]
+
+        if post.use_in_feeds:
+            remove_from(self.posts_per_year, str(post.date.year))
+            remove_from(self.posts_per_month, '{0}/{1:02d}'.format(post.date.year, post.date.month))
+            for lang in self.config['TRANSLATIONS'].keys():
+                for tag in post.tags_for_language(lang):
+                    remove_from(self.posts_per_tag, tag)
+            category_path = self.parse_category_name(post.meta('category'))
+            for i in range(len(category_path)):
+                remove_from(self.posts_per_category, self.category_path_to_category_name(category_path[:i + 1]))
+            for lang in self.config['TRANSLATIONS'].keys():
+                for tag in post.tags_for_language(lang):
+                    # Keep tags still used by other posts in this language
+                    if tag in self.tags_per_language[lang] and \
+                            not any(tag in p.tags_for_language(lang) for p in self.posts_per_tag.get(tag, [])):
+                        self.tags_per_language[lang].remove(tag)
+
+        for lang in self.config['TRANSLATIONS'].keys():
+            for path in (post.destination_path(lang=lang),
+                         post.destination_path(lang=lang, extension=post.source_ext())):
+                if self.post_per_file.get(path) is post:
+                    del self.post_per_file[path]
+            src_file = post.translated_source_path(lang=lang)
+            if self.post_per_input_file.get(src_file) is post:
+                del self.post_per_input_file[src_file]
+
+    @staticmethod
+    def _sort_posts(posts):
+        """Sort a list of posts in place, newest first."""
+        posts.sort(key=lambda p:
+                   (int(p.meta('priority')) if p.meta('priority') else 0,
+                    p.date, p.source_path))
+        posts.reverse()
+
+    def _link_posts(self):
+        """Set the previous and next posts of all posts."""
+        for i, p in enumerate(self.posts[1:]):
+            p.next_post = self.posts[i]
+        for i, p in enumerate(self.posts[:-1]):
+            p.prev_post = self.posts[i + 1]
+        if self.posts:
+            self.posts[0].next_post = None
+            self.posts[-1].prev_post = None
+
     def generic_renderer(self, lang, output_name, template_name, filters, file_deps=None, uptodate_deps=None, context=None, context_deps_remove=None, post_deps_dict=None, url_type=None, is_fragment=False):
         """Helper function for rendering pages and post lists and other related pages.
 
@@ -2119,10 +2416,8 @@ class Nikola(object):
         for k, v in self.GLOBAL_CONTEXT['template_hooks'].items():
             deps_dict['||template_hooks|{0}||'.format(k)] = v._items
 
-        for k in self._GLOBAL_CONTEXT_TRANSLATABLE:
-            deps_dict[k] = deps_dict['global'][k](lang)
-
-        deps_dict['navigation_links'] = deps_dict['global']['navigation_links'](lang)
+        # Translated values of the global context, and navigation_links
+        deps_dict.update(self._get_language_context(lang)[1])
 
         task = {
             'name': os.path.normpath(output_name),
@@ -2233,11 +2528,7 @@ class Nikola(object):
         deps_context["posts"] = [(p.meta[lang]['title'], p.permalink(lang)) for p in
                                  posts]
         deps_context["global"] = self.GLOBAL_CONTEXT
-
-        for k in self._GLOBAL_CONTEXT_TRANSLATABLE:
-            deps_context[k] = deps_context['global'][k](lang)
-
-        deps_context['navigation_links'] = deps_context['global']['navigation_links'](lang)
+        deps_context.update(self._get_language_context(lang)[1])
 
         nslist = {}
         if context["is_feed_stale"] or "feedpagenum" in context and (not context["feedpagenum"] == context["feedpagecount"] - 1 and not context["feedpagenum"] == 0):
@@ -2293,40 +2584,14 @@ class Nikola(object):
 
         def atom_post_text(post, text):
             if not self.config["FEED_PLAIN"]:
-                if self.config["FEED_PREVIEWIMAGE"] and 'previewimage' in post.meta[lang] and post.meta[lang]['previewimage'] not in text:
-                    text = "<figure><img src=\"{}\"></figure> {}".format(post.meta[lang]['previewimage'], text)
-
-                # FIXME: this is duplicated with code in Post.text() and generic_rss_renderer
-                try:
-                    doc = lxml.html.document_fromstring(text)
-                    doc.rewrite_links(lambda dst: self.url_replacer(post.permalink(lang), dst, lang, 'absolute'))
-                    try:
-                        body = doc.body
-                        text = (body.text or '') + ''.join(
-                            [lxml.html.tostring(child, encoding='unicode')
-                                for child in body.iterchildren()])
-                    except IndexError:  # No body there, it happens sometimes
-                        text = ''
-                except lxml.etree.ParserError as e:
-                    if str(e) == "Document is empty":
-                        text = ""
-                    else:  # let other errors raise
-                        raise(e)
+                text = self.feed_item_html(post, lang, text, post.permalink(lang))
             return text.strip()
 
-        for post in posts:
-            summary = atom_post_text(post, post.text(lang, teaser_only=True,
-                                                     strip_html=self.config["FEED_PLAIN"],
-                                                     feed_read_more_link=True,
-                                                     feed_links_append_query=feed_append_query))
-            content = None
-            if not self.config["FEED_TEASERS"]:
-                content = atom_post_text(post, post.text(lang, teaser_only=self.config["FEED_TEASERS"],
-                                                         strip_html=self.config["FEED_PLAIN"],
-                                                         feed_read_more_link=True,
-                                                         feed_links_append_query=feed_append_query))
-
-            entry_root = lxml.etree.SubElement(feed_root, "entry")
+        def atom_entry(post, summary, content):
+            summary = atom_post_text(post, summary)
+            if content is not None:
+                content = atom_post_text(post, content)
+            entry_root = lxml.etree.Element("entry")
             entry_title = lxml.etree.SubElement(entry_root, "title")
             entry_title.text = post.title(lang)
             entry_id = lxml.etree.SubElement(entry_root, "id")
@@ -2358,14 +2623,52 @@ class Nikola(object):
                 entry_category = lxml.etree.SubElement(entry_root, "category")
                 entry_category.set("term", utils.slugify(category, lang))
                 entry_category.set("label", category)
+            return entry_root
+
+        def atom_entry_xml(post):
+            """Return an entry as it appears in the serialized feed."""
+            summary = post.text(lang, teaser_only=True,
+                                strip_html=self.config["FEED_PLAIN"],
+                                feed_read_more_link=True,
+                                feed_links_append_query=feed_append_query)
+            content = None
+            if not self.config["FEED_TEASERS"]:
+                content = post.text(lang, teaser_only=self.config["FEED_TEASERS"],
+                                    strip_html=self.config["FEED_PLAIN"],
+                                    feed_read_more_link=True,
+                                    feed_links_append_query=feed_append_query)
+            # Entries are the same in all the feeds a post appears in.
+            # The key has everything the entry shows, so metadata changes
+            # (title, dates, author, tags, slug) are never served stale;
+            # texts are only in it as digests, to keep the keys small.
+            cache = self.config.get('__post_text_cache__')
+            key = ('atom_entry', post.source_path, lang, feed_append_query, _text_digest(summary), _text_digest(content),
+                   post.title(lang), post.permalink(lang, absolute=True), post.author(lang),
+                   post.formatted_date('webiso'), post.formatted_updated('webiso'),
+                   tuple(post.tags_for_language(lang)))
+            entry = None if cache is None else cache.get(key)
+            if entry is None:
+                # Indented like a child of the feed
+                parent = lxml.etree.Element("feed")
+                parent.append(atom_entry(post, summary, content))
+                entry = lxml.etree.tostring(parent, encoding="unicode", pretty_print=True)
+                entry = entry[len("<feed>\n"):-len("</feed>\n")]
+                if cache is not None:
+                    cache[key] = entry
+            return entry
 
         dst_dir = os.path.dirname(output_path)
         utils.makedirs(dst_dir)
         with io.open(output_path, "w+", encoding="utf-8") as atom_file:
+            # Write the feed without its end tag, then the entries one by one
             data = lxml.etree.tostring(feed_root.getroottree(), encoding="UTF-8", pretty_print=True, xml_declaration=True)
             if isinstance(data, utils.bytes_str):
                 data = data.decode('utf-8')
-            atom_file.write(data)
+            head, tail = data.rsplit("</feed>", 1)
+            atom_file.write(head)
+            for post in posts:
+                atom_file.write(atom_entry_xml(post))
+            atom_file.write("</feed>" + tail)
 
     def generic_index_renderer(self, lang, posts, indexes_title, template_name, context_source, kw, basename, page_link, page_path, additional_dependencies=[]):
         """Create an index page.
@@ -2510,10 +2813,17 @@ class Nikola(object):
                 kw['feed_teasers'] = self.config['FEED_TEASERS']
                 kw['feed_plain'] = self.config['FEED_PLAIN']
                 kw['feed_previewimage'] = self.config['FEED_PREVIEWIMAGE']
+                # What this page of the feed shows: when a page is added,
+                # only the pages whose links change are rendered again
+                feed_deps = dict((k, context.get(k)) for k in (
+                    'title', 'description', 'permalink', 'feedlink', 'prevfeedlink',
+                    'nextfeedlink', 'currentfeedlink', 'feedpagenum'))
+                feed_deps['feedpagelast'] = i == num_pages - 1
+                feed_deps['posts'] = [(p.meta[lang]['title'], p.permalink(lang)) for p in post_list]
                 atom_task = {
                     "basename": basename,
                     "name": atom_output_name,
-                    "file_dep": sorted([_.base_path for _ in post_list]),
+                    "file_dep": sorted(set([dep for p in post_list for dep in p.deps(lang)])),
                     "task_dep": ['render_posts'],
                     "targets": [atom_output_name],
                     "actions": [(self.atom_feed_renderer,
@@ -2523,7 +2833,8 @@ class Nikola(object):
                                  kw['filters'],
                                  context,))],
                     "clean": True,
-                    "uptodate": [utils.config_changed(kw, 'nikola.nikola.Nikola.atom_feed_renderer')] + additional_dependencies
+                    "uptodate": [utils.config_changed({1: kw, 2: feed_deps}, 'nikola.nikola.Nikola.atom_feed_renderer')] +
+                    [dep for p in post_list for dep in p.deps_uptodate(lang)] + additional_dependencies
                 }
                 yield utils.apply_filters(atom_task, kw['filters'])
 
@@ -2696,3 +3007,16 @@ def workaround_empty_LC_ALL_posix():
             os.environ['LC_ALL'] = lc_time
     except Exception:
         pass
+
+
+class _TagIndex(object):
+    """Slug-keyed indexes of the tags seen while classifying posts."""
+
+    def __init__(self):
+        """Create empty indexes."""
+        # Slugs of the tags used in each language
+        self.slugs_per_language = defaultdict(set)
+        # Tags used in each language (the contents of Nikola.tags_per_language)
+        self.tags_per_language = defaultdict(set)
+        # The first tag in Nikola.posts_per_tag for each slug
+        self.tag_per_slug = {}
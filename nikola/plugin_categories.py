@@ -95,6 +95,15 @@ class PostScanner(BasePlugin):
         """Create a list of posts from some source. Returns a list of Post objects."""
         raise NotImplementedError()
 
+    def scan_paths(self, source_paths):
+        """Create a list of posts for the posts some changed files belong to.
+
+        source_paths is a set of paths of added, modified or removed files.
+        Returns a list of Post objects, or None if the plugin cannot scan
+        only some files (all posts are scanned again in that case).
+        """
+        return None
+
 
 class Command(BasePlugin, DoitCommand):
     """Doit command implementation."""
@@ -230,6 +239,28 @@ class TemplateSystem(BasePlugin):
         """Inject the directory with the lowest priority in the template search mechanism."""
         raise NotImplementedError()
 
+    def url(self, context, dst):
+        """Return the link dst as it should appear in the page rendered with context.
+
+        Available to templates as ``url(dst)``.  Links are left alone if the
+        template is not being rendered to a file.
+        """
+        src = context.get('url_source')
+        if src is None:
+            return dst
+        return self.site.url_replacer(src, dst, context['lang'], context['url_type'])
+
+    def rewrite_links(self, context, data):
+        """Return the HTML data with its links as they should appear in the page rendered with context.
+
+        Available to templates as ``rewrite_links(html)``, for HTML that
+        comes from elsewhere, like the text of posts.
+        """
+        src = context.get('url_source')
+        if src is None:
+            return data
+        return self.site.rewrite_html_links(data, src, context['lang'], context['url_type'])
+
     def get_template_path(self, template_name):
         """Get the path to a template or return None."""
         raise NotImplementedError()
@@ -245,6 +276,25 @@ class TaskMultiplier(BasePlugin):
         return []
 
 
+class _ExtraDependencies(object):
+    """Callable returning the contents of the .dep file of a post.
+
+    Used instead of a closure, as one is created for every post and language.
+    """
+
+    __slots__ = ('compiler', 'post', 'lang')
+
+    def __init__(self, compiler, post, lang):
+        """Initialize the dependency."""
+        self.compiler = compiler
+        self.post = post
+        self.lang = lang
+
+    def __call__(self):
+        """Read the .dep file."""
+        return self.compiler._read_extra_deps(self.post, self.lang)
+
+
 class PageCompiler(BasePlugin):
     """Compile text files into HTML."""
 
@@ -280,14 +330,8 @@ class PageCompiler(BasePlugin):
 
     def register_extra_dependencies(self, post):
         """Add dependency to post object to check .dep file."""
-        def create_lambda(lang):
-            # We create a lambda like this so we can pass `lang` to it, because if we didn’t
-            # add that function, `lang` would always be the last language in TRANSLATIONS.
-            # (See http://docs.python-guide.org/en/latest/writing/gotchas/#late-binding-closures)
-            return lambda: self._read_extra_deps(post, lang)
-
         for lang in self.site.config['TRANSLATIONS']:
-            post.add_dependency(create_lambda(lang), 'fragment', lang=lang)
+            post.add_dependency(_ExtraDependencies(self, post, lang), 'fragment', lang=lang)
 
     def get_extra_targets(self, post, lang, dest):
         """Return a list of extra targets for the render_posts task when compiling the post for the specified language."""
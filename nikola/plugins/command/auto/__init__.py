@@ -148,6 +148,15 @@ class CommandAuto(Command):
         # Run an initial build so we are up-to-date
         subprocess.call(self.cmd_arguments)
 
+        # Changed posts are scanned again with update_posts and the site
+        # is rebuilt in this process, until something else (configuration,
+        # themes, plugins) changes.
+        self.post_folders = set(os.path.dirname(item[0]) for item in self.site.config['post_pages'])
+        self.data_folders = set(self.post_folders)
+        for option in ('FILES_FOLDERS', 'GALLERY_FOLDERS', 'LISTINGS_FOLDERS'):
+            self.data_folders.update(self.site.config[option])
+        self.in_process = True
+
         port = options and options.get('port')
         self.snippet = '''<script>document.write('<script src="http://'
             + (location.host || 'localhost').split(':')[0]
@@ -274,6 +283,14 @@ class CommandAuto(Command):
                 os.path.isdir(event_path)):  # Skip on folders, these are usually duplicates
             return
         self.logger.info('REBUILDING SITE (from {0})'.format(event_path))
+        if self.in_process and self.in_folders(event_path, self.post_folders):
+            try:
+                return self.rebuild_posts(event)
+            except Exception:
+                self.logger.exception('Could not rebuild the site in this process')
+                self.in_process = False
+        elif not self.in_folders(event_path, self.data_folders):
+            self.in_process = False
         p = subprocess.Popen(self.cmd_arguments, stderr=subprocess.PIPE)
         error = p.stderr.read()
         errord = error.decode('utf-8')
@@ -283,6 +300,37 @@ class CommandAuto(Command):
         else:
             print(errord)
 
+    def in_folders(self, path, folders):
+        """Tell if path is in one of the folders of the site."""
+        path = os.path.relpath(path)
+        if path.startswith(os.pardir + os.sep) or path == os.path.relpath(self.site.configuration_filename or 'conf.py'):
+            return False
+        for folder in folders:
+            folder = os.path.normpath(folder)
+            if folder == os.curdir or path.startswith(folder + os.sep):
+                return True
+        return False
+
+    def rebuild_posts(self, event):
+        """Scan the posts a changed file belongs to again and rebuild the site in this process."""
+        added, modified, removed = [], [], []
+        if event.event_type == 'moved':
+            removed.append(os.path.relpath(event.src_path))
+            added.append(os.path.relpath(event.dest_path))
+        elif event.event_type == 'created':
+            added.append(os.path.relpath(event.src_path))
+        elif event.event_type == 'deleted':
+            removed.append(os.path.relpath(event.src_path))
+        else:
+            modified.append(os.path.relpath(event.src_path))
+        try:
+            self.site.update_posts(added=added, modified=modified, removed=removed)
+            failed = self.site.doit.run(['build'], init_plugins=False) != 0
+        except SystemExit:
+            failed = True
+        if failed:
+            error_signal.send(error='Rebuilding the site failed, see the console for details.')
+
     def do_refresh(self, event):
         """Refresh the page."""
         # Move events have a dest_path, some editors like gedit use a
@@ -27,58 +27,296 @@
 """The default post scanner."""
 
 from __future__ import unicode_literals, print_function
+import errno
+import fnmatch
 import glob
+import hashlib
+import io
+import json
+import multiprocessing
 import os
+import re
+import shutil
 import sys
+import tempfile
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir  # NOQA
+    except ImportError:
+        scandir = None
 
 from nikola.plugin_categories import PostScanner
-from nikola import utils
-from nikola.post import Post
+from nikola import __version__, utils
+from nikola.post import Post, get_metadata_signature
 
 LOGGER = utils.get_logger('scan_posts', utils.STDERR_HANDLER)
 
 
+class _ListdirEntry(object):
+    """A minimal stand-in for os.DirEntry, used when scandir is not available."""
+
+    def __init__(self, dirpath, name):
+        self.name = name
+        self.path = os.path.join(dirpath, name)
+        self._stat = None
+
+    def is_dir(self):
+        return os.path.isdir(self.path)
+
+    def stat(self):
+        if self._stat is None:
+            self._stat = os.stat(self.path)
+        return self._stat
+
+
+def _list_dir(path):
+    """Return the entries of a directory, or an empty list if it cannot be read."""
+    try:
+        if scandir is not None:
+            return list(scandir(path))
+        return [_ListdirEntry(path, name) for name in os.listdir(path)]
+    except OSError:
+        return []
+
+
+def _walk(top):
+    """Walk a directory tree top-down following links, like os.walk.
+
+    Yields ``(dirpath, entries)`` tuples, where entries are ``os.DirEntry``
+    objects (or equivalents), so every directory is listed only once.
+    """
+    entries = _list_dir(top)
+    if not entries and not os.path.isdir(top):
+        return
+    yield top, entries
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if is_dir:
+            for item in _walk(entry.path):
+                yield item
+
+
+def _compile_glob(pattern):
+    """Return a function telling if a file name matches a glob pattern, like glob.glob does."""
+    regex = re.compile(fnmatch.translate(os.path.normcase(pattern)))
+    match_hidden = pattern.startswith('.')
+
+    def matches(name):
+        if name.startswith('.') and not match_hidden:
+            return False
+        return regex.match(os.path.normcase(name)) is not None
+    return matches
+
+
+# State shared with forked worker processes, see ScanPosts._read_records
+_worker_state = {}
+
+
+def _read_record_in_worker(job_index):
+    """Read the metadata record for a scan job in a worker process.
+
+    Returns None on errors, so the post is read again (and the error
+    reported) by the main process.
+    """
+    try:
+        return _worker_state['scanner']._read_record(_worker_state['jobs'][job_index])
+    except Exception:
+        return None
+
+
+class MetadataIndex(object):
+    """An on-disk index of post metadata records, keyed by source path.
+
+    A record is only returned while the signature of the files it was read
+    from (see ``nikola.post.get_metadata_signature``) and the configuration
+    digest it was stored with are unchanged.
+    """
+
+    def __init__(self, path, config_digest):
+        """Load the index stored at path, discarding it if config_digest differs."""
+        self.path = path
+        self.config_digest = config_digest
+        self.entries = {}
+        self.dirty = False
+        if os.path.isfile(path):
+            try:
+                with io.open(path, 'r', encoding='utf-8') as inf:
+                    data = json.load(inf)
+            except ValueError:
+                LOGGER.warn('Ignoring corrupt metadata index {0}'.format(path))
+                data = {}
+            if data.get('config_digest') == config_digest:
+                self.entries = data.get('entries', {})
+
+    def get(self, source_path, signature):
+        """Return the record for source_path, or None if it is missing or stale."""
+        entry = self.entries.get(source_path)
+        if entry is not None and entry['signature'] == signature:
+            return entry['record']
+        return None
+
+    def set(self, source_path, signature, record):
+        """Store the record for source_path, unless it cannot be serialized."""
+        try:
+            json.dumps(record)
+        except TypeError:
+            return
+        self.entries[source_path] = {'signature': signature, 'record': record}
+        self.dirty = True
+
+    def prune(self, seen):
+        """Remove entries for source files not in seen."""
+        for source_path in set(self.entries) - set(seen):
+            del self.entries[source_path]
+            self.dirty = True
+
+    def save(self):
+        """Write the index to disk if it changed."""
+        if not self.dirty:
+            return
+        dname = os.path.dirname(self.path)
+        utils.makedirs(dname)
+        data = json.dumps({'config_digest': self.config_digest, 'entries': self.entries}, sort_keys=True)
+        with tempfile.NamedTemporaryFile(dir=dname or '.', delete=False) as outf:
+            tname = outf.name
+            outf.write(data.encode('utf-8'))
+        shutil.move(tname, self.path)
+        self.dirty = False
+
+
 class ScanPosts(PostScanner):
     """Scan posts in the site."""
 
     name = "scan_posts"
 
-    def scan(self):
-        """Create list of posts from POSTS and PAGES options."""
-        seen = set([])
-        if not self.site.quiet:
-            print("Scanning posts", end='', file=sys.stderr)
+    def _metadata_config_digest(self):
+        """Return a digest of the settings that affect how metadata is read."""
+        config = self.site.config
+        data = json.dumps([
+            __version__,
+            config['FILE_METADATA_REGEXP'],
+            config['UNSLUGIFY_TITLES'],
+            config['USE_SLUGIFY'],
+            config['DEFAULT_LANG'],
+            list(config['TRANSLATIONS'].keys()),
+            config['TRANSLATIONS_PATTERN'],
+            config['COMPILERS'],
+        ], cls=utils.CustomEncoder, sort_keys=True)
+        return hashlib.md5(data.encode('utf-8')).hexdigest()
 
-        timeline = []
+    def _make_post(self, job, metadata_record=None):
+        """Create a Post for a scan job."""
+        base_path, rel_dest_dir, use_in_feeds, template_name, destination_translatable = job
+        return Post(
+            base_path,
+            self.site.config,
+            rel_dest_dir,
+            use_in_feeds,
+            self.site.MESSAGES,
+            template_name,
+            self.site.get_compiler(base_path),
+            destination_base=destination_translatable,
+            metadata_record=metadata_record,
+            lazy=self.site.config['LAZY_POSTS']
+        )
+
+    def _read_record(self, job):
+        """Read the metadata record for a scan job, without creating its Post."""
+        base_path = job[0]
+        return Post.read_metadata_record(base_path, self.site.config, self.site.get_compiler(base_path),
+                                         lazy=self.site.config['LAZY_POSTS'])
+
+    def _read_records(self, jobs, job_indexes):
+        """Read the metadata records for some jobs using SCAN_WORKERS processes.
+
+        Returns a dict mapping job indexes to records (or None if they
+        could not be read).  Workers are forked, so they share the site
+        and the job list with this process and only send records back.
+        """
+        workers = min(self.site.config['SCAN_WORKERS'] or 1, len(job_indexes))
+        if workers < 2 or not hasattr(os, 'fork'):
+            return {}
+        try:
+            context = multiprocessing.get_context('fork')
+        except AttributeError:  # Python 2 always forks
+            context = multiprocessing
+        _worker_state.update(scanner=self, jobs=jobs)
+        pool = context.Pool(workers)
+        try:
+            chunksize = max(1, len(job_indexes) // (workers * 4))
+            records = pool.map(_read_record_in_worker, job_indexes, chunksize)
+        finally:
+            pool.close()
+            pool.join()
+            _worker_state.clear()
+        return dict(zip(job_indexes, records))
 
+    def _find_jobs(self, dirs=None):
+        """Find the post sources in POSTS and PAGES.
+
+        Returns the list of scan jobs (see ``_make_post``) and the
+        directory listings used.  If dirs is given, only these directories
+        are listed, instead of all POSTS and PAGES directories.
+        """
+        seen = set([])
+        jobs = []
+        config = self.site.config
+        resolver = utils.get_translation_resolver(config)
+        other_langs = [lang for lang in config['TRANSLATIONS'].keys() if lang != config['DEFAULT_LANG']]
+        # Directory listings, so file stats can be taken from them later
+        listings = {}
         for wildcard, destination, template_name, use_in_feeds in \
-                self.site.config['post_pages']:
-            if not self.site.quiet:
+                config['post_pages']:
+            if dirs is None and not self.site.quiet:
                 print(".", end='', file=sys.stderr)
-            destination_translatable = utils.TranslatableSetting('destination', destination, self.site.config['TRANSLATIONS'])
+            destination_translatable = utils.TranslatableSetting('destination', destination, config['TRANSLATIONS'])
             dirname = os.path.dirname(wildcard)
-            for dirpath, _, _ in os.walk(dirname, followlinks=True):
+            file_glob = os.path.basename(wildcard)  # *.rst
+            is_untranslated = _compile_glob(file_glob)
+            # Translated globs (*.LANG.rst) that stay in the same directory
+            # are matched against the listing, any others with glob.glob
+            is_translated = []
+            other_globs = []
+            for lang in other_langs:
+                lang_glob = resolver.candidate(os.path.join(dirname, file_glob), lang)
+                if os.path.dirname(lang_glob) == dirname:
+                    is_translated.append(_compile_glob(os.path.basename(lang_glob)))
+                else:
+                    other_globs.append(lang)
+
+            if dirs is None:
+                walk = _walk(dirname)
+            else:
+                walk = [(dirpath, _list_dir(dirpath)) for dirpath in sorted(dirs)
+                        if dirname and (dirpath == dirname or dirpath.startswith(os.path.join(dirname, '')))]
+            for dirpath, entries in walk:
                 rel_dest_dir = os.path.relpath(dirpath, dirname)
-                # Get all the untranslated paths
-                dir_glob = os.path.join(dirpath, os.path.basename(wildcard))  # posts/foo/*.rst
-                untranslated = glob.glob(dir_glob)
-                # And now get all the translated paths
+                listings[dirpath] = dict((entry.name, entry) for entry in entries)
+                untranslated = []
                 translated = set([])
-                for lang in self.site.config['TRANSLATIONS'].keys():
-                    if lang == self.site.config['DEFAULT_LANG']:
-                        continue
-                    lang_glob = utils.get_translation_candidate(self.site.config, dir_glob, lang)  # posts/foo/*.LANG.rst
-                    translated = translated.union(set(glob.glob(lang_glob)))
-                # untranslated globs like *.rst often match translated paths too, so remove them
-                # and ensure x.rst is not in the translated set
-                untranslated = set(untranslated) - translated
-
-                # also remove from translated paths that are translations of
-                # paths in untranslated_list, so x.es.rst is not in the untranslated set
+                for entry in entries:
+                    if any(matches(entry.name) for matches in is_translated):
+                        translated.add(entry.path)
+                    elif is_untranslated(entry.name):
+                        untranslated.append(entry.path)
+                dir_glob = os.path.join(dirpath, file_glob)  # posts/foo/*.rst
+                for lang in other_globs:
+                    lang_glob = resolver.candidate(dir_glob, lang)
+                    translated.update(glob.glob(lang_glob))
+                if other_globs:
+                    untranslated = [p for p in untranslated if p not in translated]
+
+                # remove from translated paths that are translations of
+                # paths in untranslated, so x.es.rst is not added on its own
                 for p in untranslated:
-                    translated = translated - set([utils.get_translation_candidate(self.site.config, p, l) for l in self.site.config['TRANSLATIONS'].keys()])
+                    translated.difference_update(resolver.candidate(p, l) for l in other_langs)
 
-                full_list = list(translated) + list(untranslated)
+                full_list = sorted(translated) + sorted(untranslated)
                 # We eliminate from the list the files inside any .ipynb folder
                 full_list = [p for p in full_list
                              if not any([x.startswith('.')
@@ -89,20 +327,81 @@ class ScanPosts(PostScanner):
                         continue
                     else:
                         seen.add(base_path)
-                    try:
-                        post = Post(
-                            base_path,
-                            self.site.config,
-                            rel_dest_dir,
-                            use_in_feeds,
-                            self.site.MESSAGES,
-                            template_name,
-                            self.site.get_compiler(base_path),
-                            destination_base=destination_translatable
-                        )
-                        timeline.append(post)
-                    except Exception as err:
-                        LOGGER.error('Error reading post {}'.format(base_path))
-                        raise err
+                    jobs.append((base_path, rel_dest_dir, use_in_feeds, template_name, destination_translatable))
+        return jobs, listings
+
+    def _make_posts(self, jobs, listings, prune=False):
+        """Create the posts for a list of scan jobs, using the metadata index if enabled.
+
+        If prune is True, the index entries of other posts are removed.
+        """
+        config = self.site.config
+
+        def stat(path):
+            """Stat a file, using the directory listings if possible."""
+            dirpath, name = os.path.split(path)
+            if dirpath not in listings:
+                return os.stat(path)
+            try:
+                return listings[dirpath][name].stat()
+            except KeyError:
+                raise OSError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+
+        index = None
+        records = [None] * len(jobs)
+        signatures = [None] * len(jobs)
+        if config['CACHE_POST_METADATA']:
+            index = MetadataIndex(os.path.join(config['CACHE_FOLDER'], 'post_metadata.json'),
+                                  self._metadata_config_digest())
+            for i, job in enumerate(jobs):
+                signatures[i] = get_metadata_signature(config, job[0], stat)
+                records[i] = index.get(job[0], signatures[i])
+                if records[i] is not None:
+                    # Up to date, no need to store it again
+                    signatures[i] = None
+
+        # Read metadata that is not in the index in parallel, if enabled
+        missing = [i for i, record in enumerate(records) if record is None]
+        for i, record in self._read_records(jobs, missing).items():
+            records[i] = record
+
+        timeline = []
+        for i, job in enumerate(jobs):
+            try:
+                post = self._make_post(job, records[i])
+                timeline.append(post)
+            except Exception as err:
+                LOGGER.error('Error reading post {}'.format(job[0]))
+                raise err
+            if index is not None and signatures[i] is not None:
+                index.set(job[0], signatures[i], post.metadata_record)
+
+        if index is not None:
+            if prune:
+                index.prune(job[0] for job in jobs)
+            index.save()
 
         return timeline
+
+    def scan(self):
+        """Create list of posts from POSTS and PAGES options."""
+        if not self.site.quiet:
+            print("Scanning posts", end='', file=sys.stderr)
+        jobs, listings = self._find_jobs()
+        return self._make_posts(jobs, listings, prune=True)
+
+    def scan_paths(self, source_paths):
+        """Create posts for the POSTS and PAGES that any of source_paths belong to."""
+        config = self.site.config
+        resolver = utils.get_translation_resolver(config)
+
+        def untranslated_name(path):
+            """Return the path of the untranslated file, without extension."""
+            return os.path.splitext(resolver.candidate(path, config['DEFAULT_LANG']))[0]
+
+        names = set(untranslated_name(path) for path in source_paths)
+        dirs = set(os.path.dirname(resolver.candidate(path, lang))
+                   for path in source_paths for lang in config['TRANSLATIONS'].keys())
+        jobs, listings = self._find_jobs(dirs)
+        jobs = [job for job in jobs if untranslated_name(job[0]) in names]
+        return self._make_posts(jobs, listings)
@@ -44,6 +44,46 @@ class TaxonomiesClassifier(SignalHandler):
 
     name = "render_taxonomies"
 
+    def _get_classifications(self, site, taxonomy, post):
+        """Return a dict mapping languages to the set of classifications the post is in.
+
+        If the taxonomy includes posts from subhierarchies, the parent
+        classifications are included too.
+        """
+        result = {}
+        if not post.use_in_feeds:
+            return result
+        if not (taxonomy.apply_to_posts if post.is_post else taxonomy.apply_to_pages):
+            return result
+        for lang in site.config['TRANSLATIONS'].keys():
+            # Extract classifications for this language
+            classifications = taxonomy.classify(post, lang)
+            if not taxonomy.more_than_one_classifications_per_post and len(classifications) > 1:
+                raise ValueError("Too many {0} classifications for post {1}".format(taxonomy.classification_name, post.source_path))
+            result[lang] = set()
+            for classification in classifications:
+                while True:
+                    result[lang].add(classification)
+                    if not taxonomy.include_posts_from_subhierarchies or not taxonomy.has_hierarchy:
+                        break
+                    classification_path = taxonomy.extract_hierarchy(classification)
+                    if len(classification_path) <= 1:
+                        if len(classification_path) == 0 or not taxonomy.include_posts_into_hierarchy_root:
+                            break
+                    classification = taxonomy.recombine_classification_from_hierarchy(classification_path[:-1])
+        return result
+
+    @staticmethod
+    def _sort_posts(taxonomy, posts, classification, lang):
+        """Return the posts of a classification as a sorted list."""
+        posts = list(posts)
+        posts.sort(key=lambda p:
+                   (int(p.meta('priority')) if p.meta('priority') else 0,
+                    p.date, p.source_path))
+        posts.reverse()
+        taxonomy.sort_posts(posts, classification, lang)
+        return posts
+
     def _do_classification(self, site):
         # Needed to avoid strange errors during tests
         if site is not self.site:
@@ -59,27 +99,11 @@ class TaxonomiesClassifier(SignalHandler):
 
         # Classify posts
         for post in site.timeline:
-            if not post.use_in_feeds:
-                continue
             for taxonomy in taxonomies:
-                if taxonomy.apply_to_posts if post.is_post else taxonomy.apply_to_pages:
-                    classifications = {}
-                    for lang in site.config['TRANSLATIONS'].keys():
-                        # Extract classifications for this language
-                        classifications[lang] = taxonomy.classify(post, lang)
-                        if not taxonomy.more_than_one_classifications_per_post and len(classifications[lang]) > 1:
-                            raise ValueError("Too many {0} classifications for post {1}".format(taxonomy.classification_name, post.source_path))
-                        # Add post to sets
-                        for classification in classifications[lang]:
-                            while True:
-                                site.posts_per_classification[taxonomy.classification_name][lang][classification].add(post)
-                                if not taxonomy.include_posts_from_subhierarchies or not taxonomy.has_hierarchy:
-                                    break
-                                classification_path = taxonomy.extract_hierarchy(classification)
-                                if len(classification_path) <= 1:
-                                    if len(classification_path) == 0 or not taxonomy.include_posts_into_hierarchy_root:
-                                        break
-                                classification = taxonomy.recombine_classification_from_hierarchy(classification_path[:-1])
+                for lang, classifications in self._get_classifications(site, taxonomy, post).items():
+                    # Add post to sets
+                    for classification in classifications:
+                        site.posts_per_classification[taxonomy.classification_name][lang][classification].add(post)
 
         # Sort everything.
         site.page_count_per_classification = {}
@@ -97,64 +121,121 @@ class TaxonomiesClassifier(SignalHandler):
                 site.page_count_per_classification[taxonomy.classification_name][lang] = {}
                 # Convert sets to lists and sort them
                 for classification in list(posts_per_classification.keys()):
-                    posts = list(posts_per_classification[classification])
-                    posts.sort(key=lambda p:
-                               (int(p.meta('priority')) if p.meta('priority') else 0,
-                                p.date, p.source_path))
-                    posts.reverse()
-                    taxonomy.sort_posts(posts, classification, lang)
-                    posts_per_classification[classification] = posts
-            # Create hierarchy information
-            if taxonomy.has_hierarchy:
-                site.hierarchy_per_classification[taxonomy.classification_name] = {}
-                site.flat_hierarchy_per_classification[taxonomy.classification_name] = {}
-                site.hierarchy_lookup_per_classification[taxonomy.classification_name] = {}
-                for lang, posts_per_classification in site.posts_per_classification[taxonomy.classification_name].items():
-                    # Compose hierarchy
-                    hierarchy = {}
-                    for classification in posts_per_classification.keys():
-                        hier = taxonomy.extract_hierarchy(classification)
-                        node = hierarchy
-                        for he in hier:
-                            if he not in node:
-                                node[he] = {}
-                            node = node[he]
-                    hierarchy_lookup = {}
-
-                    def create_hierarchy(hierarchy, parent=None, level=0):
-                        """Create hierarchy."""
-                        result = {}
-                        for name, children in hierarchy.items():
-                            node = utils.TreeNode(name, parent)
-                            node.children = create_hierarchy(children, node, level + 1)
-                            node.classification_path = [pn.name for pn in node.get_path()]
-                            node.classification_name = taxonomy.recombine_classification_from_hierarchy(node.classification_path)
-                            hierarchy_lookup[node.classification_name] = node
-                            result[node.name] = node
-                        classifications = natsort.natsorted(result.keys(), alg=natsort.ns.F | natsort.ns.IC)
-                        taxonomy.sort_classifications(classifications, lang, level=level)
-                        return [result[classification] for classification in classifications]
-
-                    root_list = create_hierarchy(hierarchy)
-                    if '' in posts_per_classification:
-                        node = utils.TreeNode('', parent=None)
-                        node.children = root_list
-                        node.classification_path = []
-                        node.classification_name = ''
-                        hierarchy_lookup[node.name] = node
-                        root_list = [node]
-                    flat_hierarchy = utils.flatten_tree_structure(root_list)
-                    # Store result
-                    site.hierarchy_per_classification[taxonomy.classification_name][lang] = root_list
-                    site.flat_hierarchy_per_classification[taxonomy.classification_name][lang] = flat_hierarchy
-                    site.hierarchy_lookup_per_classification[taxonomy.classification_name][lang] = hierarchy_lookup
-                taxonomy.postprocess_posts_per_classification(site.posts_per_classification[taxonomy.classification_name],
+                    posts_per_classification[classification] = self._sort_posts(
+                        taxonomy, posts_per_classification[classification], classification, lang)
+            self._create_hierarchy(site, taxonomy)
+
+        if self._check_collisions(site, taxonomies):
+            sys.exit(1)
+
+    def _update_classification(self, site, added, removed):
+        """Update the classification after posts were added to or removed from the timeline.
+
+        Only the post lists of the classifications of these posts are
+        changed; hierarchies and collisions are checked again only if
+        classifications were created or removed.
+        """
+        if site is not self.site:
+            return
+
+        taxonomies = site.taxonomy_plugins.values()
+        removed = set(removed)
+        any_created_or_removed = False
+        for taxonomy in taxonomies:
+            all_posts_per_classification = site.posts_per_classification[taxonomy.classification_name]
+            changed = defaultdict(set)
+            added_per_classification = defaultdict(list)
+            for post in removed:
+                for lang, classifications in self._get_classifications(site, taxonomy, post).items():
+                    changed[lang].update(classifications)
+            for post in added:
+                for lang, classifications in self._get_classifications(site, taxonomy, post).items():
+                    changed[lang].update(classifications)
+                    for classification in classifications:
+                        added_per_classification[lang, classification].append(post)
+            if not any(changed.values()):
+                continue
+
+            created_or_removed = False
+            for lang, classifications in changed.items():
+                posts_per_classification = all_posts_per_classification[lang]
+                implicit_classifications = taxonomy.get_implicit_classifications(lang)
+                site.page_count_per_classification[taxonomy.classification_name][lang] = {}
+                for classification in classifications:
+                    old_posts = posts_per_classification.get(classification)
+                    posts = [p for p in old_posts or [] if p not in removed]
+                    posts.extend(added_per_classification[lang, classification])
+                    if posts or classification in implicit_classifications:
+                        posts_per_classification[classification] = self._sort_posts(taxonomy, posts, classification, lang)
+                        created_or_removed = created_or_removed or old_posts is None
+                    elif old_posts is not None:
+                        del posts_per_classification[classification]
+                        created_or_removed = True
+
+            if created_or_removed or not taxonomy.has_hierarchy:
+                self._create_hierarchy(site, taxonomy)
+            else:
+                taxonomy.postprocess_posts_per_classification(all_posts_per_classification,
                                                               site.flat_hierarchy_per_classification[taxonomy.classification_name],
                                                               site.hierarchy_lookup_per_classification[taxonomy.classification_name])
-            else:
-                taxonomy.postprocess_posts_per_classification(site.posts_per_classification[taxonomy.classification_name])
+            any_created_or_removed = any_created_or_removed or created_or_removed
 
-        # Check for valid paths and for collisions
+        if any_created_or_removed and self._check_collisions(site, taxonomies):
+            sys.exit(1)
+
+    def _create_hierarchy(self, site, taxonomy):
+        """Create hierarchy information for a taxonomy and let it postprocess its post lists."""
+        if taxonomy.has_hierarchy:
+            site.hierarchy_per_classification[taxonomy.classification_name] = {}
+            site.flat_hierarchy_per_classification[taxonomy.classification_name] = {}
+            site.hierarchy_lookup_per_classification[taxonomy.classification_name] = {}
+            for lang, posts_per_classification in site.posts_per_classification[taxonomy.classification_name].items():
+                # Compose hierarchy
+                hierarchy = {}
+                for classification in posts_per_classification.keys():
+                    hier = taxonomy.extract_hierarchy(classification)
+                    node = hierarchy
+                    for he in hier:
+                        if he not in node:
+                            node[he] = {}
+                        node = node[he]
+                hierarchy_lookup = {}
+
+                def create_hierarchy(hierarchy, parent=None, level=0):
+                    """Create hierarchy."""
+                    result = {}
+                    for name, children in hierarchy.items():
+                        node = utils.TreeNode(name, parent)
+                        node.children = create_hierarchy(children, node, level + 1)
+                        node.classification_path = [pn.name for pn in node.get_path()]
+                        node.classification_name = taxonomy.recombine_classification_from_hierarchy(node.classification_path)
+                        hierarchy_lookup[node.classification_name] = node
+                        result[node.name] = node
+                    classifications = natsort.natsorted(result.keys(), alg=natsort.ns.F | natsort.ns.IC)
+                    taxonomy.sort_classifications(classifications, lang, level=level)
+                    return [result[classification] for classification in classifications]
+
+                root_list = create_hierarchy(hierarchy)
+                if '' in posts_per_classification:
+                    node = utils.TreeNode('', parent=None)
+                    node.children = root_list
+                    node.classification_path = []
+                    node.classification_name = ''
+                    hierarchy_lookup[node.name] = node
+                    root_list = [node]
+                flat_hierarchy = utils.flatten_tree_structure(root_list)
+                # Store result
+                site.hierarchy_per_classification[taxonomy.classification_name][lang] = root_list
+                site.flat_hierarchy_per_classification[taxonomy.classification_name][lang] = flat_hierarchy
+                site.hierarchy_lookup_per_classification[taxonomy.classification_name][lang] = hierarchy_lookup
+            taxonomy.postprocess_posts_per_classification(site.posts_per_classification[taxonomy.classification_name],
+                                                          site.flat_hierarchy_per_classification[taxonomy.classification_name],
+                                                          site.hierarchy_lookup_per_classification[taxonomy.classification_name])
+        else:
+            taxonomy.postprocess_posts_per_classification(site.posts_per_classification[taxonomy.classification_name])
+
+    def _check_collisions(self, site, taxonomies):
+        """Check for valid paths and for collisions. Returns True if errors were found."""
         taxonomy_outputs = {lang: dict() for lang in site.config['TRANSLATIONS'].keys()}
         quit = False
         for taxonomy in taxonomies:
@@ -190,8 +271,7 @@ class TaxonomiesClassifier(SignalHandler):
                                 quit = True
                         else:
                             taxonomy_outputs[lang][path] = (taxonomy.classification_name, classification, list(posts))
-        if quit:
-            sys.exit(1)
+        return quit
 
     def _get_filtered_list(self, taxonomy, classification, lang):
         """Return the filtered list of posts for this classification and language."""
@@ -315,6 +395,7 @@ class TaxonomiesClassifier(SignalHandler):
         super(TaxonomiesClassifier, self).set_site(site)
         # Add hook for after post scanning
         blinker.signal("scanned").connect(self._do_classification)
+        blinker.signal("posts_updated").connect(self._update_classification)
         # Register path handlers
         for taxonomy in site.taxonomy_plugins.values():
             self._register_path_handlers(taxonomy)
@@ -613,29 +613,36 @@ class Galleries(Task, ImageProcessor):
         else:
             img_list, dest_img_list, img_titles = [], [], []
 
-        items = []
-        for img, srcimg, title in list(zip(dest_img_list, img_list, img_titles))[:self.kw["feed_length"]]:
-            img_size = os.stat(
-                os.path.join(
-                    self.site.config['OUTPUT_FOLDER'], img)).st_size
-            args = {
-                'title': title,
-                'link': make_url(img),
-                'guid': rss.Guid(img, False),
-                'pubDate': self.image_date(srcimg),
-                'enclosure': rss.Enclosure(
-                    make_url(img),
-                    img_size,
-                    mimetypes.guess_type(img)[0]
-                ),
-            }
-            items.append(rss.RSSItem(**args))
+        feed_images = list(zip(dest_img_list, img_list, img_titles))[:self.kw["feed_length"]]
+        if feed_images:
+            # The channel is titled like the last image in the feed
+            title = feed_images[-1][2]
+
+        def items():
+            """Yield the items of the feed, as it is written."""
+            for img, srcimg, img_title in feed_images:
+                img_size = os.stat(
+                    os.path.join(
+                        self.site.config['OUTPUT_FOLDER'], img)).st_size
+                args = {
+                    'title': img_title,
+                    'link': make_url(img),
+                    'guid': rss.Guid(img, False),
+                    'pubDate': self.image_date(srcimg),
+                    'enclosure': rss.Enclosure(
+                        make_url(img),
+                        img_size,
+                        mimetypes.guess_type(img)[0]
+                    ),
+                }
+                yield rss.RSSItem(**args)
+
         rss_obj = rss.RSS2(
             title=title,
             link=make_url(permalink),
             description='',
             lastBuildDate=datetime.datetime.utcnow(),
-            items=items,
+            items=items(),
             generator='https://getnikola.com/',
             language=lang
         )
@@ -645,8 +652,6 @@ class Galleries(Task, ImageProcessor):
         rss_obj.rss_attrs["xmlns:atom"] = "http://www.w3.org/2005/Atom"
         dst_dir = os.path.dirname(output_path)
         utils.makedirs(dst_dir)
-        with io.open(output_path, "w+", encoding="utf-8") as rss_file:
-            data = rss_obj.to_xml(encoding='utf-8')
-            if isinstance(data, utils.bytes_str):
-                data = data.decode('utf-8')
-            rss_file.write(data)
+        # The SAX writer encodes the feed itself, on Python 2 and 3 alike
+        with io.open(output_path, "wb") as rss_file:
+            rss_obj.write_xml(rss_file, encoding='utf-8')
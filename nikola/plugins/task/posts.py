@@ -90,7 +90,7 @@ class RenderPosts(Task):
                     'basename': self.name,
                     'name': dest,
                     'file_dep': file_dep,
-                    'targets': [dest] + extra_targets,
+                    'targets': [dest, post.summary_path(lang)] + extra_targets,
                     'actions': [(post.compile, (lang, )),
                                 (update_deps, (post, lang, )),
                                 ],
@@ -116,7 +116,11 @@ class RenderPosts(Task):
                             pass
                     else:
                         flist.append(f)
-                yield utils.apply_filters(task, {os.path.splitext(dest)[-1]: flist})
+                task = utils.apply_filters(task, {os.path.splitext(dest)[-1]: flist})
+                if flist:
+                    # The filters changed the compiled post
+                    task['actions'].append((post.write_summary, (lang, )))
+                yield task
 
     def dependence_on_timeline(self, post, lang):
         """Check if a post depends on the timeline."""
@@ -138,9 +138,12 @@ class Sitemap(LateTask):
         base_path = get_base_path(kw['base_url'])
         sitemapindex = {}
         urlset = {}
+        # Tasks can run in other processes than _scan_locs (parallel builds)
+        scanned_in_process = set([])
 
         def scan_locs():
             """Scan site locations."""
+            scanned_in_process.add(os.getpid())
             for root, dirs, files in os.walk(output, followlinks=True):
                 if not dirs and not files and not kw['sitemap_include_fileless_dirs']:
                     continue  # Totally empty, not on sitemap
@@ -237,18 +240,20 @@ class Sitemap(LateTask):
 
         def write_sitemap():
             """Write sitemap to file."""
-            # Have to rescan, because files may have been added between
-            # task dep scanning and task execution
+            if os.getpid() not in scanned_in_process:
+                scan_locs()
             with io.open(sitemap_path, 'w+', encoding='utf8') as outf:
                 outf.write(urlset_header)
                 for k in sorted(urlset.keys()):
                     outf.write(urlset[k])
                 outf.write(urlset_footer)
-            sitemap_url = urljoin(base_url, base_path + "sitemap.xml")
-            sitemapindex[sitemap_url] = sitemap_format.format(sitemap_url, self.get_lastmod(sitemap_path))
 
         def write_sitemapindex():
             """Write sitemap index."""
+            if os.getpid() not in scanned_in_process:
+                scan_locs()
+            sitemap_url = urljoin(base_url, base_path + "sitemap.xml")
+            sitemapindex[sitemap_url] = sitemap_format.format(sitemap_url, self.get_lastmod(sitemap_path))
             with io.open(sitemapindex_path, 'w+', encoding='utf8') as outf:
                 outf.write(sitemapindex_header)
                 for k in sorted(sitemapindex.keys()):
@@ -287,7 +292,9 @@ class Sitemap(LateTask):
         yield {
             "basename": "_scan_locs",
             "name": "sitemap",
-            "actions": [(scan_locs_task)]
+            "actions": [(scan_locs_task)],
+            # The output folder must be complete (matters for parallel builds)
+            "task_dep": ["render_site"],
         }
 
         yield self.group_task()
@@ -254,9 +254,11 @@ class RenderTaxonomies(Task):
             'basename': str(self.name),
             'name': feed_path,
             'targets': [feed_path],
+            'file_dep': sorted(set([dep for post in filtered_posts for dep in post.deps(lang)])),
             'actions': [(self.site.atom_feed_renderer, (lang, filtered_posts, feed_path, kw['filters'], context))],
             'clean': True,
-            'uptodate': [utils.config_changed(kw, 'nikola.plugins.task.taxonomies:atom')],
+            'uptodate': [utils.config_changed({1: kw, 2: [(post.meta[lang]['title'], post.permalink(lang)) for post in filtered_posts]},
+                                              'nikola.plugins.task.taxonomies:atom')],
             'task_dep': ['render_posts'],
         }
         return task
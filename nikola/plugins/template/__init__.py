@@ -25,3 +25,86 @@
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 """Default template engines for Nikola."""
+
+from __future__ import unicode_literals
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from nikola.utils import get_logger, makedirs, STDERR_HANDLER
+
+LOGGER = get_logger('templates', STDERR_HANDLER)
+
+
+class DependencyCache(object):
+    """The templates each template file refers to, kept on disk between builds.
+
+    Entries are keyed by the path and the SHA-1 of the contents of template
+    files.  All of them are discarded when the lookup directories change,
+    as those decide which files template names refer to.  New entries are
+    only written to disk by save().
+    """
+
+    def __init__(self, path):
+        """Load the cache stored at path."""
+        self.path = path
+        self.directories = None
+        self.entries = {}
+        self.changed = False
+        # (mtime, size, digest) of the files hashed by this process
+        self._digests = {}
+        if os.path.isfile(path):
+            try:
+                with io.open(path, 'r', encoding='utf-8') as inf:
+                    data = json.load(inf)
+            except ValueError:
+                LOGGER.warn('Ignoring corrupt template dependency cache {0}'.format(path))
+                data = {}
+            self.directories = data.get('directories')
+            self.entries = data.get('entries', {})
+
+    def get(self, filename, directories, find_deps):
+        """Return the dependencies of the template in filename.
+
+        find_deps(filename) is only called if they are not known for the
+        current contents of the file.
+        """
+        if directories != self.directories:
+            self.directories = list(directories)
+            self.entries = {}
+            self.changed = True
+        digest = self._digest(filename)
+        entry = self.entries.get(filename)
+        if entry is not None and entry['hash'] == digest:
+            return list(entry['deps'])
+        deps = find_deps(filename)
+        self.entries[filename] = {'hash': digest, 'deps': list(deps)}
+        self.changed = True
+        return deps
+
+    def _digest(self, filename):
+        """Return the SHA-1 of the contents of filename, hashing it only if it changed."""
+        st = os.stat(filename)
+        known = self._digests.get(filename)
+        if known is not None and known[:2] == (st.st_mtime, st.st_size):
+            return known[2]
+        with io.open(filename, 'rb') as inf:
+            digest = hashlib.sha1(inf.read()).hexdigest()
+        self._digests[filename] = (st.st_mtime, st.st_size, digest)
+        return digest
+
+    def save(self):
+        """Write the cache to disk if it changed."""
+        if not self.changed:
+            return
+        dname = os.path.dirname(self.path)
+        makedirs(dname)
+        data = json.dumps({'directories': self.directories, 'entries': self.entries}, sort_keys=True)
+        with tempfile.NamedTemporaryFile(dir=dname or '.', delete=False) as outf:
+            tname = outf.name
+            outf.write(data.encode('utf-8'))
+        shutil.move(tname, self.path)
+        self.changed = False
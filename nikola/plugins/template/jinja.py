@@ -34,10 +34,15 @@ import json
 try:
     import jinja2
     from jinja2 import meta
+    try:
+        pass_context = jinja2.pass_context
+    except AttributeError:  # Jinja2 < 3.0
+        pass_context = jinja2.contextfunction
 except ImportError:
     jinja2 = None  # NOQA
 
 from nikola.plugin_categories import TemplateSystem
+from nikola.plugins.template import DependencyCache
 from nikola.utils import makedirs, req_missing
 
 
@@ -48,6 +53,7 @@ class JinjaTemplates(TemplateSystem):
     lookup = None
     dependency_cache = {}
     per_file_cache = {}
+    dependencies = None
 
     def __init__(self):
         """Initialize Jinja2 environment with extended set of filters."""
@@ -68,6 +74,9 @@ class JinjaTemplates(TemplateSystem):
         self.lookup.globals['enumerate'] = enumerate
         self.lookup.globals['isinstance'] = isinstance
         self.lookup.globals['tuple'] = tuple
+        self.dependencies = DependencyCache(os.path.join(cache_folder, 'dependencies.json'))
+        self.lookup.globals['url'] = pass_context(lambda context, dst: self.url(context, dst))
+        self.lookup.globals['rewrite_links'] = pass_context(lambda context, data: self.rewrite_links(context, data))
         self.directories = directories
         self.create_lookup()
 
@@ -105,27 +114,47 @@ class JinjaTemplates(TemplateSystem):
 
     def get_string_deps(self, text):
         """Find dependencies for a template string."""
+        deps = self._get_deps(self._find_references(text))
+        self.dependencies.save()
+        return deps
+
+    def get_deps(self, filename):
+        """Return paths to dependencies for the template loaded from filename."""
+        deps = self._get_file_deps(filename)
+        self.dependencies.save()
+        return deps
+
+    def _get_file_deps(self, filename):
+        """Return paths to dependencies for a template file, without saving the cache."""
+        return self._get_deps(self.dependencies.get(filename, self.directories, self._find_file_references))
+
+    def _get_deps(self, references):
+        """Return the templates referenced and their dependencies."""
         deps = set([])
-        ast = self.lookup.parse(text)
-        dep_names = meta.find_referenced_templates(ast)
-        for dep_name in dep_names:
-            filename = self.lookup.loader.get_source(self.lookup, dep_name)[1]
-            sub_deps = [filename] + self.get_deps(filename)
+        for dep_name, filename in references:
+            sub_deps = [filename] + self._get_file_deps(filename)
             self.dependency_cache[dep_name] = sub_deps
             deps |= set(sub_deps)
         return list(deps)
 
-    def get_deps(self, filename):
-        """Return paths to dependencies for the template loaded from filename."""
+    def _find_references(self, text):
+        """Find the names and paths of the templates a template string refers to."""
+        ast = self.lookup.parse(text)
+        dep_names = meta.find_referenced_templates(ast)
+        return [(dep_name, self.lookup.loader.get_source(self.lookup, dep_name)[1]) for dep_name in dep_names]
+
+    def _find_file_references(self, filename):
+        """Find the names and paths of the templates the template in filename refers to."""
         with io.open(filename, 'r', encoding='utf-8') as fd:
             text = fd.read()
-        return self.get_string_deps(text)
+        return self._find_references(text)
 
     def template_deps(self, template_name):
         """Generate list of dependencies for a template."""
         if self.dependency_cache.get(template_name) is None:
             filename = self.lookup.loader.get_source(self.lookup, template_name)[1]
-            self.dependency_cache[template_name] = [filename] + self.get_deps(filename)
+            self.dependency_cache[template_name] = [filename] + self._get_file_deps(filename)
+            self.dependencies.save()
         return self.dependency_cache[template_name]
 
     def get_template_path(self, template_name):
@@ -27,9 +27,10 @@
 """Mako template handler."""
 
 from __future__ import unicode_literals, print_function, absolute_import
+import hashlib
 import io
 import os
-import shutil
+from functools import partial
 import sys
 import tempfile
 
@@ -39,6 +40,7 @@ from mako.template import Template
 from markupsafe import Markup  # It's ok, Mako requires it
 
 from nikola.plugin_categories import TemplateSystem
+from nikola.plugins.template import DependencyCache
 from nikola.utils import makedirs, get_logger, STDERR_HANDLER
 
 LOGGER = get_logger('mako', STDERR_HANDLER)
@@ -54,6 +56,7 @@ class MakoTemplates(TemplateSystem):
     filters = {}
     directories = []
     cache_dir = None
+    dependencies = None
 
     def get_string_deps(self, text, filename=None):
         """Find dependencies for a template string."""
@@ -73,6 +76,16 @@ class MakoTemplates(TemplateSystem):
 
     def get_deps(self, filename):
         """Get paths to dependencies for a template."""
+        deps = self._get_deps(filename)
+        self.dependencies.save()
+        return deps
+
+    def _get_deps(self, filename):
+        """Get paths to dependencies for a template, without saving the cache."""
+        return self.dependencies.get(filename, self.directories, self._find_deps)
+
+    def _find_deps(self, filename):
+        """Parse a template to find its dependencies."""
         text = util.read_file(filename)
         return self.get_string_deps(text, filename)
 
@@ -86,10 +99,9 @@ class MakoTemplates(TemplateSystem):
             except UnicodeEncodeError:
                 cache_dir = tempfile.mkdtemp()
                 LOGGER.warning('Because of a Mako bug, setting cache_dir to {0}'.format(cache_dir))
-        if os.path.exists(cache_dir):
-            shutil.rmtree(cache_dir)
         self.directories = directories
         self.cache_dir = cache_dir
+        self.dependencies = DependencyCache(os.path.join(cache_dir, 'dependencies.json'))
         self.create_lookup()
 
     def inject_directory(self, directory):
@@ -103,8 +115,34 @@ class MakoTemplates(TemplateSystem):
         self.lookup = TemplateLookup(
             directories=self.directories,
             module_directory=self.cache_dir,
+            modulename_callable=self.module_filename,
             output_encoding='utf-8')
 
+    def module_filename(self, filename, uri):
+        """Get the path of the compiled module for a template.
+
+        The name depends on the contents of the template, its path and the
+        lookup directories, so the modules can be kept between builds and
+        a module is only compiled again when one of them changes.  Older
+        modules of the same template are deleted when a new one is needed,
+        so the cache does not grow with every edit.
+        """
+        prefix = '{0}.{1}.'.format(os.path.basename(filename), hashlib.sha1(filename.encode('utf-8')).hexdigest())
+        digest = hashlib.sha1()
+        digest.update('\n'.join(self.directories + [filename, '']).encode('utf-8'))
+        with io.open(filename, 'rb') as inf:
+            digest.update(inf.read())
+        module_dir = os.path.abspath(self.cache_dir)
+        path = os.path.join(module_dir, '{0}{1}.py'.format(prefix, digest.hexdigest()))
+        if not os.path.exists(path) and os.path.isdir(module_dir):
+            for name in os.listdir(module_dir):
+                if name.startswith(prefix) and name.endswith(('.py', '.pyc')):
+                    try:
+                        os.remove(os.path.join(module_dir, name))
+                    except OSError:  # Removed by another process
+                        pass
+        return path
+
     def set_site(self, site):
         """Set the Nikola site."""
         self.site = site
@@ -113,6 +151,8 @@ class MakoTemplates(TemplateSystem):
     def render_template(self, template_name, output_name, context):
         """Render the template into output_name using context."""
         context['striphtml'] = striphtml
+        context['url'] = partial(self.url, context)
+        context['rewrite_links'] = partial(self.rewrite_links, context)
         template = self.lookup.get_template(template_name)
         data = template.render_unicode(**context)
         if output_name is not None:
@@ -132,10 +172,11 @@ class MakoTemplates(TemplateSystem):
         # not change between runs
         if self.cache.get(template_name, None) is None:
             template = self.lookup.get_template(template_name)
-            dep_filenames = self.get_deps(template.filename)
+            dep_filenames = self._get_deps(template.filename)
             deps = [template.filename]
             for fname in dep_filenames:
-                deps += [fname] + self.get_deps(fname)
+                deps += [fname] + self._get_deps(fname)
+            self.dependencies.save()
             self.cache[template_name] = deps
         return list(self.cache[template_name])
 
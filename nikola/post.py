@@ -58,14 +58,14 @@ from math import ceil  # for reading time feature
 import nikola.utils
 from .utils import (
     current_time,
-    Functionary,
+    LazyFunctionary,
     LOGGER,
     LocaleBorg,
     slugify,
     to_datetime,
     unicode_str,
     demote_headers,
-    get_translation_candidate,
+    get_translation_resolver,
     unslugify,
 )
 from .rc4 import rc4
@@ -75,10 +75,48 @@ __all__ = ('Post',)
 TEASER_REGEXP = re.compile('<!--\s*TEASER_END(:(.+))?\s*-->', re.IGNORECASE)
 _UPGRADE_METADATA_ADVERTISED = False
 
+# Metadata keys, shared by the metadata of all posts
+_metadata_keys = {}
+
+
+def _compact_metadata(meta, base=None):
+    """Return a dict copy of meta using shared keys.
+
+    If base is given, the values equal to those in base are left out.
+    """
+    compact = {}
+    for key, value in meta.items():
+        if base is None or key not in base or base[key] != value:
+            compact[_metadata_keys.setdefault(key, key)] = value
+    return compact
+
+
+def _no_value():
+    return None
+
 
 class Post(object):
     """Represent a blog post or site page."""
 
+    # Posts are kept in memory for the whole build, so they use slots.
+    # __dict__ is still available for attributes set by plugins.
+    __slots__ = (
+        '__dict__', '__weakref__',
+        '_base_path', '_dependency_file_fragment', '_dependency_file_page',
+        '_dependency_uptodate_fragment', '_dependency_uptodate_page',
+        '_depfile_map', '_next_post', '_paragraph_count', '_prev_post',
+        '_reading_time', '_remaining_paragraph_count',
+        '_remaining_reading_time', '_tags', '_template_name',
+        '_translation_resolver', 'base_path', 'base_url', 'compile_html',
+        'compiler', 'config', 'current_time', 'data', 'date', 'default_lang',
+        'demote_headers', 'folder', 'folder_base', 'folder_relative',
+        'folders', 'index_file', 'is_draft', 'is_post', 'is_private',
+        'is_two_file', 'messages', 'meta', 'metadata_path', 'metadata_record',
+        'newstylemeta', 'post_name', 'pretty_urls', 'publish_later',
+        'skip_untranslated', 'source_path', 'strip_indexes', 'translated_to',
+        'translations', 'updated', 'url_type', 'use_in_feeds',
+    )
+
     def __init__(
         self,
         source_path,
@@ -88,7 +126,9 @@ class Post(object):
         messages,
         template_name,
         compiler,
-        destination_base=None
+        destination_base=None,
+        metadata_record=None,
+        lazy=False
     ):
         """Initialize post.
 
@@ -98,67 +138,38 @@ class Post(object):
 
         destination_base must be None or a TranslatableSetting instance. If
         specified, it will be prepended to the destination path.
+
+        metadata_record can be a record previously returned by
+        ``Post.metadata_record`` for the same source files. If given, the
+        metadata is taken from it instead of being read from disk.
+
+        If lazy is True, the metadata of languages the post is not
+        translated to and the ``data`` files are only read when first
+        needed.
         """
-        self.config = config
-        self.compiler = compiler
-        self.compile_html = self.compiler.compile
-        self.demote_headers = self.compiler.demote_headers and self.config['DEMOTE_HEADERS']
+        self._init_attributes(source_path, config, destination, messages, template_name, compiler, destination_base)
         tzinfo = self.config['__tzinfo__']
-        if self.config['FUTURE_IS_NOW']:
-            self.current_time = None
-        else:
-            self.current_time = current_time(tzinfo)
-        self.translated_to = set([])
-        self._prev_post = None
-        self._next_post = None
-        self.base_url = self.config['BASE_URL']
-        self.is_draft = False
-        self.is_private = False
-        self.strip_indexes = self.config['STRIP_INDEXES']
-        self.index_file = self.config['INDEX_FILE']
-        self.pretty_urls = self.config['PRETTY_URLS']
-        self.source_path = source_path  # posts/blah.txt
-        self.post_name = os.path.splitext(source_path)[0]  # posts/blah
-        # cache[\/]posts[\/]blah.html
-        self.base_path = os.path.join(self.config['CACHE_FOLDER'], self.post_name + ".html")
-        # cache/posts/blah.html
-        self._base_path = self.base_path.replace('\\', '/')
-        self.metadata_path = self.post_name + ".meta"  # posts/blah.meta
-        self.folder_relative = destination
-        self.folder_base = destination_base
-        self.default_lang = self.config['DEFAULT_LANG']
-        self.translations = self.config['TRANSLATIONS']
-        self.messages = messages
-        self.skip_untranslated = not self.config['SHOW_UNTRANSLATED_POSTS']
-        self._template_name = template_name
-        self.is_two_file = True
-        self.newstylemeta = True
-        self._reading_time = None
-        self._remaining_reading_time = None
-        self._paragraph_count = None
-        self._remaining_paragraph_count = None
-        self._dependency_file_fragment = defaultdict(list)
-        self._dependency_file_page = defaultdict(list)
-        self._dependency_uptodate_fragment = defaultdict(list)
-        self._dependency_uptodate_page = defaultdict(list)
-        self._depfile = defaultdict(list)
 
-        default_metadata, self.newstylemeta = get_meta(self, self.config['FILE_METADATA_REGEXP'], self.config['UNSLUGIFY_TITLES'])
+        if metadata_record is None:
+            metadata_record = self._read_metadata_record(lazy)
+        self.metadata_record = metadata_record
+        self.is_two_file = metadata_record['is_two_file']
+        self.newstylemeta = metadata_record['newstylemeta']
+        self.translated_to = set(metadata_record['translated_to'])
 
-        self.meta = Functionary(lambda: None, self.default_lang)
+        default_metadata = defaultdict(str)
+        default_metadata.update(metadata_record['meta'][self.default_lang])
+
+        self.meta = LazyFunctionary(_no_value, self.default_lang, self._load_meta)
         self.meta[self.default_lang] = default_metadata
 
         # Load internationalized metadata
         for lang in self.translations:
-            if os.path.isfile(get_translation_candidate(self.config, self.source_path, lang)):
-                self.translated_to.add(lang)
             if lang != self.default_lang:
-                meta = defaultdict(lambda: '')
-                meta.update(default_metadata)
-                _meta, _nsm = get_meta(self, self.config['FILE_METADATA_REGEXP'], self.config['UNSLUGIFY_TITLES'], lang)
-                self.newstylemeta = self.newstylemeta and _nsm
-                meta.update(_meta)
-                self.meta[lang] = meta
+                if lazy and lang not in self.translated_to:
+                    self.meta.defer(lang)
+                else:
+                    self.meta[lang] = self._load_meta(lang)
 
         if not self.is_translation_available(self.default_lang):
             # Special case! (Issue #373)
@@ -179,10 +190,11 @@ class Post(object):
         self.folder = self.folders[self.default_lang]
 
         # Load data field from metadata
-        self.data = Functionary(lambda: None, self.default_lang)
+        self.data = LazyFunctionary(_no_value, self.default_lang, self._load_data)
         for lang in self.translations:
-            if self.meta[lang].get('data') is not None:
-                self.data[lang] = utils.load_data(self.meta[lang]['data'])
+            self.data.defer(lang)
+        if not lazy:
+            self.data.load_all()
 
         if 'date' not in default_metadata and not use_in_feeds:
             # For pages we don't *really* need a date
@@ -256,6 +268,123 @@ class Post(object):
         # Register potential extra dependencies
         self.compiler.register_extra_dependencies(self)
 
+    def _init_attributes(self, source_path, config, destination, messages, template_name, compiler, destination_base):
+        """Set the attributes that do not depend on the metadata."""
+        self.config = config
+        self._translation_resolver = get_translation_resolver(config)
+        self.compiler = compiler
+        self.compile_html = self.compiler.compile
+        self.demote_headers = self.compiler.demote_headers and self.config['DEMOTE_HEADERS']
+        tzinfo = self.config['__tzinfo__']
+        if self.config['FUTURE_IS_NOW']:
+            self.current_time = None
+        else:
+            self.current_time = current_time(tzinfo)
+        self.translated_to = set([])
+        self._prev_post = None
+        self._next_post = None
+        self.base_url = self.config['BASE_URL']
+        self.is_draft = False
+        self.is_private = False
+        self.strip_indexes = self.config['STRIP_INDEXES']
+        self.index_file = self.config['INDEX_FILE']
+        self.pretty_urls = self.config['PRETTY_URLS']
+        self.source_path = source_path  # posts/blah.txt
+        self.post_name = os.path.splitext(source_path)[0]  # posts/blah
+        # cache[\/]posts[\/]blah.html
+        self.base_path = os.path.join(self.config['CACHE_FOLDER'], self.post_name + ".html")
+        # cache/posts/blah.html
+        self._base_path = self.base_path.replace('\\', '/')
+        self.metadata_path = self.post_name + ".meta"  # posts/blah.meta
+        self.folder_relative = destination
+        self.folder_base = destination_base
+        self.default_lang = self.config['DEFAULT_LANG']
+        self.translations = self.config['TRANSLATIONS']
+        self.messages = messages
+        self.skip_untranslated = not self.config['SHOW_UNTRANSLATED_POSTS']
+        self._template_name = template_name
+        self.is_two_file = True
+        self.newstylemeta = True
+        self._reading_time = None
+        self._remaining_reading_time = None
+        self._paragraph_count = None
+        self._remaining_paragraph_count = None
+        # Dependency maps are created when something is added to them
+        self._dependency_file_fragment = None
+        self._dependency_file_page = None
+        self._dependency_uptodate_fragment = None
+        self._dependency_uptodate_page = None
+        self._depfile_map = None
+
+    @classmethod
+    def read_metadata_record(cls, source_path, config, compiler, lazy=False):
+        """Read the metadata record of a post, without creating the post.
+
+        The record can be passed as ``metadata_record`` when creating the
+        post, maybe in another process.
+        """
+        post = cls.__new__(cls)
+        post._init_attributes(source_path, config, None, None, None, compiler, None)
+        return post._read_metadata_record(lazy)
+
+    def _read_metadata_record(self, lazy=False):
+        """Read the metadata of all translations from disk.
+
+        The result is a dict made only of basic types, so it can be
+        serialized and later passed back as ``metadata_record``.  If lazy
+        is True, languages the post is not translated to are skipped (see
+        ``_load_meta``), unless they have their own ``.meta`` file, which
+        may change ``newstylemeta``.  The metadata of other languages only
+        holds the values that differ from the default language.
+        """
+        file_metadata_regexp = self.config['FILE_METADATA_REGEXP']
+        unslugify_titles = self.config['UNSLUGIFY_TITLES']
+        default_metadata, newstylemeta = get_meta(self, file_metadata_regexp, unslugify_titles)
+        record = {
+            'meta': {self.default_lang: _compact_metadata(default_metadata)},
+            'translated_to': [],
+        }
+        for lang in self.translations:
+            if os.path.isfile(self._translation_resolver.candidate(self.source_path, lang)):
+                record['translated_to'].append(lang)
+            if lang == self.default_lang:
+                continue
+            if lazy and lang not in record['translated_to'] and \
+                    not os.path.isfile(self._translation_resolver.candidate(self.metadata_path, lang)):
+                # Same files as the default language, read when needed
+                continue
+            _meta, _nsm = get_meta(self, file_metadata_regexp, unslugify_titles, lang)
+            newstylemeta = newstylemeta and _nsm
+            record['meta'][lang] = _compact_metadata(_meta, record['meta'][self.default_lang])
+        record['newstylemeta'] = newstylemeta
+        record['is_two_file'] = self.is_two_file
+        return record
+
+    def _load_meta(self, lang):
+        """Return the metadata for a language other than the default one.
+
+        Languages missing from the metadata record are read from disk.
+        For languages the post is not translated to, this falls back to the
+        default language files, so it does not change ``is_two_file`` or
+        ``newstylemeta``.
+        """
+        record_meta = self.metadata_record['meta']
+        if lang not in record_meta:
+            is_two_file = self.is_two_file
+            _meta, _ = get_meta(self, self.config['FILE_METADATA_REGEXP'], self.config['UNSLUGIFY_TITLES'], lang)
+            self.is_two_file = is_two_file
+            record_meta[lang] = _compact_metadata(_meta, record_meta[self.default_lang])
+        meta = defaultdict(str)
+        meta.update(record_meta[self.default_lang])
+        meta.update(record_meta[lang])
+        return meta
+
+    def _load_data(self, lang):
+        """Load the data file of a language, if it has one."""
+        if self.meta[lang].get('data') is not None:
+            return utils.load_data(self.meta[lang]['data'])
+        return None
+
     def _get_hyphenate(self):
         return bool(self.config['HYPHENATE'] or self.meta('hyphenate'))
 
@@ -420,9 +549,9 @@ class Post(object):
         if add not in {'fragment', 'page', 'both'}:
             raise Exception("Add parameter is '{0}', but must be either 'fragment', 'page', or 'both'.".format(add))
         if add == 'fragment' or add == 'both':
-            self._dependency_file_fragment[lang].append((type(dependency) != str, dependency))
+            self._dependency_map('_dependency_file_fragment')[lang].append((type(dependency) != str, dependency))
         if add == 'page' or add == 'both':
-            self._dependency_file_page[lang].append((type(dependency) != str, dependency))
+            self._dependency_map('_dependency_file_page')[lang].append((type(dependency) != str, dependency))
 
     def add_dependency_uptodate(self, dependency, is_callable=False, add='both', lang=None):
         """Add a dependency for task's ``uptodate`` for tasks using that post.
@@ -450,9 +579,22 @@ class Post(object):
             utils.config_changed({1: some_data}, 'uniqueid'), False, 'page')
         """
         if add == 'fragment' or add == 'both':
-            self._dependency_uptodate_fragment[lang].append((is_callable, dependency))
+            self._dependency_map('_dependency_uptodate_fragment')[lang].append((is_callable, dependency))
         if add == 'page' or add == 'both':
-            self._dependency_uptodate_page[lang].append((is_callable, dependency))
+            self._dependency_map('_dependency_uptodate_page')[lang].append((is_callable, dependency))
+
+    def _dependency_map(self, name):
+        """Return the dependency map in the attribute name, creating it if needed."""
+        deps = getattr(self, name)
+        if deps is None:
+            deps = defaultdict(list)
+            setattr(self, name, deps)
+        return deps
+
+    @property
+    def _depfile(self):
+        """Dependencies to write to the depfile of each destination."""
+        return self._dependency_map('_depfile_map')
 
     def register_depfile(self, dep, dest=None, lang=None):
         """Register a dependency in the dependency file."""
@@ -475,9 +617,12 @@ class Post(object):
             if os.path.isfile(deps_path):
                 os.unlink(deps_path)
 
-    def _get_dependencies(self, deps_list):
+    def _get_dependencies(self, dep_map, lang):
+        """Return the dependencies in dep_map for lang and for all languages."""
+        if not dep_map:
+            return []
         deps = []
-        for dep in deps_list:
+        for dep in dep_map.get(lang, []) + dep_map.get(None, []):
             if dep[0]:
                 # callable
                 result = dep[1]()
@@ -500,17 +645,16 @@ class Post(object):
             if os.path.exists(self.metadata_path):
                 deps.append(self.metadata_path)
         if lang != self.default_lang:
-            cand_1 = get_translation_candidate(self.config, self.source_path, lang)
-            cand_2 = get_translation_candidate(self.config, self.base_path, lang)
+            cand_1 = self._translation_resolver.candidate(self.source_path, lang)
+            cand_2 = self._translation_resolver.candidate(self.base_path, lang)
             if os.path.exists(cand_1):
                 deps.extend([cand_1, cand_2])
-            cand_3 = get_translation_candidate(self.config, self.metadata_path, lang)
+            cand_3 = self._translation_resolver.candidate(self.metadata_path, lang)
             if os.path.exists(cand_3):
                 deps.append(cand_3)
         if self.meta('data', lang):
             deps.append(self.meta('data', lang))
-        deps += self._get_dependencies(self._dependency_file_page[lang])
-        deps += self._get_dependencies(self._dependency_file_page[None])
+        deps += self._get_dependencies(self._dependency_file_page, lang)
         return sorted(deps)
 
     def deps_uptodate(self, lang):
@@ -520,8 +664,7 @@ class Post(object):
         which generates the page.
         """
         deps = []
-        deps += self._get_dependencies(self._dependency_uptodate_page[lang])
-        deps += self._get_dependencies(self._dependency_uptodate_page[None])
+        deps += self._get_dependencies(self._dependency_uptodate_page, lang)
         deps.append(utils.config_changed({1: sorted(self.compiler.config_dependencies)}, 'nikola.post.Post.deps_uptodate:compiler:' + self.source_path))
         return deps
 
@@ -546,7 +689,7 @@ class Post(object):
             self.is_two_file,
             self,
             lang)
-        Post.write_depfile(dest, self._depfile[dest], post=self, lang=lang)
+        Post.write_depfile(dest, self._depfile_map.get(dest, []) if self._depfile_map else [], post=self, lang=lang)
 
         signal('compiled').send({
             'source': self.translated_source_path(lang),
@@ -560,10 +703,94 @@ class Post(object):
             LOGGER.warn("Please consider switching to a more secure method of encryption.")
             LOGGER.warn("More details: https://github.com/getnikola/nikola/issues/1547")
             wrap_encrypt(dest, self.meta('password'))
+        self.write_summary(lang)
         if self.publish_later:
             LOGGER.notice('{0} is scheduled to be published in the future ({1})'.format(
                 self.source_path, self.date))
 
+    def summary_path(self, lang):
+        """Return path to the summary of the translation's compiled file."""
+        return self.translated_base_path(lang) + '.summary'
+
+    def _summary_key(self, stat, lang, base_url):
+        """Return what the summary of a compiled file depends on."""
+        teaser_regexp = self.config.get('TEASER_REGEXP', TEASER_REGEXP)
+        return [stat.st_mtime, stat.st_size, lang, base_url, self.hyphenate,
+                self.demote_headers, teaser_regexp.pattern]
+
+    def write_summary(self, lang):
+        """Save the teaser, plain text and counts of the compiled post.
+
+        The summary is used by Post.text and the reading time and paragraph
+        count properties, so they do not have to parse the compiled file
+        again.  It is only used as long as the compiled file (and the
+        options it was computed with) do not change.
+        """
+        summary = self._compute_summary(self.translated_base_path(lang), lang, self.permalink(lang=lang))
+        with io.open(self.summary_path(lang), 'w+', encoding='utf8') as outf:
+            outf.write(unicode_str(json.dumps(summary or {'key': None})))
+
+    def _compute_summary(self, file_name, lang, base_url):
+        """Compute the summary of a compiled file, or return None if Post.text does not process it."""
+        data = self._fragment_text(file_name, lang, base_url)
+        if not data or self.compiler.extension() == '.php':
+            return None
+        teaser, read_more = self._split_teaser(data)
+        if teaser == '':
+            return None
+        try:
+            text = self._process_text(data, lang, False, True, True, False, None)
+            markup = lxml.html.fromstring(self._process_text(data, lang, False, False, True, False, None))
+            with io.open(file_name, "r", encoding="utf8") as post_file:
+                document = lxml.html.fragment_fromstring(post_file.read().strip(), "body")
+            paragraphs = int(document.xpath('count(//p)'))
+            if teaser is None:  # The teaser is the whole post
+                teaser_text, teaser_paragraphs = text, paragraphs
+            else:
+                teaser_text = self._process_text(data, lang, True, True, True, False, None)
+                teaser_document = lxml.html.fragment_fromstring(
+                    self._process_text(data, lang, True, False, False, False, None), "body")
+                teaser_paragraphs = int(teaser_document.xpath('count(//p)'))
+        except lxml.etree.ParserError:
+            # Reported by Post.text and the properties, if they are used
+            return None
+        media_time = 0
+        for embedded in [".//img", ".//picture", ".//video", ".//audio", ".//object", ".//iframe"]:
+            media_time += (len(markup.findall(embedded)) * 0.33)
+        return {
+            'key': self._summary_key(os.stat(file_name), lang, base_url),
+            'teaser': teaser,
+            'read_more': read_more,
+            'text': text,
+            'teaser_text': teaser_text,
+            'words': len(text.split()),
+            'teaser_words': len(teaser_text.split()),
+            'media_time': media_time,
+            'paragraphs': paragraphs,
+            'teaser_paragraphs': teaser_paragraphs,
+        }
+
+    def _read_summary(self, file_name, stat, lang, base_url):
+        """Return the summary saved by write_summary, or None if it is missing or outdated."""
+        try:
+            with io.open(file_name + '.summary', 'r', encoding='utf8') as inf:
+                summary = json.load(inf)
+        except (IOError, OSError, ValueError):
+            return None
+        if summary.get('key') != self._summary_key(stat, lang, base_url):
+            return None
+        return summary
+
+    def _current_summary(self):
+        """Return the summary of the post in the current language, or None."""
+        lang = nikola.utils.LocaleBorg().current_lang
+        file_name = self._translated_file_path(lang)
+        try:
+            stat = os.stat(file_name)
+        except OSError:
+            return None
+        return self._read_summary(file_name, stat, lang, self.permalink(lang=lang))
+
     def fragment_deps(self, lang):
         """Return a list of uptodate dependencies to build this post's fragment.
 
@@ -577,18 +804,16 @@ class Post(object):
             deps.append(self.metadata_path)
         lang_deps = []
         if lang != self.default_lang:
-            lang_deps = [get_translation_candidate(self.config, d, lang) for d in deps]
+            lang_deps = [self._translation_resolver.candidate(d, lang) for d in deps]
             deps += lang_deps
         deps = [d for d in deps if os.path.exists(d)]
-        deps += self._get_dependencies(self._dependency_file_fragment[lang])
-        deps += self._get_dependencies(self._dependency_file_fragment[None])
+        deps += self._get_dependencies(self._dependency_file_fragment, lang)
         return sorted(deps)
 
     def fragment_deps_uptodate(self, lang):
         """Return a list of file dependencies to build this post's fragment."""
         deps = []
-        deps += self._get_dependencies(self._dependency_uptodate_fragment[lang])
-        deps += self._get_dependencies(self._dependency_uptodate_fragment[None])
+        deps += self._get_dependencies(self._dependency_uptodate_fragment, lang)
         deps.append(utils.config_changed({1: sorted(self.compiler.config_dependencies)}, 'nikola.post.Post.deps_uptodate:compiler:' + self.source_path))
         return deps
 
@@ -602,15 +827,15 @@ class Post(object):
             if lang == self.default_lang:
                 return self.source_path
             else:
-                return get_translation_candidate(self.config, self.source_path, lang)
+                return self._translation_resolver.candidate(self.source_path, lang)
         elif lang != self.default_lang:
             return self.source_path
         else:
-            return get_translation_candidate(self.config, self.source_path, sorted(self.translated_to)[0])
+            return self._translation_resolver.candidate(self.source_path, sorted(self.translated_to)[0])
 
     def translated_base_path(self, lang):
         """Return path to the translation's base_path file."""
-        return get_translation_candidate(self.config, self.base_path, lang)
+        return self._translation_resolver.candidate(self.base_path, lang)
 
     def _translated_file_path(self, lang):
         """Return path to the translation's file, or to the original."""
@@ -618,11 +843,11 @@ class Post(object):
             if lang == self.default_lang:
                 return self.base_path
             else:
-                return get_translation_candidate(self.config, self.base_path, lang)
+                return self._translation_resolver.candidate(self.base_path, lang)
         elif lang != self.default_lang:
             return self.base_path
         else:
-            return get_translation_candidate(self.config, self.base_path, sorted(self.translated_to)[0])
+            return self._translation_resolver.candidate(self.base_path, sorted(self.translated_to)[0])
 
     def text(self, lang=None, teaser_only=False, strip_html=False, show_read_more_link=True,
              feed_read_more_link=False, feed_links_append_query=None):
@@ -636,6 +861,11 @@ class Post(object):
 
         All links in the returned HTML will be relative.
         The HTML returned is a bare fragment, not a full document.
+
+        Results are kept in the site's post text cache (with a size limit
+        of POST_TEXT_CACHE_SIZE) until the compiled file changes. The plain
+        text and the teaser are read from the summary saved when compiling
+        the post, if it is up to date.
         """
         if lang is None:
             lang = nikola.utils.LocaleBorg().current_lang
@@ -644,9 +874,42 @@ class Post(object):
         # Yes, we compile it and screw it.
         # This may be controversial, but the user (or someone) is asking for the post text
         # and the post should not just refuse to give it.
-        if not os.path.isfile(file_name):
+        try:
+            stat = os.stat(file_name)
+        except OSError:
             self.compile(lang)
+            stat = os.stat(file_name)
+
+        cache = self.config.get('__post_text_cache__')
+        base_url = self.permalink(lang=lang)
+        fragment_key = (file_name, stat.st_mtime, stat.st_size, lang, base_url, self.hyphenate)
+        key = fragment_key + (self.demote_headers, teaser_only, strip_html, show_read_more_link,
+                              feed_read_more_link, feed_links_append_query)
+        data = None if cache is None else cache.get(key)
+        if data is None:
+            summary = None
+            if strip_html or teaser_only:
+                summary = self._read_summary(file_name, stat, lang, base_url)
+            if summary is not None and strip_html:
+                data = summary['teaser_text'] if teaser_only else summary['text']
+            elif summary is not None and summary['teaser'] is not None:
+                data = self._process_text(summary['teaser'], lang, teaser_only, strip_html, show_read_more_link,
+                                          feed_read_more_link, feed_links_append_query,
+                                          split=(summary['teaser'], summary['read_more']))
+            else:
+                data = None if cache is None else cache.get(fragment_key)
+                if data is None:
+                    data = self._fragment_text(file_name, lang, base_url)
+                    if cache is not None:
+                        cache[fragment_key] = data
+                data = self._process_text(data, lang, teaser_only, strip_html, show_read_more_link,
+                                          feed_read_more_link, feed_links_append_query)
+            if cache is not None:
+                cache[key] = data
+        return data
 
+    def _fragment_text(self, file_name, lang, base_url):
+        """Read the compiled post, making links absolute and hyphenating it."""
         with io.open(file_name, "r", encoding="utf8") as post_file:
             data = post_file.read().strip()
 
@@ -660,7 +923,6 @@ class Post(object):
                 return ""
             # let other errors raise
             raise(e)
-        base_url = self.permalink(lang=lang)
         document.make_links_absolute(base_url)
 
         if self.hyphenate:
@@ -670,16 +932,30 @@ class Post(object):
             data = lxml.html.tostring(document.body, encoding='unicode')
         except:
             data = lxml.html.tostring(document, encoding='unicode')
+        return data
+
+    def _split_teaser(self, data):
+        """Return the teaser of the text and its "Read more" text, or (None, None) if there is no teaser."""
+        teaser_regexp = self.config.get('TEASER_REGEXP', TEASER_REGEXP)
+        match = teaser_regexp.search(data)
+        if match is None:
+            return None, None
+        return data[:match.start()], (match.groups() or [None])[-1]
+
+    def _process_text(self, data, lang, teaser_only, strip_html, show_read_more_link,
+                      feed_read_more_link, feed_links_append_query, split=None):
+        """Apply the options of Post.text to the text read by _fragment_text.
+
+        split is the result of _split_teaser for the text, if known.
+        """
+        if not data or self.compiler.extension() == '.php':
+            return data
 
         if teaser_only:
-            teaser_regexp = self.config.get('TEASER_REGEXP', TEASER_REGEXP)
-            teaser = teaser_regexp.split(data)[0]
-            if teaser != data:
+            teaser, read_more = split if split is not None else self._split_teaser(data)
+            if teaser is not None:
                 if not strip_html and show_read_more_link:
-                    if teaser_regexp.search(data).groups()[-1]:
-                        teaser_text = teaser_regexp.search(data).groups()[-1]
-                    else:
-                        teaser_text = self.messages[lang]["Read more"]
+                    teaser_text = read_more or self.messages[lang]["Read more"]
                     l = self.config['FEED_READ_MORE_LINK'](lang) if feed_read_more_link else self.config['INDEX_READ_MORE_LINK'](lang)
                     teaser += l.format(
                         link=self.permalink(lang, query=feed_links_append_query),
@@ -719,14 +995,18 @@ class Post(object):
     def reading_time(self):
         """Reading time based on length of text."""
         if self._reading_time is None:
-            text = self.text(strip_html=True)
             words_per_minute = 220
-            words = len(text.split())
-            markup = lxml.html.fromstring(self.text(strip_html=False))
-            embeddables = [".//img", ".//picture", ".//video", ".//audio", ".//object", ".//iframe"]
-            media_time = 0
-            for embedded in embeddables:
-                media_time += (len(markup.findall(embedded)) * 0.33)  # +20 seconds
+            summary = self._current_summary()
+            if summary is not None:
+                words, media_time = summary['words'], summary['media_time']
+            else:
+                text = self.text(strip_html=True)
+                words = len(text.split())
+                markup = lxml.html.fromstring(self.text(strip_html=False))
+                embeddables = [".//img", ".//picture", ".//video", ".//audio", ".//object", ".//iframe"]
+                media_time = 0
+                for embedded in embeddables:
+                    media_time += (len(markup.findall(embedded)) * 0.33)  # +20 seconds
             self._reading_time = int(ceil((words / words_per_minute) + media_time)) or 1
         return self._reading_time
 
@@ -734,9 +1014,12 @@ class Post(object):
     def remaining_reading_time(self):
         """Remaining reading time based on length of text (does not include teaser)."""
         if self._remaining_reading_time is None:
-            text = self.text(teaser_only=True, strip_html=True)
             words_per_minute = 220
-            words = len(text.split())
+            summary = self._current_summary()
+            if summary is not None:
+                words = summary['teaser_words']
+            else:
+                words = len(self.text(teaser_only=True, strip_html=True).split())
             self._remaining_reading_time = self.reading_time - int(ceil(words / words_per_minute)) or 1
         return self._remaining_reading_time
 
@@ -744,6 +1027,10 @@ class Post(object):
     def paragraph_count(self):
         """Return the paragraph count for this post."""
         if self._paragraph_count is None:
+            summary = self._current_summary()
+            if summary is not None:
+                self._paragraph_count = summary['paragraphs']
+                return self._paragraph_count
             # duplicated with Post.text()
             lang = nikola.utils.LocaleBorg().current_lang
             file_name = self._translated_file_path(lang)
@@ -766,6 +1053,10 @@ class Post(object):
     def remaining_paragraph_count(self):
         """Return the remaining paragraph count for this post (does not include teaser)."""
         if self._remaining_paragraph_count is None:
+            summary = self._current_summary()
+            if summary is not None:
+                self._remaining_paragraph_count = summary['paragraphs'] - summary['teaser_paragraphs']
+                return self._remaining_paragraph_count
             try:
                 # Just asking self.text() is easier here.
                 document = lxml.html.fragment_fromstring(self.text(teaser_only=True, show_read_more_link=False), "body")
@@ -962,7 +1253,7 @@ def get_metadata_from_file(source_path, config=None, lang=None):
     """Extract metadata from the file itself, by parsing contents."""
     try:
         if lang and config:
-            source_path = get_translation_candidate(config, source_path, lang)
+            source_path = get_translation_resolver(config).candidate(source_path, lang)
         elif lang:
             source_path += '.' + lang
         with io.open(source_path, "r", encoding="utf-8-sig") as meta_file:
@@ -1033,7 +1324,7 @@ def get_metadata_from_meta_file(path, config=None, lang=None):
     global _UPGRADE_METADATA_ADVERTISED
     meta_path = os.path.splitext(path)[0] + '.meta'
     if lang and config:
-        meta_path = get_translation_candidate(config, meta_path, lang)
+        meta_path = get_translation_resolver(config).candidate(meta_path, lang)
     elif lang:
         meta_path += '.' + lang
     if os.path.isfile(meta_path):
@@ -1145,6 +1436,35 @@ def get_meta(post, file_metadata_regexp=None, unslugify_titles=False, lang=None)
     return meta, newstylemeta
 
 
+def get_metadata_signature(config, source_path, stat=os.stat):
+    """Return a list describing the files the metadata of a post is read from.
+
+    Every file that could contribute metadata (the source, the ``.meta``
+    file and their translations) is listed with its modification time and
+    size, or with ``None`` if it does not exist.  If the signature did not
+    change, neither did the metadata.
+
+    ``stat`` is called for every path and must raise ``OSError`` for
+    missing files, like ``os.stat`` does.
+    """
+    metadata_path = os.path.splitext(source_path)[0] + '.meta'
+    paths = [source_path, metadata_path]
+    candidate = get_translation_resolver(config).candidate
+    for lang in config['TRANSLATIONS']:
+        if lang != config['DEFAULT_LANG']:
+            paths.append(candidate(source_path, lang))
+            paths.append(candidate(metadata_path, lang))
+    signature = []
+    for path in paths:
+        try:
+            st = stat(path)
+        except OSError:
+            signature.append([path, None])
+        else:
+            signature.append([path, st.st_mtime, st.st_size])
+    return signature
+
+
 def hyphenate(dom, _lang):
     """Hyphenate a post."""
     # circular import prevention
@@ -27,6 +27,7 @@
 """Utility functions."""
 
 from __future__ import print_function, unicode_literals, absolute_import
+import atexit
 import calendar
 import datetime
 import dateutil.tz
@@ -42,6 +43,7 @@ import shutil
 import socket
 import subprocess
 import sys
+import threading
 import dateutil.parser
 import dateutil.tz
 import logbook
@@ -84,10 +86,11 @@ from nikola import DEBUG
 __all__ = ('CustomEncoder', 'get_theme_path', 'get_theme_path_real', 'get_theme_chain', 'load_messages', 'copy_tree',
            'copy_file', 'slugify', 'unslugify', 'to_datetime', 'apply_filters',
            'config_changed', 'get_crumbs', 'get_tzname', 'get_asset_path',
-           '_reload', 'unicode_str', 'bytes_str', 'unichr', 'Functionary',
-           'TranslatableSetting', 'TemplateHookRegistry', 'LocaleBorg',
+           '_reload', 'unicode_str', 'bytes_str', 'unichr', 'Functionary', 'LazyFunctionary',
+           'TranslatableSetting', 'TemplateHookRegistry', 'LocaleBorg', 'LRUCache', 'VersionedDict',
            'sys_encode', 'sys_decode', 'makedirs', 'get_parent_theme_name',
-           'demote_headers', 'get_translation_candidate', 'write_metadata',
+           'demote_headers', 'get_translation_candidate', 'TranslationResolver',
+           'get_translation_resolver', 'write_metadata',
            'ask', 'ask_yesno', 'options2docstring', 'os_path_split',
            'get_displayed_page_number', 'adjust_name_for_index_path_list',
            'adjust_name_for_index_path', 'adjust_name_for_index_link',
@@ -266,6 +269,90 @@ class Functionary(defaultdict):
         return self[lang][key]
 
 
+class LazyFunctionary(Functionary):
+    """A Functionary that computes the values of some languages on first access.
+
+    Languages passed to ``defer`` are computed with ``load(lang)`` when
+    they are first needed, and then stored as normal values.
+    """
+
+    def __init__(self, default, default_lang, load):
+        """Initialize a lazy functionary."""
+        super(LazyFunctionary, self).__init__(default, default_lang)
+        self._load = load
+        self._deferred = set([])
+
+    def defer(self, lang):
+        """Compute the value for lang when it is first needed."""
+        self._deferred.add(lang)
+
+    def load_all(self):
+        """Compute the values of all deferred languages."""
+        for lang in list(self._deferred):
+            self[lang]
+
+    def __missing__(self, lang):
+        """Compute the value of a deferred language, or use the default."""
+        if lang in self._deferred:
+            self._deferred.discard(lang)
+            value = self[lang] = self._load(lang)
+            return value
+        return super(LazyFunctionary, self).__missing__(lang)
+
+    def __contains__(self, lang):
+        """Return True if lang has a value, computed or not."""
+        return lang in self._deferred or super(LazyFunctionary, self).__contains__(lang)
+
+    def get(self, lang, default=None):
+        """Return the value of lang, or default."""
+        if lang in self._deferred:
+            return self[lang]
+        return super(LazyFunctionary, self).get(lang, default)
+
+    def __iter__(self):
+        """Iterate over the languages, computing all values."""
+        self.load_all()
+        return super(LazyFunctionary, self).__iter__()
+
+    def __len__(self):
+        """Return the number of languages, computing all values."""
+        self.load_all()
+        return super(LazyFunctionary, self).__len__()
+
+    def __eq__(self, other):
+        """Compare with another dict, computing all values."""
+        self.load_all()
+        if isinstance(other, LazyFunctionary):
+            other.load_all()
+        return super(LazyFunctionary, self).__eq__(other)
+
+    def __ne__(self, other):
+        """Compare with another dict, computing all values."""
+        return not self == other
+
+    __hash__ = None
+
+    def keys(self):
+        """Return the languages, computing all values."""
+        self.load_all()
+        return super(LazyFunctionary, self).keys()
+
+    def values(self):
+        """Return the values, computing all of them."""
+        self.load_all()
+        return super(LazyFunctionary, self).values()
+
+    def items(self):
+        """Return the (language, value) pairs, computing all values."""
+        self.load_all()
+        return super(LazyFunctionary, self).items()
+
+    def __repr__(self):
+        """Return a representation, computing all values."""
+        self.load_all()
+        return super(LazyFunctionary, self).__repr__()
+
+
 class TranslatableSetting(object):
     """A setting that can be translated.
 
@@ -538,8 +625,37 @@ class CustomEncoder(json.JSONEncoder):
             return s
 
 
+def _config_json(config):
+    """Serialize a config_changed dict.
+
+    The result is the same as ``json.dumps(config, cls=CustomEncoder,
+    sort_keys=True)``, but the JSON of VersionedDict values (like the
+    global context shared by many tasks) is only computed once for every
+    version of them.
+    """
+    if not any(isinstance(value, VersionedDict) for value in config.values()) or \
+            not all(isinstance(key, unicode_str) for key in config):
+        return json.dumps(config, cls=CustomEncoder, sort_keys=True)
+    items = []
+    for key in sorted(config):
+        value = config[key]
+        if isinstance(value, VersionedDict):
+            cached = getattr(value, '_json', None)
+            if cached is None or cached[0] != value.version:
+                cached = value._json = (value.version, json.dumps(value, cls=CustomEncoder, sort_keys=True))
+            data = cached[1]
+        else:
+            data = json.dumps(value, cls=CustomEncoder, sort_keys=True)
+        items.append(json.dumps(key) + ': ' + data)
+    return '{' + ', '.join(items) + '}'
+
+
 class config_changed(tools.config_changed):
-    """A copy of doit's config_changed, using pickle instead of serializing manually."""
+    """A copy of doit's config_changed, using pickle instead of serializing manually.
+
+    The digest is computed once, for both checking if the task is up to
+    date and saving it after running the task.
+    """
 
     def __init__(self, config, identifier=None):
         """Initialize config_changed."""
@@ -547,13 +663,20 @@ class config_changed(tools.config_changed):
         self.identifier = '_config_changed'
         if identifier is not None:
             self.identifier += ':' + identifier
+        self._digest = None
 
     def _calc_digest(self):
         """Calculate a config_changed digest."""
+        if self._digest is None:
+            self._digest = self._compute_digest()
+        return self._digest
+
+    def _compute_digest(self):
+        """Compute the digest of the config."""
         if isinstance(self.config, str):
             return self.config
         elif isinstance(self.config, dict):
-            data = json.dumps(self.config, cls=CustomEncoder, sort_keys=True)
+            data = _config_json(self.config)
             if isinstance(data, str):  # pragma: no cover # python3
                 byte_data = data.encode("utf-8")
             else:
@@ -763,6 +886,144 @@ def remove_file(source):
         os.remove(source)
 
 
+class LRUCache(object):
+    """A mapping that only keeps the maxsize most recently used entries.
+
+    If sizeof is given, maxsize is a budget for the total of sizeof(key) +
+    sizeof(value) for all entries instead (entries larger than it are not
+    kept).  With sys.getsizeof this is exact for string keys and values,
+    but only the tuple itself is counted for tuple keys, not their items.
+
+    Changes are made while holding a lock, so threads can share a cache
+    (they may still compute the same value twice).  Every process
+    (including forked workers) has its own copy.  Hits and misses are
+    counted for debugging.
+    """
+
+    def __init__(self, maxsize, sizeof=None):
+        """Create an empty cache."""
+        self.maxsize = maxsize
+        self.sizeof = sizeof
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the value for key (marking it as recently used), or default."""
+        with self._lock:
+            try:
+                # Move the entry to the end, as it was used recently
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def __setitem__(self, key, value):
+        """Store value for key, discarding the least recently used entries if full."""
+        if self.sizeof is None:
+            with self._lock:
+                if key not in self._data and len(self._data) >= self.maxsize:
+                    try:
+                        self._data.popitem(last=False)
+                    except KeyError:  # maxsize is 0
+                        pass
+                self._data[key] = value
+            return
+        size = self.sizeof(key) + self.sizeof(value)
+        with self._lock:
+            self._discard(key)
+            if size > self.maxsize:
+                return
+            while self._data and self.size + size > self.maxsize:
+                self._discard(next(iter(self._data)))
+            self._data[key] = value
+            self._sizes[key] = size
+            self.size += size
+
+    def _discard(self, key):
+        """Remove the entry for key, if any, from a cache with sizeof (with the lock held)."""
+        try:
+            del self._data[key]
+            self.size -= self._sizes.pop(key)
+        except KeyError:
+            pass
+
+    def __len__(self):
+        """Return the number of cached entries."""
+        return len(self._data)
+
+    def __iter__(self):
+        """Iterate over the keys, least recently used first."""
+        with self._lock:
+            return iter(list(self._data))
+
+    def clear(self):
+        """Remove all entries and reset the statistics."""
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.size = self.hits = self.misses = 0
+
+    def stats(self):
+        """Return a string describing the usage of the cache."""
+        if self.sizeof is not None:
+            return '{0} hits, {1} misses, {2} entries, size {3}/{4}'.format(
+                self.hits, self.misses, len(self._data), self.size, self.maxsize)
+        return '{0} hits, {1} misses, {2}/{3} entries'.format(self.hits, self.misses, len(self._data), self.maxsize)
+
+
+class VersionedDict(dict):
+    """A dict that counts how many times it was changed.
+
+    Lets callers keep values computed from it until ``version`` changes.
+    Changes to the values themselves (like appending to a list stored in
+    the dict) are not counted.
+    """
+
+    version = 0
+
+    def __setitem__(self, key, value):
+        """Set the value for key."""
+        self.version += 1
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        """Remove key."""
+        self.version += 1
+        dict.__delitem__(self, key)
+
+    def clear(self):
+        """Remove all keys."""
+        self.version += 1
+        dict.clear(self)
+
+    def pop(self, *args):
+        """Remove key and return its value."""
+        self.version += 1
+        return dict.pop(self, *args)
+
+    def popitem(self):
+        """Remove and return a key and value."""
+        self.version += 1
+        return dict.popitem(self)
+
+    def setdefault(self, key, default=None):
+        """Return the value for key, setting it to default if missing."""
+        self.version += 1
+        return dict.setdefault(self, key, default)
+
+    def update(self, *args, **kwargs):
+        """Update the dict from another dict or keyword arguments."""
+        self.version += 1
+        dict.update(self, *args, **kwargs)
+
+
 # slugify is adopted from
 # http://code.activestate.com/recipes/
 # 577257-slugify-make-a-string-usable-in-a-url-or-filename/
@@ -788,7 +1049,18 @@ def slugify(value, lang=None, force=False):
         LOGGER.warn("slugify() called without language!")
     if not isinstance(value, unicode_str):
         raise ValueError("Not a unicode object: {0}".format(value))
-    if USE_SLUGIFY or force:
+    # The result does not depend on lang, only on the mode
+    full = bool(USE_SLUGIFY or force)
+    key = (value, full)
+    slug = _slugify_cache.get(key)
+    if slug is None:
+        slug = _slugify_cache[key] = _slugify(value, full)
+    return slug
+
+
+def _slugify(value, full):
+    """Slugify value, with full slugification if full is True (see slugify)."""
+    if full:
         # This is the standard state of slugify, which actually does some work.
         # It is the preferred style, especially for Western languages.
         value = unicode_str(unidecode(value))
@@ -818,11 +1090,24 @@ def unslugify(value, lang=None, discard_numbers=True):
     """
     if lang is None:  # TODO: remove in v8
         LOGGER.warn("unslugify() called without language!")
-    if discard_numbers:
-        value = re.sub('^[0-9]+', '', value)
-    value = re.sub('([_\-\.])', ' ', value)
-    value = value.strip().capitalize()
-    return value
+    key = (value, discard_numbers)
+    result = _unslugify_cache.get(key)
+    if result is None:
+        result = value
+        if discard_numbers:
+            result = re.sub('^[0-9]+', '', result)
+        result = re.sub('([_\-\.])', ' ', result)
+        result = _unslugify_cache[key] = result.strip().capitalize()
+    return result
+
+
+# Slugs of tags, categories and other names are needed over and over
+_slugify_cache = LRUCache(10000)
+_unslugify_cache = LRUCache(10000)
+
+if DEBUG:
+    atexit.register(lambda: LOGGER.debug('slugify cache: {0}; unslugify cache: {1}'.format(
+        _slugify_cache.stats(), _unslugify_cache.stats())))
 
 
 def encodelink(iri):
@@ -1382,31 +1667,72 @@ def get_translation_candidate(config, path, lang):
     >>> print(get_translation_candidate(config, 'cache/posts/fancy.post.html', 'es'))
     cache/posts/fancy.post.html.es
     """
-    # FIXME: this is rather slow and this function is called A LOT
-    # Convert the pattern into a regexp
-    pattern = config['TRANSLATIONS_PATTERN']
-    # This will still break if the user has ?*[]\ in the pattern. But WHY WOULD HE?
-    pattern = pattern.replace('.', r'\.')
-    pattern = pattern.replace('{path}', '(?P<path>.+?)')
-    pattern = pattern.replace('{ext}', '(?P<ext>[^\./]+)')
-    pattern = pattern.replace('{lang}', '(?P<lang>{0})'.format('|'.join(config['TRANSLATIONS'].keys())))
-    m = re.match(pattern, path)
-    if m and all(m.groups()):  # It's a translated path
-        p, e, l = m.group('path'), m.group('ext'), m.group('lang')
-        if l == lang:  # Nothing to do
+    return get_translation_resolver(config).candidate(path, lang)
+
+
+class TranslationResolver(object):
+    """Find translated paths according to a TRANSLATIONS_PATTERN.
+
+    This does what ``get_translation_candidate`` does, but the pattern is
+    compiled only once, and the way the last ``cache_size`` paths are split
+    into path, extension and language is remembered.
+    Use ``get_translation_resolver`` to get a resolver for a site config.
+    """
+
+    def __init__(self, translations_pattern, languages, default_lang, cache_size=10000):
+        """Compile translations_pattern for the given languages."""
+        self.translations_pattern = translations_pattern
+        self.default_lang = default_lang
+        self._cache = LRUCache(cache_size)
+        # This will still break if the user has ?*[]\ in the pattern. But WHY WOULD HE?
+        pattern = translations_pattern.replace('.', r'\.')
+        pattern = pattern.replace('{path}', '(?P<path>.+?)')
+        pattern = pattern.replace('{ext}', '(?P<ext>[^\./]+)')
+        pattern = pattern.replace('{lang}', '(?P<lang>{0})'.format('|'.join(languages)))
+        self._regex = re.compile(pattern)
+
+    def candidate(self, path, lang):
+        """Return a possible path of the translation of path to lang."""
+        parts = self._cache.get(path)
+        if parts is None:
+            parts = self._cache[path] = self._split(path)
+        p, e, l = parts
+        if l is None:  # It's a untranslated path
+            if lang == self.default_lang:  # Nothing to do
+                return path
+        elif l == lang:  # Nothing to do
             return path
-        elif lang == config['DEFAULT_LANG']:  # Return untranslated path
+        elif lang == self.default_lang:  # Return untranslated path
             return '{0}.{1}'.format(p, e)
-        else:  # Change lang and return
-            return config['TRANSLATIONS_PATTERN'].format(path=p, ext=e, lang=lang)
-    else:
-        # It's a untranslated path, assume it's path.ext
-        p, e = os.path.splitext(path)
-        e = e[1:]  # No initial dot
-        if lang == config['DEFAULT_LANG']:  # Nothing to do
-            return path
-        else:  # Change lang and return
-            return config['TRANSLATIONS_PATTERN'].format(path=p, ext=e, lang=lang)
+        # Change lang and return
+        return self.translations_pattern.format(path=p, ext=e, lang=lang)
+
+    def _split(self, path):
+        """Split path into (path, ext, lang), lang is None for untranslated paths."""
+        m = self._regex.match(path)
+        if m and all(m.groups()):  # It's a translated path
+            return m.group('path'), m.group('ext'), m.group('lang')
+        else:
+            # It's a untranslated path, assume it's path.ext
+            p, e = os.path.splitext(path)
+            return p, e[1:], None
+
+
+_translation_resolvers = {}
+
+
+def get_translation_resolver(config):
+    """Return the TranslationResolver for the translation settings in config.
+
+    Resolvers are shared by all configs with the same TRANSLATIONS_PATTERN,
+    languages and DEFAULT_LANG.
+    """
+    key = (config['TRANSLATIONS_PATTERN'], tuple(config['TRANSLATIONS'].keys()), config['DEFAULT_LANG'])
+    try:
+        return _translation_resolvers[key]
+    except KeyError:
+        resolver = _translation_resolvers[key] = TranslationResolver(*key)
+        return resolver
 
 
 def write_metadata(data):
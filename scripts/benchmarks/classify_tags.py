@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""Time the classification done by scan_posts on a synthetic site.
+
+Usage: python scripts/benchmarks/classify_tags.py [posts] [tags]
+
+Compares the tag bookkeeping of Nikola v7.8.1 (list searches and
+de-duplicating tags_per_language for every post) with the slug-keyed
+indexes used by Nikola.scan_posts now.
+"""
+
+from __future__ import print_function, unicode_literals
+import datetime
+import random
+import sys
+import time
+from collections import defaultdict
+
+from nikola import nikola, utils
+
+
+class FakePost(object):
+    """The parts of a Post used when classifying it."""
+
+    use_in_feeds = True
+    is_post = True
+
+    def __init__(self, i, tags):
+        self.source_path = 'posts/post-{0}.rst'.format(i)
+        self.date = datetime.datetime(2000 + i % 17, 1 + i % 12, 1)
+        self.tags = tags
+
+    def tags_for_language(self, lang):
+        return self.tags
+
+    def meta(self, key, lang=None):
+        return ''
+
+    def destination_path(self, lang=None, extension='.html'):
+        return self.source_path[:-4] + extension
+
+    def source_ext(self):
+        return '.rst'
+
+    def translated_source_path(self, lang):
+        return self.source_path
+
+
+def reset(site):
+    """Reset the indexes filled by scan_posts."""
+    site.posts = []
+    site.all_posts = []
+    site.pages = []
+    site.posts_per_year = defaultdict(list)
+    site.posts_per_month = defaultdict(list)
+    site.posts_per_tag = defaultdict(list)
+    site.posts_per_category = defaultdict(list)
+    site.tags_per_language = defaultdict(list)
+    site.category_hierarchy = {}
+    site.post_per_file = {}
+    site.post_per_input_file = {}
+
+
+def old_tag_classification(site, timeline):
+    """The tag handling of scan_posts in Nikola v7.8.1."""
+    slugged_tags = defaultdict(set)
+    for post in timeline:
+        for lang in site.config['TRANSLATIONS'].keys():
+            for tag in post.tags_for_language(lang):
+                _tag_slugified = utils.slugify(tag, lang)
+                if _tag_slugified in slugged_tags[lang]:
+                    if tag not in site.posts_per_tag:
+                        other_tag = [existing for existing in site.posts_per_tag.keys() if utils.slugify(existing, lang) == _tag_slugified][0]
+                        print('Too similar:', tag, other_tag)
+                else:
+                    slugged_tags[lang].add(_tag_slugified)
+                if post not in site.posts_per_tag[tag]:
+                    site.posts_per_tag[tag].append(post)
+            site.tags_per_language[lang].extend(post.tags_for_language(lang))
+        for lang in site.config['TRANSLATIONS'].keys():
+            site.tags_per_language[lang] = list(set(site.tags_per_language[lang]))
+
+
+def new_tag_classification(site, timeline):
+    """The tag handling of scan_posts now (as part of _classify_post)."""
+    tag_index = nikola._TagIndex()
+    for post in timeline:
+        site._classify_post(post, tag_index)
+
+
+def main(posts=50000, tags=5000):
+    """Classify posts with 1 to 5 random tags each."""
+    random.seed(42)
+    tag_names = ['Tag number {0}'.format(i) for i in range(tags)]
+    timeline = [FakePost(i, random.sample(tag_names, random.randint(1, 5))) for i in range(posts)]
+    site = nikola.Nikola()
+    site.config['TRANSLATIONS'] = {'en': ''}
+
+    for name, function in (('v7.8.1 tags only', old_tag_classification),
+                           ('_classify_post', new_tag_classification)):
+        reset(site)
+        start = time.time()
+        function(site, timeline)
+        print('{0:>16}: {1:.2f}s for {2} posts and {3} tags'.format(name, time.time() - start, posts, tags))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
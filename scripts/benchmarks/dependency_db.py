@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""Compare the doit dependency databases usable with DOIT_BACKEND.
+
+Usage: python scripts/benchmarks/dependency_db.py [tasks[,tasks...]] [backend[,backend...]]
+
+For every number of tasks (default: 10000,100000,500000), stores the state
+doit keeps for tasks like Nikola's (eight file dependencies and a
+config_changed digest each), then times:
+
+* save: writing the state of all tasks to a new database,
+* check: opening the database and reading the state of every task, as a
+  build where nothing changed does,
+* update: checking all tasks and saving new state for 1% of them.
+"""
+
+from __future__ import print_function, unicode_literals
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from doit.dependency import DbmDB, JsonDB, SqliteDB
+
+from nikola.dependency_db import SqliteWALDB
+
+BACKENDS = {'dbm': DbmDB, 'json': JsonDB, 'sqlite3': SqliteDB, 'sqlite_wal': SqliteWALDB}
+DEPS = 8
+
+
+def task_state(i):
+    """Return the task name and state stored by doit for task i."""
+    name = 'render_pages:output/posts/post-{0}/index.html'.format(i)
+    deps = ['cache/posts/post-{0}-{1}.html'.format(i, j) for j in range(DEPS)]
+    state = {
+        'checker:': 'MD5Checker',
+        '_values_:': {},
+        'deps:': deps,
+        '_config_changed:{0}:uptodate:0'.format(name): hashlib.md5(name.encode('utf-8')).hexdigest(),
+    }
+    for dep in deps:
+        state[dep] = [1500000000.0 + i, 1000 + i, hashlib.md5(dep.encode('utf-8')).hexdigest()]
+    return name, state
+
+
+def check(db, tasks):
+    """Read the state of all tasks, as doit does when checking them."""
+    for name, state in tasks:
+        db.get(name, 'checker:')
+        for dep in db.get(name, 'deps:'):
+            db.get(name, dep)
+        db.get(name, '_config_changed:{0}:uptodate:0'.format(name))
+
+
+def timed(function):
+    """Return the time it takes to run function."""
+    start = time.time()
+    function()
+    return time.time() - start
+
+
+def main(sizes=(10000, 100000, 500000), backends=sorted(BACKENDS)):
+    root = tempfile.mkdtemp()
+    try:
+        for size in sizes:
+            tasks = [task_state(i) for i in range(size)]
+            print('{0} tasks'.format(size))
+            for backend in backends:
+                path = os.path.join(root, '{0}-{1}.db'.format(backend, size))
+                db_class = BACKENDS[backend]
+
+                def save():
+                    db = db_class(path)
+                    for name, state in tasks:
+                        for key, value in state.items():
+                            db.set(name, key, value)
+                    db.dump()
+
+                def check_all():
+                    db = db_class(path)
+                    check(db, tasks)
+                    db.dump()
+
+                def update():
+                    db = db_class(path)
+                    check(db, tasks)
+                    for name, state in tasks[::100]:
+                        db.set(name, '_values_:', {'changed': True})
+                    db.dump()
+
+                print('  {0:10} save {1:7.2f}s  check {2:7.2f}s  update {3:7.2f}s'.format(
+                    backend, timed(save), timed(check_all), timed(update)))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main([int(size) for size in args[0].split(',')] if args else (10000, 100000, 500000),
+         args[1].split(',') if len(args) > 1 else sorted(BACKENDS))
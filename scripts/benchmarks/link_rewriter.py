@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""Compare the lxml and streaming link rewriters of Nikola.render_template.
+
+Usage: python scripts/benchmarks/link_rewriter.py [pages] [sections]
+
+Rewrites the links of a synthetic page (navigation, a post with the given
+number of sections of two paragraphs with a few links, and a footer) the
+way render_template does with ``LINK_REWRITER = 'lxml'`` (parse, rewrite and
+serialize) and with ``LINK_REWRITER = 'streaming'``.
+"""
+
+from __future__ import print_function, unicode_literals
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import lxml.html
+
+from nikola import link_rewriter, nikola
+
+PAGE = '''<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Post</title>
+<link href="/assets/css/all.css" rel="stylesheet" type="text/css">
+<link rel="alternate" type="application/rss+xml" href="/rss.xml">
+</head>
+<body>
+<nav><ul>
+<li><a href="/archive.html">Archive</a></li>
+<li><a href="/categories/">Tags</a></li>
+<li><a href="link://rss">RSS</a></li>
+</ul></nav>
+<article>
+{0}
+</article>
+<footer><a href="https://getnikola.com/">Nikola</a></footer>
+<script src="/assets/js/all.js"></script>
+</body>
+</html>
+'''
+SECTION = ('<div class="section"><p>Some text with <a class="reference external" href="/posts/other/">a link</a>, '
+           '<em>emphasis</em>, <code class="docutils literal"><span class="pre">code</span></code> '
+           'and <strong>more</strong> text, long enough to be a paragraph of a blog post.</p>\n'
+           '<p>A second paragraph, with <a href="link://tag/python">a tag</a> and an '
+           '<img src="/images/a.png" srcset="/images/a.png 1x, /images/a@2x.png 2x" alt="image">.</p></div>\n')
+
+
+def main(pages=500, sections=20):
+    root = tempfile.mkdtemp()
+    old_dir = os.getcwd()
+    try:
+        os.chdir(root)
+        site = nikola.Nikola()
+        site.init_plugins()
+        site.quiet = True
+        data = PAGE.format(SECTION * sections)
+        src = '/posts/post/index.html'
+
+        start = time.time()
+        for i in range(pages):
+            doc = lxml.html.document_fromstring(data, lxml.html.HTMLParser(remove_blank_text=True))
+            site.rewrite_links(doc, src, 'en')
+            lxml.html.tostring(doc, encoding='utf8', method='html', pretty_print=True, doctype='<!DOCTYPE html>')
+        lxml_time = time.time() - start
+
+        start = time.time()
+        for i in range(pages):
+            link_rewriter.rewrite_links(data, lambda dst: site.url_replacer(src, dst, 'en')).encode('utf-8')
+        streaming_time = time.time() - start
+
+        print('{0} pages, {1} sections per page'.format(pages, sections))
+        print('lxml:      {0:.2f}s ({1:.2f} ms per page)'.format(lxml_time, lxml_time * 1000 / pages))
+        print('streaming: {0:.2f}s ({1:.2f} ms per page)'.format(streaming_time, streaming_time * 1000 / pages))
+    finally:
+        os.chdir(old_dir)
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 500,
+         int(args[1]) if len(args) > 1 else 20)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""Measure the memory used by the posts of a synthetic site.
+
+Usage: python scripts/benchmarks/post_memory.py [posts] [languages] [lazy]
+
+Creates a site with the given number of posts (each with a .meta file
+and translated to the default language only) and reports the resident
+set size before and after Nikola.scan_posts.  Pass ``0`` as the third
+argument to disable LAZY_POSTS.  Run it once per configuration, as the
+memory of a process is not given back reliably.
+"""
+
+from __future__ import print_function, unicode_literals
+import gc
+import io
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+from nikola import nikola
+
+LANGUAGES = ['de', 'es', 'fr', 'it', 'ja', 'nl', 'pl', 'pt', 'ru', 'sv', 'tr', 'zh_cn']
+
+
+def rss():
+    """Return the resident set size of this process in MiB."""
+    try:
+        with open('/proc/self/statm') as inf:
+            pages = int(inf.read().split()[1])
+        return pages * resource.getpagesize() / 1024.0 / 1024.0
+    except IOError:
+        # Peak usage, in KiB on Linux and bytes on macOS
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0)
+
+
+def make_site(root, posts):
+    """Write the posts of a synthetic site."""
+    os.mkdir(os.path.join(root, 'posts'))
+    for i in range(posts):
+        base = os.path.join(root, 'posts', 'post-{0}'.format(i))
+        with io.open(base + '.rst', 'w', encoding='utf-8') as outf:
+            outf.write('Text of post {0}.\n'.format(i))
+        with io.open(base + '.meta', 'w', encoding='utf-8') as outf:
+            outf.write('.. title: Post {0}\n.. slug: post-{0}\n'
+                       '.. date: 2016-01-{1:02d} 00:00:00 UTC\n'
+                       '.. tags: tag{2}, tag{3}\n.. category: cat{4}\n'
+                       '.. description: Description of post {0}\n'.format(
+                           i, 1 + i % 28, i % 100, i % 7, i % 10))
+
+
+def main(posts=5000, languages=10, lazy=True):
+    root = tempfile.mkdtemp()
+    old_dir = os.getcwd()
+    try:
+        make_site(root, posts)
+        os.chdir(root)
+        translations = {'en': ''}
+        for lang in LANGUAGES[:languages - 1]:
+            translations[lang] = lang
+        site = nikola.Nikola(
+            TRANSLATIONS=translations,
+            POSTS=(('posts/*.rst', 'posts', 'post.tmpl'),),
+            PAGES=(),
+            CACHE_POST_METADATA=False,
+            LAZY_POSTS=lazy,
+        )
+        site.init_plugins()
+        site.quiet = True
+        gc.collect()
+        before = rss()
+        start = time.time()
+        site.scan_posts()
+        elapsed = time.time() - start
+        gc.collect()
+        after = rss()
+        print('{0} posts, {1} languages, LAZY_POSTS = {2}'.format(posts, languages, lazy))
+        print('scan_posts: {0:.2f}s'.format(elapsed))
+        print('RSS: {0:.1f} MiB before, {1:.1f} MiB after ({2:.1f} KiB per post)'.format(
+            before, after, (after - before) * 1024 / posts))
+    finally:
+        os.chdir(old_dir)
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 5000,
+         int(args[1]) if len(args) > 1 else 10,
+         args[2] != '0' if len(args) > 2 else True)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""Compare get_translation_candidate with the regex built on every call.
+
+Usage: python scripts/benchmarks/translation_candidate.py [posts] [languages]
+"""
+
+from __future__ import print_function, unicode_literals
+import os
+import re
+import sys
+import timeit
+
+from nikola.utils import get_translation_candidate, get_translation_resolver
+
+
+def uncached_translation_candidate(config, path, lang):
+    """The get_translation_candidate implementation from Nikola v7.8.1."""
+    pattern = config['TRANSLATIONS_PATTERN']
+    pattern = pattern.replace('.', r'\.')
+    pattern = pattern.replace('{path}', '(?P<path>.+?)')
+    pattern = pattern.replace('{ext}', '(?P<ext>[^\./]+)')
+    pattern = pattern.replace('{lang}', '(?P<lang>{0})'.format('|'.join(config['TRANSLATIONS'].keys())))
+    m = re.match(pattern, path)
+    if m and all(m.groups()):
+        p, e, l = m.group('path'), m.group('ext'), m.group('lang')
+        if l == lang:
+            return path
+        elif lang == config['DEFAULT_LANG']:
+            return '{0}.{1}'.format(p, e)
+        else:
+            return config['TRANSLATIONS_PATTERN'].format(path=p, ext=e, lang=lang)
+    else:
+        p, e = os.path.splitext(path)
+        e = e[1:]
+        if lang == config['DEFAULT_LANG']:
+            return path
+        else:
+            return config['TRANSLATIONS_PATTERN'].format(path=p, ext=e, lang=lang)
+
+
+def main(posts=2000, languages=8):
+    """Resolve source, .meta and cache paths of every post in every language."""
+    langs = ['en'] + ['l{0}'.format(i) for i in range(1, languages)]
+    config = {
+        'TRANSLATIONS_PATTERN': '{path}.{lang}.{ext}',
+        'DEFAULT_LANG': 'en',
+        'TRANSLATIONS': dict((lang, lang) for lang in langs),
+    }
+    paths = []
+    for i in range(posts):
+        paths.extend(['posts/post-{0}.rst'.format(i), 'posts/post-{0}.meta'.format(i),
+                      'cache/posts/post-{0}.html'.format(i)])
+
+    candidate = get_translation_resolver(config).candidate
+    for name, function in (('uncached', uncached_translation_candidate),
+                           ('get_translation_candidate', get_translation_candidate),
+                           ('resolver', lambda config, path, lang: candidate(path, lang))):
+        def run():
+            for path in paths:
+                for lang in langs:
+                    function(config, path, lang)
+        best = min(timeit.repeat(run, number=1, repeat=3))
+        print('{0:>26}: {1:.3f}s for {2} lookups'.format(name, best, len(paths) * len(langs)))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""Time Nikola.url_replacer on the links of a synthetic site.
+
+Usage: python scripts/benchmarks/url_replacer.py [pages] [links]
+
+Every page has the same navigation links (absolute, relative, magic
+link:// and external ones) plus a few links of its own, like the pages
+rendered by Nikola's themes.
+"""
+
+from __future__ import print_function, unicode_literals
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from nikola import nikola
+
+SHARED_LINKS = [
+    '/archive.html', '/categories/', '/rss.xml', '/assets/css/theme.css',
+    '/assets/js/all-nocdn.js', '../../assets/css/rst.css', 'link://tag_index',
+    'link://archive', 'link://rss', 'link://tag/python', 'link://category/software',
+    'https://getnikola.com/', 'http://example.org/some/page.html', '#content',
+    'mailto:someone@example.com', '/index.html', '/posts/', 'link:///assets/img/logo.png',
+]
+
+
+def main(pages=2000, links=200):
+    root = tempfile.mkdtemp()
+    old_dir = os.getcwd()
+    try:
+        os.chdir(root)
+        site = nikola.Nikola()
+        site.init_plugins()
+        site.quiet = True
+        work = []
+        for i in range(pages):
+            src = '/posts/{0}/post-{1}/index.html'.format(2000 + i % 17, i)
+            page_links = [SHARED_LINKS[j % len(SHARED_LINKS)] for j in range(links - 4)]
+            page_links += ['../post-{0}/'.format(i + 1), 'image-{0}.png'.format(i), '', '#footnote-1']
+            work.append((src, page_links))
+        start = time.time()
+        for src, page_links in work:
+            for dst in page_links:
+                site.url_replacer(src, dst, 'en')
+        elapsed = time.time() - start
+        print('{0} pages, {1} links per page: {2:.2f}s ({3:.2f} us per link)'.format(
+            pages, links, elapsed, elapsed * 1e6 / (pages * links)))
+    finally:
+        os.chdir(old_dir)
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 2000,
+         int(args[1]) if len(args) > 1 else 200)
@@ -6,7 +6,7 @@
 """ Base class for Nikola test cases """
 
 
-__all__ = ["BaseTestCase", "cd", "LocaleSupportInTesting"]
+__all__ = ["BaseTestCase", "cd", "LocaleSupportInTesting", "save_locale_borg", "restore_locale_borg"]
 
 
 import os
@@ -46,6 +46,22 @@ def cd(path):
     os.chdir(old_dir)
 
 
+def save_locale_borg():
+    """Return a snapshot of the state shared by nikola.utils.LocaleBorg."""
+    return dict((k, v) for k, v in vars(nikola.utils.LocaleBorg).items()
+                if not (k.startswith('__') and k.endswith('__')))
+
+
+def restore_locale_borg(state):
+    """Restore a LocaleBorg snapshot taken with save_locale_borg()."""
+    borg = nikola.utils.LocaleBorg
+    for k in list(vars(borg)):
+        if k not in state and not (k.startswith('__') and k.endswith('__')):
+            delattr(borg, k)
+    for k, v in state.items():
+        setattr(borg, k, v)
+
+
 class LocaleSupportInTesting(object):
     """
     Nikola needs two pairs of valid (language, locale_n) to test multilingual sites.
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from nikola.dependency_db import SqliteWALDB
+
+
+class SqliteWALDBTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, '.doit.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_save_and_load(self):
+        db = SqliteWALDB(self.path)
+        self.assertFalse(db.in_('task'))
+        self.assertEqual(db.get('task', 'deps:'), None)
+        db.set('task', 'deps:', ('a.txt', 'b.txt'))
+        db.set('task', 'a.txt', (1500000000.5, 10, 'md5'))
+        db.set('other', '_values_:', {'key': ['value']})
+        db.dump()
+        db = SqliteWALDB(self.path)
+        self.assertTrue(db.in_('task'))
+        self.assertEqual(list(db.get('task', 'deps:')), ['a.txt', 'b.txt'])
+        self.assertEqual(list(db.get('task', 'a.txt')), [1500000000.5, 10, 'md5'])
+        self.assertEqual(db.get('other', '_values_:'), {'key': ['value']})
+        self.assertEqual(db.get('other', 'deps:'), None)
+
+    def test_unmarshallable_values(self):
+        class Text(type('')):
+            pass
+
+        db = SqliteWALDB(self.path)
+        db.set('task', '_values_:', {'key': Text('value')})
+        db.dump()
+        self.assertEqual(SqliteWALDB(self.path).get('task', '_values_:'), {'key': 'value'})
+
+    def test_remove(self):
+        db = SqliteWALDB(self.path)
+        for task in ('a', 'b', 'c'):
+            db.set(task, 'result:', task)
+        db.dump()
+        db = SqliteWALDB(self.path)
+        db.remove('a')
+        db.set('b', 'result:', 'changed')
+        db.dump()
+        db = SqliteWALDB(self.path)
+        self.assertFalse(db.in_('a'))
+        self.assertEqual(db.get('b', 'result:'), 'changed')
+        self.assertEqual(db.get('c', 'result:'), 'c')
+        db.remove_all()
+        db.dump()
+        self.assertFalse(SqliteWALDB(self.path).in_('c'))
+
+    def test_read_while_saving(self):
+        db = SqliteWALDB(self.path)
+        db.set('task', 'result:', 'old')
+        db.dump()
+        conn = sqlite3.connect(self.path)
+        self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute("UPDATE tasks SET data = data WHERE task_id = 'task'")
+        # Readers are not blocked by the pending write
+        self.assertEqual(SqliteWALDB(self.path).get('task', 'result:'), 'old')
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
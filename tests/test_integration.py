@@ -6,6 +6,7 @@ import sys
 
 import io
 import locale
+import multiprocessing
 import shutil
 import subprocess
 import tempfile
@@ -137,6 +138,161 @@ class RepeatedPostsSetting(DemoBuildTest):
             outf.write('\nPOSTS = (("posts/*.txt", "posts", "post.tmpl"),("posts/*.txt", "posts", "post.tmpl"))\n')
 
 
+class ParallelBuildTest(DemoBuildTest):
+    """Build the demo site in several processes."""
+
+    @classmethod
+    def build(self):
+        """Build the site."""
+        with cd(self.target_dir):
+            __main__.main(["build", "-n", "2"])
+
+
+@unittest.skipIf(not hasattr(multiprocessing, 'set_start_method'), 'needs Python 3.4+')
+class SpawnBuildTest(DemoBuildTest):
+    """Build the demo site in several processes that are not forked."""
+
+    @classmethod
+    def build(self):
+        """Build the site."""
+        self.spawn_build(["build", "-n", "2"])
+
+    @classmethod
+    def spawn_build(self, args):
+        start_method = multiprocessing.get_start_method(allow_none=True)
+        multiprocessing.set_start_method('spawn', force=True)
+        try:
+            with cd(self.target_dir):
+                return __main__.main(args)
+        finally:
+            multiprocessing.set_start_method(start_method, force=True)
+
+    def test_targeted_build(self):
+        target = os.path.join(self.target_dir, "output", "archive.html")
+        os.unlink(target)
+        self.assertEqual(self.spawn_build(["build", "-n", "2", os.path.join("output", "archive.html")]), 0)
+        self.assertTrue(os.path.isfile(target))
+
+    def test_worker_tasks(self):
+        """Workers only generate the tasks needed for the targets being built."""
+        calls = []
+        gen_tasks = nikola.nikola.Nikola.gen_tasks
+
+        def recording_gen_tasks(site, name, plugin_category, doc='', plugins=None, task_plugins=None):
+            calls.append(plugins)
+            return gen_tasks(site, name, plugin_category, doc, plugins, task_plugins)
+
+        __main__._RETURN_DOITNIKOLA = True
+        try:
+            with cd(self.target_dir):
+                site = __main__.main(["build"]).nikola
+                site.init_plugins()
+                nikola.nikola.Nikola.gen_tasks = recording_gen_tasks
+                # As called by _run_worker
+                __main__.NikolaTaskLoader(site, quiet=True).load_tasks(None, {}, [os.path.join("output", "archive.html")])
+        finally:
+            __main__._RETURN_DOITNIKOLA = False
+            nikola.nikola.Nikola.gen_tasks = gen_tasks
+        self.assertTrue(calls)
+        self.assertNotIn(None, calls)
+        self.assertNotIn(["copy_assets"], calls)
+
+
+class SkipUnchangedBuildTest(DemoBuildTest):
+    """Skip builds when nothing changed."""
+
+    @classmethod
+    def patch_site(self):
+        conf_path = os.path.join(self.target_dir, "conf.py")
+        with io.open(conf_path, "a", encoding="utf8") as outf:
+            outf.write('\nSKIP_UNCHANGED_BUILDS = True\n')
+
+    def build_tasks(self):
+        """Build the site again, returning the number of times tasks were generated."""
+        calls = []
+        load_tasks = __main__.NikolaTaskLoader.load_tasks
+
+        def counting_load_tasks(loader, *args):
+            calls.append(args)
+            return load_tasks(loader, *args)
+
+        __main__.NikolaTaskLoader.load_tasks = counting_load_tasks
+        try:
+            with cd(self.target_dir):
+                self.assertEqual(__main__.main(["build"]), 0)
+        finally:
+            __main__.NikolaTaskLoader.load_tasks = load_tasks
+        return len(calls)
+
+    def test_skip_unchanged(self):
+        self.assertEqual(self.build_tasks(), 0)
+        os.unlink(os.path.join(self.target_dir, "output", "archive.html"))
+        self.assertEqual(self.build_tasks(), 1)
+        self.assertTrue(os.path.isfile(os.path.join(self.target_dir, "output", "archive.html")))
+        self.assertEqual(self.build_tasks(), 0)
+        with io.open(os.path.join(self.target_dir, "pages", "new.rst"), "w", encoding="utf8") as outf:
+            outf.write(".. title: New\n.. slug: new\n\nNew page.\n")
+        self.assertEqual(self.build_tasks(), 1)
+        self.assertTrue(os.path.isfile(os.path.join(self.target_dir, "output", "pages", "new.html")))
+
+
+class TargetedBuildTest(DemoBuildTest):
+    """Generate only the tasks needed for the targets being built."""
+
+    def test_targeted_build(self):
+        self.assertTrue(os.path.isfile(os.path.join(self.target_dir, "cache", "task_index.json")))
+        calls = []
+        gen_tasks = nikola.nikola.Nikola.gen_tasks
+
+        def recording_gen_tasks(site, name, plugin_category, doc='', plugins=None, task_plugins=None):
+            calls.append(plugins)
+            return gen_tasks(site, name, plugin_category, doc, plugins, task_plugins)
+
+        target = os.path.join(self.target_dir, "output", "archive.html")
+        os.unlink(target)
+        nikola.nikola.Nikola.gen_tasks = recording_gen_tasks
+        try:
+            with cd(self.target_dir):
+                self.assertEqual(__main__.main(["build", os.path.join("output", "archive.html")]), 0)
+        finally:
+            nikola.nikola.Nikola.gen_tasks = gen_tasks
+        self.assertTrue(os.path.isfile(target))
+        self.assertNotIn(None, calls)
+        self.assertNotIn(["copy_assets"], calls)
+
+
+class IncrementalIndexTest(DemoBuildTest):
+    """Only re-render the index pages that change when a post is added."""
+
+    @classmethod
+    def patch_site(self):
+        conf_path = os.path.join(self.target_dir, "conf.py")
+        with io.open(conf_path, "a", encoding="utf8") as outf:
+            outf.write('\nINDEX_DISPLAY_POST_COUNT = 1\nGENERATE_ATOM = True\n')
+        for i in range(3):
+            with io.open(os.path.join(self.target_dir, "posts", "old-{0}.rst".format(i)), "w", encoding="utf8") as outf:
+                outf.write(".. title: Old {0}\n.. slug: old-{0}\n.. date: 2000-01-0{1} 00:00:00 UTC\n\nText.\n".format(i, i + 1))
+
+    def test_new_post(self):
+        output = os.path.join(self.target_dir, "output")
+        pages = sorted(name for name in os.listdir(output) if name.startswith("index-"))
+        newest = max(int(name[6:].split(".")[0]) for name in pages)
+        mtimes = dict((name, os.stat(os.path.join(output, name)).st_mtime) for name in pages)
+        for name in pages:
+            os.utime(os.path.join(output, name), (1000000000, 1000000000))
+        with io.open(os.path.join(self.target_dir, "posts", "newest.rst"), "w", encoding="utf8") as outf:
+            outf.write(".. title: Newest\n.. slug: newest\n.. date: 2016-01-01 00:00:00 UTC\n\nText.\n")
+        with cd(self.target_dir):
+            self.assertEqual(__main__.main(["build"]), 0)
+        for name in mtimes:
+            changed = os.stat(os.path.join(output, name)).st_mtime != 1000000000
+            self.assertEqual(changed, name.startswith("index-{0}.".format(newest)), name)
+        # The previously newest page now links to the new one
+        with io.open(os.path.join(output, "index-{0}.atom".format(newest)), encoding="utf8") as inf:
+            self.assertIn('href="https://example.com/index-{0}.atom"'.format(newest + 1), inf.read())
+        self.assertTrue(os.path.isfile(os.path.join(output, "index-{0}.atom".format(newest + 1))))
+
+
 class FuturePostTest(EmptyBuildTest):
     """Test a site with future posts."""
 
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import unittest
+
+import lxml.html
+
+from nikola.link_rewriter import UnsupportedHTML, rewrite_links
+
+DOCUMENT = '''<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Links &amp; <a href="not-a-link.html"></title>
+<link href="/assets/css/all.css" rel="stylesheet" type="text/css">
+<link rel="alternate" type="application/rss+xml" HREF='/rss.xml'>
+<style>@import "/assets/css/extra.css"; body { background: url('/bg.png') }</style>
+<script>var s = '<a href="/in-script.html">';</script>
+<!-- <a href="/in-comment.html"> -->
+</head>
+<body>
+<a href="/posts/a.html?x=1&amp;y=2" class=x>A</a>
+<a href=/posts/b.html>B</a>
+<a href="  /posts/c.html  " href="/posts/duplicate.html">C</a>
+<a href="link://tag/python" title="&quot;quoted&quot;">tag</a>
+<a href>empty</a>
+<a href="#top">top</a>
+<a href="https://getnikola.com/">Nikola</a>
+<img src="/images/a.png" srcset="/images/a.png 1x,/images/a@2x.png 2x" alt="">
+<picture><source srcset="/images/b.webp"></picture>
+<div style="background: url(&quot;/images/c.png&quot;)"></div>
+<form action="/search"></form>
+<textarea><a href="in-textarea.html"></textarea>
+<xmp><a href="in-xmp.html"></xmp>
+</body>
+</html>
+'''
+
+
+def replace(link):
+    if link.startswith('/'):
+        return '..' + link
+    if link.startswith('link://'):
+        return link[7:] + '.html'
+    if link == '':
+        return '#'
+    return link
+
+
+def lxml_links(data):
+    doc = lxml.html.document_fromstring(data)
+    result = [(el.tag, attrib, link) for el, attrib, link, pos in doc.iterlinks()]
+    srcsets = [(el.tag, 'srcset', el.get('srcset')) for el in doc.xpath('(//img|//source)') if 'srcset' in el.attrib]
+    return result + srcsets
+
+
+class LinkRewriterTest(unittest.TestCase):
+    maxDiff = None
+
+    def test_same_links_as_lxml(self):
+        doc = lxml.html.document_fromstring(DOCUMENT)
+        doc.rewrite_links(replace, resolve_base_href=False)
+        for obj in doc.xpath('(//img|//source)'):
+            if 'srcset' in obj.attrib:
+                urls = [u.strip() for u in obj.attrib['srcset'].split(',')]
+                obj.set('srcset', ', '.join(replace(dst) for dst in urls))
+        expected = lxml.html.tostring(doc, encoding='unicode')
+        self.assertEqual(lxml_links(rewrite_links(DOCUMENT, replace)), lxml_links(expected))
+
+    def test_rest_of_document_unchanged(self):
+        data = '<p>Some <b>text</b> &amp; <a class="x" href="/a.html" >a link</a></p>\n'
+        self.assertEqual(rewrite_links(data, replace), data.replace('/a.html', '../a.html'))
+        self.assertEqual(rewrite_links(data, lambda link: link), data)
+
+    def test_text_only_elements_unchanged(self):
+        result = rewrite_links(DOCUMENT, replace)
+        for text in ('<title>Links &amp; <a href="not-a-link.html"></title>',
+                     '<textarea><a href="in-textarea.html"></textarea>',
+                     '<xmp><a href="in-xmp.html"></xmp>'):
+            self.assertIn(text, result)
+        data = '<p><plaintext><a href="/a.html"></plaintext><a href="/b.html">'
+        self.assertEqual(rewrite_links(data, replace), data)
+
+    def test_special_characters(self):
+        self.assertEqual(rewrite_links('<a href="/a.html">', lambda link: '/b.html?x="1"&y=2'),
+                         '<a href="/b.html?x=&quot;1&quot;&amp;y=2">')
+        self.assertEqual(rewrite_links("<a href='/a.html'>", lambda link: "/b'.html"),
+                         "<a href='/b&#39;.html'>")
+
+    def test_remove_link(self):
+        self.assertEqual(rewrite_links('<a class="x" href="/a.html">', lambda link: None), '<a class="x" >')
+
+    def test_unsupported(self):
+        self.assertRaises(UnsupportedHTML, rewrite_links, '<object data="a.swf"></object>', replace)
+        self.assertRaises(UnsupportedHTML, rewrite_links, '<meta http-equiv="refresh" content="0; url=/a.html">', replace)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from nikola.plugins.template import DependencyCache
+from nikola.plugins.template.mako import MakoTemplates
+
+
+class MakoCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = os.path.join(self.tmpdir, 'cache')
+        self.theme = os.path.join(self.tmpdir, 'theme')
+        self.parent = os.path.join(self.tmpdir, 'parent')
+        os.mkdir(self.theme)
+        os.mkdir(self.parent)
+        self.write(self.parent, 'Parent ${value}')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, folder, text, mtime=None, name='page.tmpl'):
+        path = os.path.join(folder, name)
+        with io.open(path, 'w', encoding='utf-8') as outf:
+            outf.write(text)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def render(self, *directories):
+        templates = MakoTemplates()
+        templates.set_directories(list(directories), self.cache)
+        return templates.render_template('page.tmpl', None, {'value': 1})
+
+    def test_modules_are_kept(self):
+        self.write(self.theme, 'Theme ${value}')
+        self.assertEqual(self.render(self.theme, self.parent), 'Theme 1')
+        modules = os.listdir(os.path.join(self.cache, '.mako.tmp'))
+        self.assertEqual(self.render(self.theme, self.parent), 'Theme 1')
+        self.assertEqual(os.listdir(os.path.join(self.cache, '.mako.tmp')), modules)
+
+    def test_changed_template(self):
+        self.write(self.theme, 'Theme ${value}', mtime=1000000000)
+        self.assertEqual(self.render(self.theme, self.parent), 'Theme 1')
+        # Even if the template looks older than its module
+        self.write(self.theme, 'Changed ${value}', mtime=1000000000)
+        self.assertEqual(self.render(self.theme, self.parent), 'Changed 1')
+        # Only the module of the current version is kept
+        modules = [name for name in os.listdir(os.path.join(self.cache, '.mako.tmp')) if name.startswith('page.tmpl.')]
+        self.assertEqual(len(modules), 1)
+
+    def test_changed_theme_chain(self):
+        self.write(self.theme, 'Theme ${value}')
+        self.assertEqual(self.render(self.theme, self.parent), 'Theme 1')
+        self.assertEqual(self.render(self.parent), 'Parent 1')
+        self.assertEqual(self.render(self.theme), 'Theme 1')
+        # One module for each template, not for each theme chain
+        self.assertEqual(len(os.listdir(os.path.join(self.cache, '.mako.tmp'))), 2)
+
+    def deps(self):
+        templates = MakoTemplates()
+        templates.set_directories([self.theme, self.parent], self.cache)
+        # Not the in-process cache
+        templates.cache = {}
+        return [os.path.basename(path) for path in templates.template_deps('page.tmpl')]
+
+    def test_dependencies(self):
+        self.write(self.theme, '<%include file="a.tmpl"/>')
+        self.write(self.theme, 'A', name='a.tmpl')
+        self.write(self.parent, 'B', name='b.tmpl')
+        self.assertEqual(self.deps(), ['page.tmpl', 'a.tmpl'])
+        self.assertTrue(os.path.isfile(os.path.join(self.cache, '.mako.tmp', 'dependencies.json')))
+        self.assertEqual(self.deps(), ['page.tmpl', 'a.tmpl'])
+        self.write(self.theme, '<%include file="a.tmpl"/><%include file="b.tmpl"/>')
+        self.assertEqual(self.deps(), ['page.tmpl', 'a.tmpl', 'b.tmpl'])
+        self.write(self.theme, '<%include file="b.tmpl"/>', name='a.tmpl')
+        self.assertEqual(self.deps(), ['page.tmpl', 'a.tmpl', 'b.tmpl', 'b.tmpl'])
+
+    def test_dependencies_saved_once(self):
+        self.write(self.theme, '<%include file="a.tmpl"/><%include file="b.tmpl"/>')
+        self.write(self.theme, 'A', name='a.tmpl')
+        self.write(self.parent, 'B', name='b.tmpl')
+        with mock.patch('nikola.plugins.template.shutil', wraps=shutil) as mocked_shutil:
+            self.assertEqual(self.deps(), ['page.tmpl', 'a.tmpl', 'b.tmpl'])
+            self.assertEqual(mocked_shutil.move.call_count, 1)
+            # Nothing is written if the cache is up to date
+            self.assertEqual(self.deps(), ['page.tmpl', 'a.tmpl', 'b.tmpl'])
+            self.assertEqual(mocked_shutil.move.call_count, 1)
+
+
+    def test_dependencies_hashed_once(self):
+        self.write(self.theme, 'Theme', mtime=1000000000)
+        path = os.path.join(self.theme, 'page.tmpl')
+        cache = DependencyCache(os.path.join(self.cache, 'dependencies.json'))
+        find_deps = mock.Mock(return_value=[path])
+        with mock.patch('nikola.plugins.template.hashlib', wraps=hashlib) as mocked_hashlib:
+            for i in range(3):
+                self.assertEqual(cache.get(path, [self.theme], find_deps), [path])
+            self.assertEqual(mocked_hashlib.sha1.call_count, 1)
+            # Changed files are hashed again
+            self.write(self.theme, 'Changed', mtime=1000000000)
+            self.assertEqual(cache.get(path, [self.theme], find_deps), [path])
+            self.assertEqual(mocked_hashlib.sha1.call_count, 2)
+        self.assertEqual(find_deps.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
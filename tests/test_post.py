@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from nikola.post import Post
+from nikola.utils import LocaleBorg, LRUCache
+
+from .base import save_locale_borg, restore_locale_borg
+from .test_post_metadata_index import FakeCompiler, make_config
+
+
+class PostTest(unittest.TestCase):
+    def setUp(self):
+        self.old_dir = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        os.chdir(self.tmpdir)
+        os.mkdir('posts')
+        self.write('posts/hello.rst', '.. title: Hello\n.. slug: hello\n.. date: 2016-01-01 00:00:00 UTC\n\nText\n')
+        self.config = make_config()
+        self.locale_borg_state = save_locale_borg()
+        LocaleBorg.initialize({'en': 'C', 'es': 'C'}, 'en')
+
+    def tearDown(self):
+        restore_locale_borg(self.locale_borg_state)
+        os.chdir(self.old_dir)
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, path, text):
+        with io.open(path, 'w', encoding='utf-8') as fh:
+            fh.write(text)
+
+    def make_post(self, source='posts/hello.rst'):
+        return Post(source, self.config, 'posts', True, {'en': {}, 'es': {}},
+                    'post.tmpl', FakeCompiler())
+
+    def test_text_cache(self):
+        cache = self.config['__post_text_cache__'] = LRUCache(1024 * 1024, sizeof=sys.getsizeof)
+        self.config['CACHE_FOLDER'] = 'cache'
+        post = self.make_post()
+        path = post._translated_file_path('en')
+        os.makedirs(os.path.dirname(path))
+        self.write(path, '<p>Some <a href="other.html">text</a></p>')
+        self.assertIn('<a href="', post.text('en'))
+        self.assertEqual(post.text('en', strip_html=True), 'Some text')
+        # The second call uses the cached text, the third the cached fragment
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+        self.assertEqual(post.text('en', strip_html=True), 'Some text')
+        self.assertEqual(cache.hits, 2)
+        # Changing the compiled file invalidates the cached text
+        self.write(path, '<p>Changed</p>')
+        os.utime(path, (1000000000, 1000000000))
+        self.assertEqual(post.text('en', strip_html=True), 'Changed')
+
+    def test_summary(self):
+        self.config['CACHE_FOLDER'] = 'cache'
+        post = self.make_post()
+        path = post._translated_file_path('en')
+        os.makedirs(os.path.dirname(path))
+        self.write(path, '<p>One two <img src="a.png"></p>\n<p>three</p>\n<!-- TEASER_END -->\n<p>four</p>')
+        expected = [post.reading_time, post.remaining_reading_time, post.paragraph_count,
+                    post.remaining_paragraph_count, post.text('en', strip_html=True),
+                    post.text('en', teaser_only=True, strip_html=True),
+                    post.text('en', teaser_only=True, show_read_more_link=False)]
+        post.write_summary('en')
+        with io.open(post.summary_path('en'), 'r', encoding='utf-8') as inf:
+            summary = json.load(inf)
+        self.assertEqual((summary['words'], summary['teaser_words']), (4, 3))
+        self.assertEqual((summary['paragraphs'], summary['teaser_paragraphs']), (3, 2))
+        post = self.make_post()
+        self.assertEqual(post._current_summary(), summary)
+        self.assertEqual([post.reading_time, post.remaining_reading_time, post.paragraph_count,
+                          post.remaining_paragraph_count, post.text('en', strip_html=True),
+                          post.text('en', teaser_only=True, strip_html=True),
+                          post.text('en', teaser_only=True, show_read_more_link=False)], expected)
+        # The summary is not used once the compiled file changes
+        self.write(path, '<p>Changed</p>')
+        os.utime(path, (1000000000, 1000000000))
+        self.assertEqual(post._current_summary(), None)
+        self.assertEqual(post.text('en', strip_html=True), 'Changed')
+
+
+if __name__ == '__main__':
+    unittest.main()
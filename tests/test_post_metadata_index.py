@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from collections import defaultdict
+
+import dateutil.tz
+import mock
+
+from nikola.utils import LocaleBorg
+from nikola.post import Post, get_metadata_signature
+from nikola.plugins.misc.scan_posts import MetadataIndex, ScanPosts
+
+from .base import save_locale_borg, restore_locale_borg
+
+
+class FakeCompiler(object):
+    demote_headers = False
+    compile = None
+    name = 'fake'
+
+    def read_metadata(*args, **kwargs):
+        return {}
+
+    def register_extra_dependencies(self, post):
+        pass
+
+    def extension(self):
+        return '.html'
+
+
+def make_config():
+    config = defaultdict(str)
+    config['__tzinfo__'] = dateutil.tz.tzutc()
+    config['DEFAULT_LANG'] = 'en'
+    config['TRANSLATIONS'] = {'en': '', 'es': 'es'}
+    config['TRANSLATIONS_PATTERN'] = '{path}.{lang}.{ext}'
+    config['FILE_METADATA_REGEXP'] = None
+    config['SHOW_UNTRANSLATED_POSTS'] = True
+    return config
+
+
+class ScanTestCase(unittest.TestCase):
+    def setUp(self):
+        self.old_dir = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        os.chdir(self.tmpdir)
+        os.mkdir('posts')
+        self.write('posts/hello.rst', '.. title: Hello\n.. slug: hello\n.. date: 2016-01-01 00:00:00 UTC\n\nText\n')
+        self.write('posts/hello.es.rst', '.. title: Hola\n\nTexto\n')
+        self.config = make_config()
+        self.locale_borg_state = save_locale_borg()
+        LocaleBorg.initialize({'en': 'C', 'es': 'C'}, 'en')
+
+    def tearDown(self):
+        restore_locale_borg(self.locale_borg_state)
+        os.chdir(self.old_dir)
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, path, text):
+        with io.open(path, 'w', encoding='utf-8') as fh:
+            fh.write(text)
+
+    def make_post(self, record=None, source='posts/hello.rst', lazy=False):
+        return Post(source, self.config, 'posts', True, {'en': {}, 'es': {}},
+                    'post.tmpl', FakeCompiler(), metadata_record=record, lazy=lazy)
+
+
+class MetadataIndexTest(ScanTestCase):
+    def test_post_from_record_matches(self):
+        post = self.make_post()
+        cached = self.make_post(post.metadata_record)
+        self.assertEqual(post.meta, cached.meta)
+        self.assertEqual(post.translated_to, cached.translated_to)
+        self.assertEqual(post.is_two_file, cached.is_two_file)
+        self.assertEqual(cached.title('es'), 'Hola')
+
+    def test_lazy_post(self):
+        self.write('posts/alone.rst', '.. title: Alone\n.. slug: alone\n.. date: 2016-01-01 00:00:00 UTC\n\nText\n')
+        eager = self.make_post(source='posts/alone.rst')
+        lazy = self.make_post(source='posts/alone.rst', lazy=True)
+        self.assertNotIn('es', lazy.metadata_record['meta'])
+        self.assertEqual(lazy.title('es'), 'Alone')
+        self.assertIn('es', lazy.metadata_record['meta'])
+        self.assertEqual(eager.meta, lazy.meta)
+        self.assertEqual(eager.data, lazy.data)
+
+    def test_lazy_post_newstylemeta(self):
+        # An untranslated post with old-style metadata for a translation
+        self.write('posts/two.rst', 'Text\n')
+        self.write('posts/two.meta', '.. title: Two\n.. slug: two\n.. date: 2016-01-01 00:00:00 UTC\n')
+        self.write('posts/two.es.meta', 'Dos\ndos\n2016-01-01 00:00:00 UTC\n')
+        eager = self.make_post(source='posts/two.rst')
+        lazy = self.make_post(source='posts/two.rst', lazy=True)
+        self.assertFalse(eager.newstylemeta)
+        self.assertFalse(lazy.newstylemeta)
+        self.assertEqual(lazy.title('es'), 'Dos')
+
+    def test_compact_post(self):
+        post = self.make_post()
+        self.assertEqual(post.__dict__, {})
+        self.assertIsNone(post._dependency_file_page)
+        post.add_dependency(lambda: 'foo', 'page')
+        self.assertIn('foo', post.deps('es'))
+        self.assertIsNone(post._dependency_file_fragment)
+        self.assertEqual(post.fragment_deps('en'), ['posts/hello.rst'])
+        # Translations only keep the metadata that differs
+        self.assertEqual(post.metadata_record['meta']['es'], {'title': 'Hola'})
+        self.assertEqual(post.meta('slug', 'es'), 'hello')
+
+    def test_index_roundtrip_and_invalidation(self):
+        post = self.make_post()
+        signature = get_metadata_signature(self.config, post.source_path)
+        index = MetadataIndex(os.path.join('cache', 'post_metadata.json'), 'digest')
+        index.set(post.source_path, signature, post.metadata_record)
+        index.save()
+
+        index = MetadataIndex(os.path.join('cache', 'post_metadata.json'), 'digest')
+        self.assertEqual(index.get(post.source_path, signature), post.metadata_record)
+
+        # A new .meta file changes the signature
+        self.write('posts/hello.meta', '.. title: Changed\n')
+        new_signature = get_metadata_signature(self.config, post.source_path)
+        self.assertIsNone(index.get(post.source_path, new_signature))
+
+        # A different configuration discards the whole index
+        index = MetadataIndex(os.path.join('cache', 'post_metadata.json'), 'other digest')
+        self.assertIsNone(index.get(post.source_path, signature))
+
+
+class ScanSite(object):
+    quiet = True
+    MESSAGES = {'en': {}, 'es': {}}
+
+    def __init__(self, config):
+        self.config = config
+
+    def get_compiler(self, source_path):
+        return FakeCompiler()
+
+
+class ScanPostsTest(ScanTestCase):
+    def setUp(self):
+        super(ScanPostsTest, self).setUp()
+        for i in range(10):
+            self.write('posts/post{0}.rst'.format(i),
+                       '.. title: Post {0}\n.. slug: post-{0}\n.. date: 2016-01-01 00:00:00 UTC\n\nText\n'.format(i))
+        self.config['post_pages'] = [('posts/*.rst', 'posts', 'post.tmpl', True)]
+        self.config['CACHE_FOLDER'] = 'cache'
+
+    def scan(self, workers, cache=False):
+        self.config['SCAN_WORKERS'] = workers
+        self.config['CACHE_POST_METADATA'] = cache
+        scanner = ScanPosts()
+        scanner.site = ScanSite(self.config)
+        return scanner.scan()
+
+    def test_parallel_scan_matches_serial(self):
+        serial = self.scan(1)
+        parallel = self.scan(4)
+        self.assertEqual([p.source_path for p in serial], [p.source_path for p in parallel])
+        self.assertEqual([p.meta for p in serial], [p.meta for p in parallel])
+
+    def test_translations(self):
+        self.write('posts/only.es.rst', '.. title: Solo\n.. slug: solo\n.. date: 2016-01-01 00:00:00 UTC\n\nTexto\n')
+        self.write('posts/.hidden.rst', '')
+        os.mkdir('posts/sub')
+        self.write('posts/sub/nested.rst', '.. title: Nested\n.. slug: nested\n.. date: 2016-01-01 00:00:00 UTC\n\nText\n')
+        timeline = self.scan(1)
+        paths = sorted(p.source_path for p in timeline)
+        self.assertEqual(len(paths), 13)
+        self.assertIn(os.path.join('posts', 'only.es.rst'), paths)
+        self.assertIn(os.path.join('posts', 'sub', 'nested.rst'), paths)
+        self.assertNotIn(os.path.join('posts', 'hello.es.rst'), paths)
+        nested = [p for p in timeline if p.source_path == os.path.join('posts', 'sub', 'nested.rst')][0]
+        self.assertEqual(nested.folder_relative, 'sub')
+
+    def test_scan_paths(self):
+        self.config['SCAN_WORKERS'] = 1
+        self.config['CACHE_POST_METADATA'] = False
+        scanner = ScanPosts()
+        scanner.site = ScanSite(self.config)
+        for changed in ('posts/hello.rst', 'posts/hello.es.rst', 'posts/hello.meta'):
+            posts = scanner.scan_paths(set([changed]))
+            self.assertEqual([p.source_path for p in posts], ['posts/hello.rst'])
+        self.assertEqual(scanner.scan_paths(set(['posts/gone.rst'])), [])
+
+    def test_read_record_without_post(self):
+        # Workers only read the metadata, the Post (and its warnings) is
+        # only created by the main process
+        scanner = ScanPosts()
+        scanner.site = ScanSite(self.config)
+        job = scanner._find_jobs()[0][0]
+        post = scanner._make_post(job)
+        with mock.patch.object(Post, '__init__', side_effect=AssertionError):
+            record = scanner._read_record(job)
+        self.assertEqual(record, post.metadata_record)
+
+    def test_parallel_scan_fills_index(self):
+        timeline = self.scan(4, cache=True)
+        with io.open(os.path.join('cache', 'post_metadata.json'), 'r', encoding='utf-8') as inf:
+            entries = json.load(inf)['entries']
+        self.assertEqual(sorted(entries), sorted(p.source_path for p in timeline))
+
+
+if __name__ == '__main__':
+    unittest.main()
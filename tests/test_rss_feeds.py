@@ -2,7 +2,10 @@
 
 from __future__ import unicode_literals, absolute_import
 
+import io
 import os
+import shutil
+import tempfile
 
 from collections import defaultdict
 from io import StringIO
@@ -13,7 +16,7 @@ import dateutil.tz
 from lxml import etree
 import mock
 
-from .base import LocaleSupportInTesting
+from .base import LocaleSupportInTesting, save_locale_borg, restore_locale_borg
 import nikola
 
 fake_conf = defaultdict(str)
@@ -42,6 +45,7 @@ class FakeCompiler(object):
 
 class RSSFeedTest(unittest.TestCase):
     def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
         LocaleSupportInTesting.initialize_locales_for_testing('unilingual')
         self.blog_url = "http://some.blog"
 
@@ -71,29 +75,23 @@ class RSSFeedTest(unittest.TestCase):
                                                       'post.tmpl',
                                                       FakeCompiler())
 
-                    opener_mock = mock.mock_open()
-
-                    with mock.patch('nikola.nikola.io.open', opener_mock, create=True):
-                        nikola.nikola.Nikola().generic_rss_renderer('en',
-                                                                    "blog_title",
-                                                                    self.blog_url,
-                                                                    "blog_description",
-                                                                    [example_post,
-                                                                     ],
-                                                                    'testfeed.rss',
-                                                                    True,
-                                                                    False)
-
-                    opener_mock.assert_called_once_with(
-                        'testfeed.rss', 'w+', encoding='utf-8')
+                    output_path = os.path.join(self.tmpdir, 'testfeed.rss')
+                    nikola.nikola.Nikola().generic_rss_renderer('en',
+                                                                "blog_title",
+                                                                self.blog_url,
+                                                                "blog_description",
+                                                                [example_post,
+                                                                 ],
+                                                                output_path,
+                                                                True,
+                                                                False)
 
                     # Python 3 / unicode strings workaround
                     # lxml will complain if the encoding is specified in the
                     # xml when running with unicode strings.
                     # We do not include this in our content.
-                    file_content = [
-                        call[1][0]
-                        for call in opener_mock.mock_calls[2:-1]][0]
+                    with io.open(output_path, 'r', encoding='utf-8') as inf:
+                        file_content = inf.read()
                     splitted_content = file_content.split('\n')
                     self.encoding_declaration = splitted_content[0]
                     content_without_encoding_declaration = splitted_content[1:]
@@ -101,7 +99,7 @@ class RSSFeedTest(unittest.TestCase):
                         content_without_encoding_declaration)
 
     def tearDown(self):
-        pass
+        shutil.rmtree(self.tmpdir)
 
     def test_feed_items_have_valid_URLs(self):
         '''The items in the feed need to have valid urls in link and guid.'''
@@ -152,5 +150,73 @@ class RSSFeedTest(unittest.TestCase):
 
         self.assertTrue(xmlschema.validate(document))
 
+
+class FeedItemHTMLTest(unittest.TestCase):
+    def setUp(self):
+        self.locale_borg_state = save_locale_borg()
+
+    def tearDown(self):
+        restore_locale_borg(self.locale_borg_state)
+
+    def test_feed_item_html_is_cached(self):
+        site = nikola.nikola.Nikola()
+        site.config['FEED_PREVIEWIMAGE'] = True
+        post = mock.Mock(meta={'en': {'previewimage': '/images/preview.png'}})
+        url_replacer = mock.Mock(side_effect=lambda src, dst, lang, url_type: 'http://some.blog' + dst)
+        with mock.patch.object(site, 'url_replacer', url_replacer):
+            html = site.feed_item_html(post, 'en', '<p><a href="/posts/other.html">text</a></p>',
+                                       'http://some.blog/posts/post.html')
+            self.assertEqual(html, '<figure><img src="http://some.blog/images/preview.png"></figure> '
+                                   '<p><a href="http://some.blog/posts/other.html">text</a></p>')
+            self.assertEqual(url_replacer.call_count, 2)
+            # Other feeds with the same post reuse the result
+            self.assertEqual(site.feed_item_html(post, 'en', '<p><a href="/posts/other.html">text</a></p>',
+                                                 'http://some.blog/posts/post.html'), html)
+            self.assertEqual(url_replacer.call_count, 2)
+        # Keys have a digest of the text, not the text itself
+        for key in site.config['__post_text_cache__']:
+            self.assertNotIn('<p><a href="/posts/other.html">text</a></p>', key)
+
+
+class AtomEntryCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.old_dir = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        os.chdir(self.tmpdir)
+        self.locale_borg_state = save_locale_borg()
+        nikola.utils.LocaleBorg.reset()
+        self.site = nikola.nikola.Nikola(BASE_URL='http://some.blog/', FEED_PLAIN=True)
+        self.site.init_plugins()
+
+    def tearDown(self):
+        restore_locale_borg(self.locale_borg_state)
+        os.chdir(self.old_dir)
+        shutil.rmtree(self.tmpdir)
+
+    def render(self, post):
+        output_path = os.path.join('output', 'feed.atom')
+        self.site.atom_feed_renderer('en', [post], output_path, [], {'feedlink': '/feed.atom', 'permalink': '/'})
+        with io.open(output_path, 'r', encoding='utf-8') as inf:
+            return inf.read()
+
+    def test_metadata_changes_are_not_cached(self):
+        post = mock.Mock(source_path='posts/post.rst', meta={'en': {'title': 'Old title'}})
+        post.deps.return_value = post.deps_uptodate.return_value = []
+        post.text.return_value = 'Text'
+        post.title.return_value = 'Old title'
+        post.permalink.return_value = 'http://some.blog/posts/post/'
+        post.author.return_value = 'Nikola Tesla'
+        post.formatted_date.return_value = post.formatted_updated.return_value = '2016-01-01T00:00:00Z'
+        post.tags_for_language.return_value = ['old']
+        self.assertIn('<title>Old title</title>', self.render(post))
+        # A metadata-only change keeps the post texts, but changes the entry
+        post.title.return_value = 'New title'
+        post.tags_for_language.return_value = ['new']
+        feed = self.render(post)
+        self.assertIn('<title>New title</title>', feed)
+        self.assertIn('term="new"', feed)
+        self.assertNotIn('term="old"', feed)
+
+
 if __name__ == '__main__':
     unittest.main()
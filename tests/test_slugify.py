@@ -63,3 +63,14 @@ def test_disarmed_weird():
     assert o == u'Zażółć gęślą jaźń!-123.456 -Hello World---H-e-l-l-o-W-o-r-l-d-!-'
     assert isinstance(o, nikola.utils.unicode_str)
     nikola.utils.USE_SLUGIFY = True
+
+
+def test_cached_respects_use_slugify():
+    """Test that cached slugs are not reused after USE_SLUGIFY changes."""
+    value = u'Cached Zażółć!'
+    assert nikola.utils.slugify(value, lang='pl') == u'cached-zazolc'
+    nikola.utils.USE_SLUGIFY = False
+    assert nikola.utils.slugify(value, lang='pl') == value
+    nikola.utils.USE_SLUGIFY = True
+    assert nikola.utils.slugify(value, lang='pl') == u'cached-zazolc'
+    assert nikola.utils.slugify(value, lang='pl', force=True) == u'cached-zazolc'
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from blinker import signal
+import mock
+
+from nikola import nikola
+from nikola.plugins.command.auto import CommandAuto
+from nikola.utils import LocaleBorg
+
+from .base import save_locale_borg, restore_locale_borg
+
+POST_TEMPLATE = '''.. title: {title}
+.. slug: {slug}
+.. date: {date}
+.. tags: {tags}
+.. category: {category}
+
+Text
+'''
+
+
+def source_paths(posts):
+    return [p.source_path for p in posts]
+
+
+class UpdatePostsTest(unittest.TestCase):
+    """Nikola.update_posts must leave the site as a full rescan would."""
+
+    maxDiff = None
+
+    def setUp(self):
+        self.old_dir = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        os.chdir(self.tmpdir)
+        os.mkdir('posts')
+        os.mkdir('pages')
+        self.locale_borg_state = save_locale_borg()
+        self.write_post('one', 'One', '2016-01-01 00:00:00 UTC', 'python, nikola', 'code/python')
+        self.write_post('two', 'Two', '2016-01-02 00:00:00 UTC', 'unique', 'lonely')
+        self.write_post('three', 'Three', '2016-01-03 00:00:00 UTC', 'python', 'code')
+        self.write_post('four', 'Four', '2016-01-04 00:00:00 UTC', 'nikola', 'code/python')
+        self.write('pages/about.rst', '.. title: About\n.. slug: about\n\nAbout\n')
+
+    def tearDown(self):
+        restore_locale_borg(self.locale_borg_state)
+        os.chdir(self.old_dir)
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, path, text):
+        with io.open(path, 'w', encoding='utf-8') as fh:
+            fh.write(text)
+
+    def write_post(self, slug, title, date, tags, category):
+        path = os.path.join('posts', slug + '.rst')
+        self.write(path, POST_TEMPLATE.format(title=title, slug=slug, date=date, tags=tags, category=category))
+        return path
+
+    def make_site(self):
+        LocaleBorg.reset()
+        site = nikola.Nikola(
+            BASE_URL='https://example.com/',
+            POSTS=(('posts/*.rst', 'posts', 'post.tmpl'),),
+            PAGES=(('pages/*.rst', 'pages', 'story.tmpl'),),
+            CATEGORY_ALLOW_HIERARCHIES=True,
+            CACHE_POST_METADATA=False)
+        site.init_plugins()
+        site.scan_posts()
+        return site
+
+    def state(self, site):
+        """Return the scanned posts and indexes of site, by source path.
+
+        posts_per_tag, posts_per_category etc. are in scan order, not
+        sorted, so only their contents are compared.
+        """
+        def unordered(index):
+            return dict((key, sorted(source_paths(posts))) for key, posts in index.items())
+
+        return {
+            'timeline': source_paths(site.timeline),
+            'posts': source_paths(site.posts),
+            'all_posts': source_paths(site.all_posts),
+            'pages': source_paths(site.pages),
+            'posts_per_year': unordered(site.posts_per_year),
+            'posts_per_month': unordered(site.posts_per_month),
+            'posts_per_tag': unordered(site.posts_per_tag),
+            'posts_per_category': unordered(site.posts_per_category),
+            'tags_per_language': dict((lang, sorted(tags)) for lang, tags in site.tags_per_language.items()),
+            'category_hierarchy': [node.category_name for node in site.category_hierarchy],
+            'posts_per_classification': dict(
+                (taxonomy, dict(
+                    (lang, dict((classification, source_paths(posts)) for classification, posts in per_lang.items()))
+                    for lang, per_lang in per_taxonomy.items()))
+                for taxonomy, per_taxonomy in site.posts_per_classification.items()),
+            'links': [(p.source_path,
+                       p.prev_post.source_path if p.prev_post else None,
+                       p.next_post.source_path if p.next_post else None) for p in site.posts],
+        }
+
+    def test_update_matches_rescan(self):
+        site = self.make_site()
+        removed = os.path.join('posts', 'two.rst')
+        os.unlink(removed)
+        modified = self.write_post('one', 'One', '2016-01-05 00:00:00 UTC', 'nikola, changed', 'code/python/new')
+        added = self.write_post('five', 'Five', '2016-01-06 00:00:00 UTC', 'python, fresh', 'other')
+
+        updated = []
+
+        def on_posts_updated(sender, added, removed):
+            updated.append((sorted(source_paths(added)), sorted(source_paths(removed))))
+
+        signal('posts_updated').connect(on_posts_updated, sender=site)
+        site.update_posts(added=[added], modified=[modified], removed=[removed])
+        state = self.state(site)
+        self.assertEqual(state, self.state(self.make_site()))
+        self.assertNotIn('unique', state['posts_per_tag'])
+        self.assertNotIn('lonely', state['posts_per_category'])
+        self.assertIn('code/python/new', state['category_hierarchy'])
+        self.assertEqual(state['posts'][:2], [added, modified])
+        self.assertEqual(updated, [([added, modified], [modified, removed])])
+
+    def test_update_without_changes(self):
+        site = self.make_site()
+        before = self.state(site)
+        site.update_posts(modified=[os.path.join('posts', 'gone.rst')])
+        self.assertEqual(self.state(site), before)
+
+    def test_auto_rebuild(self):
+        site = self.make_site()
+        site.doit = mock.Mock()
+        site.doit.run.return_value = 0
+        command = CommandAuto()
+        command.site = site
+        command.logger = mock.Mock()
+        command.cmd_arguments = ['nikola', 'build']
+        command.post_folders = set(['posts', 'pages'])
+        command.data_folders = command.post_folders | set(['files'])
+        command.in_process = True
+
+        modified = self.write_post('one', 'One', '2016-01-05 00:00:00 UTC', 'python, nikola', 'code/python')
+        event = mock.Mock(event_type='modified', src_path=os.path.join(self.tmpdir, modified), spec=['event_type', 'src_path'])
+        with mock.patch('nikola.plugins.command.auto.subprocess') as subprocess:
+            command.do_rebuild(event)
+            self.assertEqual(subprocess.Popen.call_count, 0)
+        site.doit.run.assert_called_once_with(['build'], init_plugins=False)
+        self.assertEqual(self.state(site), self.state(self.make_site()))
+
+        # Other changes are built in a new process from now on
+        with mock.patch('nikola.plugins.command.auto.subprocess') as subprocess:
+            subprocess.Popen.return_value.stderr.read.return_value = b''
+            subprocess.Popen.return_value.wait.return_value = 0
+            command.do_rebuild(mock.Mock(event_type='modified', src_path='templates/base.tmpl', spec=['event_type', 'src_path']))
+            command.do_rebuild(event)
+            self.assertEqual(subprocess.Popen.call_count, 2)
+        self.assertFalse(command.in_process)
+        self.assertEqual(site.doit.run.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from nikola import nikola
+from nikola.utils import LocaleBorg
+
+from .base import save_locale_borg, restore_locale_borg
+
+
+class URLReplacerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.old_dir = os.getcwd()
+        cls.tmpdir = tempfile.mkdtemp()
+        os.chdir(cls.tmpdir)
+        cls.locale_borg_state = save_locale_borg()
+        LocaleBorg.reset()
+        cls.site = nikola.Nikola(BASE_URL='https://example.com/blog/')
+        cls.site.init_plugins()
+
+    @classmethod
+    def tearDownClass(cls):
+        restore_locale_borg(cls.locale_borg_state)
+        os.chdir(cls.old_dir)
+        shutil.rmtree(cls.tmpdir)
+
+    def test_relative_links(self):
+        replace = self.site.url_replacer
+        self.assertEqual(replace('/a/b/c.html', '/a/d.html'), '../d.html')
+        self.assertEqual(replace('/a/b/e.html', '/a/d.html'), '../d.html')
+        self.assertEqual(replace('/a/b/c.html', 'https://getnikola.com/'), 'https://getnikola.com/')
+        self.assertEqual(replace('/a/b/c.html', '#top'), '#top')
+        self.assertEqual(replace('/a/b/c.html', '/a/d.html', url_type='absolute'), 'https://example.com/blog/a/d.html')
+        self.assertEqual(replace('/a/b/c.html', '/a/d.html', url_type='full_path'), '/blog/a/d.html')
+
+    def test_links_to_same_page(self):
+        # Cached per folder, but links to the page itself are special
+        replace = self.site.url_replacer
+        self.assertEqual(replace('/a/b.html', 'c.html'), 'c.html')
+        self.assertEqual(replace('/a/c.html', 'c.html'), '#')
+        self.assertEqual(replace('/a/c.html', 'c.html', url_type='absolute'), 'https://example.com/blog/a/c.html')
+        self.assertEqual(replace('/a/b.html', 'c.html'), 'c.html')
+        self.assertEqual(replace('/a/b.html', '?x=1'), 'b.html?x=1')
+        self.assertEqual(replace('/a/c.html', '?x=1'), 'c.html?x=1')
+
+    def test_magic_links(self):
+        replace = self.site.url_replacer
+        self.assertEqual(replace('/posts/a.html', 'link://tag/python'), '../categories/python.html')
+        self.assertEqual(replace('/b.html', 'link://tag/python'), 'categories/python.html')
+        self.assertEqual(replace('/b.html', 'link:///foo/bar.html'), '/foo/bar.html')
+        self.assertEqual(self.site._magic_links.get(('link://tag/python', 'en')), '/categories/python.html')
+
+
+class TemplateURLTest(unittest.TestCase):
+    """The url() and rewrite_links() template helpers."""
+
+    theme = 'bootstrap3'
+    template = ('''<a href="${url('/a/d.html')}">d</a> <a href="${url('link://tag/python')}">tag</a>\n'''
+                '''${rewrite_links('<img src="/a/e.png"> <a href="link://tag/python">tag</a>')}''')
+
+    def setUp(self):
+        self.old_dir = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        os.chdir(self.tmpdir)
+        os.mkdir('templates')
+        with io.open(os.path.join('templates', 'links.tmpl'), 'w', encoding='utf-8') as outf:
+            outf.write(self.template)
+        self.locale_borg_state = save_locale_borg()
+        LocaleBorg.reset()
+        self.site = nikola.Nikola(BASE_URL='https://example.com/blog/', THEME=self.theme, LINK_REWRITER='templates')
+        self.site.init_plugins()
+
+    def tearDown(self):
+        restore_locale_borg(self.locale_borg_state)
+        os.chdir(self.old_dir)
+        shutil.rmtree(self.tmpdir)
+
+    def test_links_in_templates(self):
+        output_name = os.path.join('output', 'a', 'b', 'c.html')
+        self.site.render_template('links.tmpl', output_name, {'lang': 'en'})
+        with io.open(output_name, 'r', encoding='utf-8') as inf:
+            self.assertEqual(inf.read(), '<a href="../d.html">d</a> <a href="../../categories/python.html">tag</a>\n'
+                                         '<img src="../e.png"> <a href="../../categories/python.html">tag</a>')
+
+    def test_url_type(self):
+        output_name = os.path.join('output', 'a', 'b', 'c.html')
+        self.site.render_template('links.tmpl', output_name, {'lang': 'en'}, url_type='full_path')
+        with io.open(output_name, 'r', encoding='utf-8') as inf:
+            self.assertEqual(inf.read(), '<a href="/blog/a/d.html">d</a> <a href="/blog/categories/python.html">tag</a>\n'
+                                         '<img src="/blog/a/e.png"> <a href="/blog/categories/python.html">tag</a>')
+
+    def test_render_to_string(self):
+        # Links are left alone without an output file
+        self.assertEqual(self.site.render_template('links.tmpl', None, {'lang': 'en'}),
+                         '<a href="/a/d.html">d</a> <a href="link://tag/python">tag</a>\n'
+                         '<img src="/a/e.png"> <a href="link://tag/python">tag</a>')
+
+
+class JinjaTemplateURLTest(TemplateURLTest):
+    theme = 'bootstrap3-jinja'
+    template = TemplateURLTest.template.replace('${', '{{ ').replace(')}', ') }}')
+
+
+if __name__ == '__main__':
+    unittest.main()
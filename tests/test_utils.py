@@ -1,10 +1,11 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
+import threading
 import unittest
 import mock
 import lxml.html
 from nikola.post import get_meta
-from nikola.utils import demote_headers, TranslatableSetting
+from nikola.utils import demote_headers, TranslatableSetting, TranslationResolver, VersionedDict, config_changed, get_translation_resolver, LRUCache
 
 
 class dummy(object):
@@ -327,5 +328,103 @@ def test_get_metadata_from_file():
     assert 'title' in g([".. foo: bar", "", "FooBar", "------"])
 
 
+def test_translation_resolver():
+    config = {'TRANSLATIONS_PATTERN': '{path}.{lang}.{ext}', 'DEFAULT_LANG': 'en', 'TRANSLATIONS': {'en': '', 'es': '1'}}
+    resolver = get_translation_resolver(config)
+    assert resolver is get_translation_resolver(dict(config))
+    assert resolver.candidate('posts/a.rst', 'es') == 'posts/a.es.rst'
+    assert resolver.candidate('posts/a.es.rst', 'en') == 'posts/a.rst'
+    config['TRANSLATIONS_PATTERN'] = '{path}.{ext}.{lang}'
+    assert get_translation_resolver(config).candidate('posts/a.rst', 'es') == 'posts/a.rst.es'
+
+    resolver = TranslationResolver('{path}.{lang}.{ext}', ['en', 'es'], 'en', cache_size=2)
+    for path in ('a.rst', 'b.rst', 'a.rst', 'c.rst'):
+        assert resolver.candidate(path, 'es') == path[0] + '.es.rst'
+    assert list(resolver._cache) == ['a.rst', 'c.rst']
+
+
+def test_versioned_dict():
+    d = VersionedDict(a=1)
+    assert d.version == 0
+    versions = [d.version]
+    for change in (lambda: d.__setitem__('b', 2), lambda: d.update(c=3), lambda: d.setdefault('d', 4),
+                   lambda: d.pop('a'), lambda: d.__delitem__('b'), d.popitem, d.clear):
+        change()
+        versions.append(d.version)
+    assert versions == sorted(set(versions))
+    assert d == {}
+    d['e'] = []
+    version = d.version
+    d['e'].append(1)
+    assert d.version == version
+
+
+def test_config_changed_digest():
+    import hashlib
+    import json
+    from nikola.utils import CustomEncoder
+    context = VersionedDict(blog_title='Demo', date_format={'en': 'YYYY'})
+    config = {'title': 'Post', 'context': context, 'lang': 'en', 'items': [1, 2]}
+
+    def expected():
+        return hashlib.md5(json.dumps(config, cls=CustomEncoder, sort_keys=True).encode('utf-8')).hexdigest()
+
+    assert config_changed(config)._calc_digest() == expected()
+    assert config_changed(config)._calc_digest() == expected()
+    context['blog_title'] = 'Changed'
+    assert config_changed(config)._calc_digest() == expected()
+    # Computed only once
+    uptodate = config_changed(config)
+    digest = uptodate._calc_digest()
+    config['title'] = 'Other'
+    assert uptodate._calc_digest() == digest
+
+
+def test_lru_cache():
+    cache = LRUCache(2)
+    cache['a'] = 1
+    cache['b'] = 2
+    assert cache.get('a') == 1
+    cache['c'] = 3
+    assert cache.get('b') is None
+    assert list(cache) == ['a', 'c']
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_lru_cache_sizeof():
+    # Keys count too: every entry here is len('a') + len('xxxx') = 5
+    cache = LRUCache(10, sizeof=len)
+    cache['a'] = 'xxxx'
+    cache['b'] = 'xxxx'
+    assert cache.get('a') == 'xxxx'
+    cache['c'] = 'xxxx'
+    assert list(cache) == ['a', 'c']
+    assert cache.size == 10
+    cache['a'] = 'xx'
+    assert cache.size == 8
+    cache['d'] = 'x' * 10
+    assert cache.get('d') is None
+    cache['e'] = 'x' * 9
+    assert list(cache) == ['e']
+    assert cache.size == 10
+
+
+def test_lru_cache_threads():
+    cache = LRUCache(50, sizeof=len)
+
+    def worker(n):
+        for i in range(2000):
+            key = '{0}'.format((i * n) % 37)
+            if cache.get(key) is None:
+                cache[key] = 'x' * (i % 7)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(1, 9)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.size == sum(len(key) + len(cache.get(key)) for key in cache)
+    assert cache.size <= 50
+
 if __name__ == '__main__':
     unittest.main()